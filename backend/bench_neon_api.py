@@ -0,0 +1,321 @@
+"""
+FlameBorn Ubuntu Testnet API Benchmarks
+Concurrent load and latency per route, compared to a stored baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_neon_baseline.json")
+
+ACTION_BODY = {
+    "action_type": "treatment",
+    "title": "Ubuntu Benchmark Treatment",
+    "description": "Benchmark healthcare action recorded under load",
+    "location": "Lagos, Nigeria",
+    "impact_score": 6.5
+}
+
+
+class Dataset:
+    """Wallets known to exist in the synthetic community under test"""
+
+    def __init__(self, seed, users, sample_size=5000):
+        from neon_seed import SyntheticCommunity
+
+        community = SyntheticCommunity(seed=seed, users=min(users, sample_size))
+        self.members = [community.wallet(index) for index in range(community.users)]
+        self.validators = []
+        bases = {"users": 0, "validators": 0, "actions": 0, "transactions": 0}
+        for batch in community.batches(bases):
+            self.validators.extend(community.wallet(row["user_id"] - 1) for row in batch["validators"])
+        self.random = random.Random(seed)
+
+    def member(self):
+        return self.random.choice(self.members)
+
+    def validator(self):
+        return self.random.choice(self.validators or self.members)
+
+
+# name -> (method, request builder returning (path, json body))
+ROUTES = {
+    "root": ("GET", lambda data: ("/", None)),
+    "manifest": ("GET", lambda data: ("/.well-known/manifest.json", None)),
+    "health": ("GET", lambda data: ("/health", None)),
+    "stats": ("GET", lambda data: ("/ubuntu/stats", None)),
+    "users_page": ("GET", lambda data: ("/ubuntu/users?limit=50", None)),
+    "user_lookup": ("GET", lambda data: (f"/ubuntu/users/{data.member()}", None)),
+    "actions_page": ("GET", lambda data: ("/ubuntu/healthcare-actions?limit=50", None)),
+    "actions_by_type": ("GET", lambda data: ("/ubuntu/healthcare-actions?limit=50&action_type=treatment", None)),
+    # 1000-row pages, where response encoding dominates (compare FAST_JSON=true and false)
+    "users_1k": ("GET", lambda data: ("/ubuntu/users?limit=1000", None)),
+    "actions_1k": ("GET", lambda data: ("/ubuntu/healthcare-actions?limit=1000", None)),
+    "validators": ("GET", lambda data: ("/ubuntu/validators", None)),
+    "validator_uptime": ("GET", lambda data: (f"/ubuntu/validators/{data.validator()}/uptime?hours=24", None)),
+    "wisdom": ("GET", lambda data: ("/oracle/ubuntu-wisdom", None)),
+    "heartbeat": ("POST", lambda data: (f"/ubuntu/validators/{data.validator()}/heartbeat", None)),
+    "record_action": ("POST", lambda data: (f"/ubuntu/healthcare-actions?wallet_address={data.member()}", ACTION_BODY)),
+}
+
+
+class StatementCounter:
+    """Counts SQL statements sent by the app's async engine"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def percentile_summary(latencies):
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {"p50_ms": round(cuts[49] * 1000, 2), "p95_ms": round(cuts[94] * 1000, 2), "p99_ms": round(cuts[98] * 1000, 2)}
+
+
+async def run_route(client, name, data, concurrency, duration):
+    """Drive one route with concurrent clients for duration seconds"""
+    method, build = ROUTES[name]
+    latencies = []
+    errors = 0
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + duration
+
+    async def client_loop():
+        nonlocal errors
+        while loop.time() < deadline:
+            path, body = build(data)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+            except httpx.TransportError:
+                # A served worker recycling or stopping closed the connection
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        **percentile_summary(latencies),
+    }
+
+
+async def probe_queries(client, name, data, counter, requests):
+    """Average statements per request, measured with one client at a time"""
+    method, build = ROUTES[name]
+    before = counter.count
+    for _ in range(requests):
+        path, body = build(data)
+        await client.request(method, path, json=body)
+    return round((counter.count - before) / requests, 2)
+
+
+def compare(results, baseline, tolerance):
+    """Routes whose p95 latency rose or throughput fell by more than tolerance"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {before['throughput_rps']} -> {result['throughput_rps']} req/s")
+    return regressions
+
+
+def print_report(label, results, baseline):
+    print(f"🔥 FlameBorn Ubuntu API benchmark - {label}")
+    print(f"{'route':<18}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'errors':>8}{'vs base p95':>13}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        change = f"{(result['p95_ms'] / before['p95_ms'] - 1) * 100:+.0f}%" if before and before["p95_ms"] else "-"
+        queries = result.get("queries_per_request")
+        print(f"{name:<18}{result['throughput_rps']:>10}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+              f"{result['p99_ms']:>10}{queries if queries is not None else '-':>9}{result['errors']:>8}{change:>13}")
+
+
+async def prepare_dataset(seed, users):
+    """Load the synthetic community unless this seed is already in the database"""
+    from neon_seed import SyntheticCommunity, load_synthetic_community
+    from neon_startup import prepare_database
+
+    prepare_database()
+    try:
+        summary = await load_synthetic_community(SyntheticCommunity(seed=seed, users=users))
+        print(f"🌱 Loaded {summary['users']} members, {summary['actions']} actions in {summary['seconds']}s")
+    except ValueError:
+        print(f"🌱 Reusing the synthetic community for seed {seed}")
+
+
+async def measure(client, routes, data, args, counter=None):
+    results = {}
+    for name in routes:
+        # Warm caches and connection pools before measuring
+        await run_route(client, name, data, concurrency=1, duration=min(0.5, args.duration))
+        results[name] = await run_route(client, name, data, args.concurrency, args.duration)
+        if counter is not None:
+            results[name]["queries_per_request"] = await probe_queries(client, name, data, counter, args.probe)
+    return results
+
+
+def check_baseline(label, results, args):
+    """Print the report for label, then save it as the baseline or compare against the stored one"""
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baselines = json.load(baseline_file)
+    baseline = baselines.get(label, {})
+    print_report(label, results, baseline)
+
+    if args.save_baseline:
+        baselines[label] = results
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+        print(f"💾 Baseline for {label} saved to {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"ℹ️ No baseline for {label} in {args.baseline}; run with --save-baseline to record one")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"   ❌ REGRESSION {regression}")
+    if not regressions:
+        print(f"   ✅ Within {args.tolerance:.0%} of the baseline")
+    return 1 if regressions else 0
+
+
+async def wait_until_serving(url, server, timeout=300):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url, timeout=5) as client:
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode} before serving")
+            try:
+                if (await client.get("/ping")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"Server not serving {url} after {timeout}s")
+
+
+async def serve_and_measure(mode, routes, data, args):
+    """Launch neon_server.py in mode, drive it over HTTP, then stop it with SIGTERM"""
+    env = {**os.environ, "SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(args.port), "SERVER_ACCESS_LOG": "false"}
+    server_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "neon_server.py")
+    server = subprocess.Popen([sys.executable, server_script, mode], env=env)
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        await wait_until_serving(url, server)
+        async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+            return await measure(client, routes, data, args)
+    finally:
+        # SIGTERM: workers drain in-flight requests and run their shutdown flushes
+        server.terminate()
+        server.wait(timeout=120)
+
+
+def print_comparison(users, runs):
+    """Throughput of every route per server mode, relative to the first mode"""
+    modes = list(runs)
+    print(f"🔥 FlameBorn Ubuntu server modes - req/s with {users} members")
+    print(f"{'route':<18}" + "".join(f"{mode:>14}" for mode in modes) + "".join(f"{'x ' + mode:>16}" for mode in modes[1:]))
+    for name, first in runs[modes[0]].items():
+        rates = [runs[mode][name]["throughput_rps"] for mode in modes]
+        ratios = [f"{rate / first['throughput_rps']:.2f}x" if first["throughput_rps"] else "-" for rate in rates[1:]]
+        print(f"{name:<18}" + "".join(f"{rate:>14}" for rate in rates) + "".join(f"{ratio:>16}" for ratio in ratios))
+
+
+async def run_benchmarks(args):
+    routes = args.routes.split(",") if args.routes else list(ROUTES)
+    counter = None
+    if args.serve:
+        if args.database_url:
+            os.environ["DATABASE_URL"] = args.database_url
+        import neon_config
+
+        await prepare_dataset(args.seed, args.users)
+        # The servers under test open their own connections
+        await neon_config.async_engine.dispose()
+        neon_config.engine.dispose()
+        data = Dataset(args.seed, args.users)
+        runs = {}
+        status = 0
+        for mode in args.serve.split(","):
+            runs[mode] = await serve_and_measure(mode, routes, data, args)
+            status |= check_baseline(f"{args.label or mode}:{args.users}", runs[mode], args)
+        if len(runs) > 1:
+            print_comparison(args.users, runs)
+        return status
+
+    if args.url:
+        label = f"{args.label or 'remote'}:{args.users}"
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+        app = None
+    else:
+        if args.database_url:
+            os.environ["DATABASE_URL"] = args.database_url
+        import neon_config
+        from neon_main import app
+
+        # Statement echo would dominate SQLite timings
+        neon_config.engine.echo = False
+        neon_config.async_engine.echo = False
+        await prepare_dataset(args.seed, args.users)
+        await app.router.startup()
+        counter = StatementCounter(neon_config.async_engine)
+        label = f"{args.label or neon_config.async_engine.dialect.name}:{args.users}"
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    data = Dataset(args.seed, args.users)
+    try:
+        results = await measure(client, routes, data, args, counter)
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+    return check_baseline(label, results, args)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the FlameBorn Ubuntu API under concurrent load")
+    parser.add_argument("--database-url", help="Database to benchmark in-process (default: DATABASE_URL)")
+    parser.add_argument("--url", help="Benchmark a running server instead (no query counts)")
+    parser.add_argument("--serve", help="Comma-separated server modes to launch and compare, e.g. dev,production")
+    parser.add_argument("--port", type=int, default=8765, help="Port for servers launched by --serve")
+    parser.add_argument("--label", help="Baseline label (default: the dialect, 'remote' for --url, or the --serve mode)")
+    parser.add_argument("--users", type=int, default=10000, help="Synthetic community size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of load per route")
+    parser.add_argument("--probe", type=int, default=20, help="Sequential requests used to count queries")
+    parser.add_argument("--routes", help=f"Comma-separated subset of: {','.join(ROUTES)}")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95/throughput drift")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run_benchmarks(_parse_args())))
@@ -0,0 +1,436 @@
+"""
+FlameBorn Bulk Ingestion
+Set-based registration of Ubuntu community members and healthcare actions
+"""
+
+import json
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from operator import itemgetter
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from neon_ledger import ACTION_REWARD, LEDGER_COLUMNS, WELCOME, append_entries, ledger_entry
+from neon_metrics import community_metrics
+from neon_models import HealthcareAction, UbuntuTransaction, UbuntuUser
+from neon_regions import ImpactDeltas, record_impact
+from neon_rewards import STARTING_UBUNTU_SCORE, WELCOME_FLB_BALANCE, action_reward, action_score_boost
+from neon_supply import record_supply, supply_deltas
+from neon_versions import ACTIONS, MEMBERS, bump_versions
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "5000"))
+BULK_MAX_RECORDS = int(os.getenv("BULK_MAX_RECORDS", "100000"))
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "1000"))  # Rejected rows echoed back per stream
+
+NDJSON_CONTENT_TYPES = (
+    "application/x-ndjson",
+    "application/ndjson",
+    "application/jsonl",
+    "application/x-jsonlines",
+)
+
+
+def is_ndjson(request):
+    """True when the request body is newline-delimited JSON"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in NDJSON_CONTENT_TYPES
+
+
+def _parse_line(line):
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return None, f"Invalid JSON: {e}"
+    if not isinstance(record, dict):
+        return None, "Each record must be a JSON object"
+    return record, None
+
+
+async def iter_ndjson(request):
+    """Yield (record, error) pairs from an NDJSON body as it streams in"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+
+async def read_records(request, max_records=BULK_MAX_RECORDS):
+    """Read a JSON array or NDJSON body into a list of (record, error) pairs.
+
+    Raises ValueError when the body is not a JSON array or exceeds max_records.
+    """
+    if is_ndjson(request):
+        items = []
+        async for item in iter_ndjson(request):
+            items.append(item)
+            if len(items) > max_records:
+                raise ValueError(f"Batch exceeds {max_records} records")
+        return items
+
+    try:
+        payload = json.loads(await request.body())
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON body: {e}") from e
+    if not isinstance(payload, list):
+        raise ValueError("Body must be a JSON array or NDJSON")
+    if len(payload) > max_records:
+        raise ValueError(f"Batch exceeds {max_records} records")
+    return [(record, None) if isinstance(record, dict) else (None, "Each record must be a JSON object")
+            for record in payload]
+
+
+def chunked(items, size=BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _validation_error(error):
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in error.errors())
+
+
+def insert_ignoring_conflicts(db, table, index_elements):
+    """Dialect-specific INSERT that skips rows violating the given unique key"""
+    if db.bind.dialect.name == "postgresql":
+        return postgresql_insert(table).on_conflict_do_nothing(index_elements=index_elements)
+    return sqlite_insert(table).on_conflict_do_nothing(index_elements=index_elements)
+
+
+async def copy_records(db, table_name, columns, rows):
+    """COPY row dicts into table_name on the session's connection (Postgres only).
+
+    The session must already have issued a statement in the current
+    transaction so the rows commit or roll back with it.
+    """
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        table_name, records=list(map(itemgetter(*columns), rows)), columns=columns
+    )
+
+
+async def copy_to_staging(db, table, columns, rows):
+    """COPY rows into a transaction-scoped staging copy of table (Postgres only).
+
+    The staging table is dropped at commit, so this is safe behind
+    transaction-pooling PgBouncer. Returns the staging table name.
+    """
+    staging = f"{table.name}_staging"
+    column_list = ", ".join(columns)
+    # Issued through the session first so the driver transaction is already open
+    await db.execute(text(
+        f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+        f"SELECT {column_list} FROM {table.name} WITH NO DATA"
+    ))
+    await copy_records(db, staging, columns, rows)
+    return staging
+
+
+async def _insert_new_users_postgresql(db, rows):
+    """COPY + INSERT ... ON CONFLICT DO NOTHING RETURNING: one set-based statement decides what is new"""
+    columns = list(rows[0].keys())
+    staging = await copy_to_staging(db, UbuntuUser.__table__, columns, rows)
+    column_list = ", ".join(columns)
+    result = await db.execute(text(
+        f"INSERT INTO ubuntu_users ({column_list}) SELECT {column_list} FROM {staging} "
+        f"ON CONFLICT (wallet_address) DO NOTHING RETURNING wallet_address, id"
+    ))
+    return dict(result.all())
+
+
+async def _insert_new_users_sqlite(db, rows):
+    """One IN query for existing wallets, a multi-row insert of the rest, then one IN query for their ids"""
+    wallets = [row["wallet_address"] for row in rows]
+    result = await db.execute(
+        select(UbuntuUser.wallet_address).where(UbuntuUser.wallet_address.in_(wallets))
+    )
+    existing = set(result.scalars().all())
+    new_rows = [row for row in rows if row["wallet_address"] not in existing]
+    if not new_rows:
+        return {}
+    await db.execute(insert_ignoring_conflicts(db, UbuntuUser.__table__, ["wallet_address"]), new_rows)
+    result = await db.execute(
+        select(UbuntuUser.wallet_address, UbuntuUser.id).where(
+            UbuntuUser.wallet_address.in_([row["wallet_address"] for row in new_rows])
+        )
+    )
+    return dict(result.all())
+
+
+async def bulk_register_users(db, items, schema):
+    """Register many members with one set-based existence check and bulk insert per chunk.
+
+    Returns (outcomes, role_counts) where outcomes holds one entry per input
+    record and role_counts tallies the members actually created.
+    """
+    outcomes = [None] * len(items)
+    candidates = []
+    seen_wallets = set()
+
+    for index, (record, error) in enumerate(items):
+        if error:
+            outcomes[index] = {"index": index, "status": "invalid", "error": error}
+            continue
+        try:
+            member = schema(**record)
+        except ValidationError as e:
+            outcomes[index] = {
+                "index": index,
+                "wallet_address": record.get("wallet_address"),
+                "status": "invalid",
+                "error": _validation_error(e)
+            }
+            continue
+        if member.wallet_address in seen_wallets:
+            outcomes[index] = {"index": index, "wallet_address": member.wallet_address, "status": "duplicate"}
+            continue
+        seen_wallets.add(member.wallet_address)
+        candidates.append((index, member))
+
+    insert_new_users = (
+        _insert_new_users_postgresql if db.bind.dialect.name == "postgresql" else _insert_new_users_sqlite
+    )
+    role_counts = {}
+    for chunk in chunked(candidates):
+        now = datetime.utcnow()
+        rows = [
+            {
+                **member.__dict__,  # Validated field values, without the cost of .dict()
+                "uuid": str(uuid.uuid4()),
+                "verification_status": "pending",
+                "flb_balance": WELCOME_FLB_BALANCE,
+                "ubuntu_score": STARTING_UBUNTU_SCORE,
+                "created_at": now,
+                "updated_at": now,
+                "is_validator": False,
+                "is_active": True,
+            }
+            for _, member in chunk
+        ]
+        created = await insert_new_users(db, rows)
+        await _append_ledger(db, [ledger_entry(member_id, WELCOME_FLB_BALANCE, WELCOME, now)
+                                  for member_id in created.values()])
+        await record_supply(db, supply_deltas(row for row in rows if row["wallet_address"] in created))
+        impact = ImpactDeltas()
+        chunk_roles = {}
+        for row in rows:
+            if row["wallet_address"] in created:
+                impact.member(now, row["country"], row["location"])
+                chunk_roles[row["role"]] = chunk_roles.get(row["role"], 0) + 1
+        await record_impact(db, impact)
+        for role, count in chunk_roles.items():
+            await community_metrics.user_registered(db, role, WELCOME_FLB_BALANCE, STARTING_UBUNTU_SCORE, count=count)
+        await bump_versions(db, MEMBERS)
+        await db.commit()
+
+        for index, member in chunk:
+            if member.wallet_address in created:
+                outcomes[index] = {"index": index, "wallet_address": member.wallet_address, "status": "created"}
+            else:
+                outcomes[index] = {"index": index, "wallet_address": member.wallet_address, "status": "exists"}
+        for role, count in chunk_roles.items():
+            role_counts[role] = role_counts.get(role, 0) + count
+
+    return outcomes, role_counts
+
+
+# Healthcare action ingestion
+ACTION_COLUMNS = [
+    "user_id", "action_type", "title", "description", "location", "impact_score",
+    "flb_earned", "verification_status", "created_at", "ubuntu_blessing",
+]
+
+# One statement applies every member's summed reward for a chunk
+_APPLY_REWARDS_POSTGRESQL = text(
+    "UPDATE ubuntu_users AS u "
+    "SET flb_balance = u.flb_balance + d.flb, ubuntu_score = u.ubuntu_score + d.score, updated_at = :now "
+    "FROM unnest(CAST(:ids AS integer[]), CAST(:flb AS double precision[]), CAST(:score AS double precision[])) "
+    "AS d(id, flb, score) WHERE u.id = d.id"
+)
+
+_users = UbuntuUser.__table__
+_APPLY_REWARD_SQLITE = _users.update().where(_users.c.id == bindparam("member_id")).values(
+    flb_balance=_users.c.flb_balance + bindparam("flb"),
+    ubuntu_score=_users.c.ubuntu_score + bindparam("score"),
+    updated_at=bindparam("now"),
+)
+
+
+async def _append_ledger(db, entries):
+    """Record a chunk's ledger entries in its transaction: COPY on Postgres, executemany on SQLite"""
+    if entries and db.bind.dialect.name == "postgresql":
+        await copy_records(db, UbuntuTransaction.__tablename__, LEDGER_COLUMNS, entries)
+    else:
+        await append_entries(db, entries)
+
+
+async def _insert_actions(db, rows):
+    if db.bind.dialect.name == "postgresql":
+        await copy_records(db, HealthcareAction.__tablename__, ACTION_COLUMNS, rows)
+    else:
+        await db.execute(HealthcareAction.__table__.insert(), rows)
+
+
+async def _apply_rewards(db, rewards, now):
+    """Add each member's summed FLB and score deltas as in-database increments"""
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(_APPLY_REWARDS_POSTGRESQL, {
+            "ids": list(rewards),
+            "flb": [flb for flb, _ in rewards.values()],
+            "score": [score for _, score in rewards.values()],
+            "now": now,
+        })
+    else:
+        # In-process SQLite has no round trips, so one prepared executemany is just as set-based
+        await db.execute(_APPLY_REWARD_SQLITE, [
+            {"member_id": member_id, "flb": flb, "score": score, "now": now}
+            for member_id, (flb, score) in rewards.items()
+        ])
+
+
+async def _ingest_action_chunk(db, chunk):
+    """Insert one chunk of validated actions and credit their members in a single transaction.
+
+    Returns (chunk_totals, wallets, missing): wallets were credited, missing
+    holds the actions whose member was not found.
+    """
+    wallets = {action.wallet_address for _, action in chunk}
+    result = await db.execute(
+        select(UbuntuUser.wallet_address, UbuntuUser.id, UbuntuUser.role, UbuntuUser.country).where(
+            UbuntuUser.wallet_address.in_(wallets),
+            UbuntuUser.is_active == True
+        )
+    )
+    members = {wallet: (member_id, role, country) for wallet, member_id, role, country in result.all()}
+
+    missing = []
+    now = datetime.utcnow()
+    rows = []
+    entries = []
+    rewards = defaultdict(lambda: [0.0, 0.0])
+    supply = defaultdict(lambda: [0, 0, 0.0])
+    impact = ImpactDeltas()
+    births = 0
+    for index, action in chunk:
+        member = members.get(action.wallet_address)
+        if member is None:
+            missing.append((index, action.wallet_address))
+            continue
+        member_id, role, country = member
+        flb_earned = action_reward(action.impact_score, role)
+        score_boost = action_score_boost(action.impact_score)
+        rows.append({
+            "user_id": member_id,
+            "action_type": action.action_type,
+            "title": action.title,
+            "description": action.description,
+            "location": action.location,
+            "impact_score": action.impact_score,
+            "flb_earned": flb_earned,
+            "verification_status": "pending",
+            "created_at": now,
+            "ubuntu_blessing": f"Ubuntu recognizes your {action.action_type} impact. I am because we are.",
+        })
+        entries.append(ledger_entry(member_id, flb_earned, ACTION_REWARD, now))
+        reward = rewards[member_id]
+        reward[0] += flb_earned
+        reward[1] += score_boost
+        supply[role][2] += flb_earned
+        impact.action(now, country, action.location, flb_earned)
+        births += action.action_type == "birth_verification"
+
+    if not rows:
+        return None, (), missing
+    await _insert_actions(db, rows)
+    await _apply_rewards(db, rewards, now)
+    await _append_ledger(db, entries)
+    await record_supply(db, supply)
+    await record_impact(db, impact)
+    chunk_totals = {
+        "recorded": len(rows),
+        "birth_verifications": births,
+        "flb_earned": sum(flb for flb, _ in rewards.values()),
+        "score_boost": sum(score for _, score in rewards.values()),
+    }
+    await community_metrics.actions_recorded(db, **chunk_totals)
+    await bump_versions(db, ACTIONS, MEMBERS)
+    await db.commit()
+
+    credited = [wallet for wallet, (member_id, _, _) in members.items() if member_id in rewards]
+    return chunk_totals, credited, missing
+
+
+async def _aenumerate(items):
+    index = 0
+    async for item in items:
+        yield index, item
+        index += 1
+
+
+async def ingest_healthcare_actions(db, items, schema, on_chunk=None, chunk_size=BULK_CHUNK_SIZE):
+    """Record a stream of healthcare actions chunk by chunk.
+
+    items is an async iterator of (record, error) pairs such as iter_ndjson,
+    consumed as it arrives so memory stays bounded by chunk_size. Each chunk
+    is one transaction: a set-based member lookup, a bulk insert of the
+    actions, one aggregated balance/score update for the members involved,
+    a bulk insert of the matching ledger entries, and the supply counter,
+    regional rollup and community metrics increments.
+    on_chunk(chunk_totals, wallets) runs after every commit with the wallets
+    that were credited, so callers see committed chunks even if the stream
+    is cut off part way.
+
+    Returns (summary, rejected) where rejected lists at most BULK_MAX_ERRORS
+    failed records; summary["rejected"] counts all of them.
+    """
+    summary = {"received": 0, "recorded": 0, "rejected": 0, "chunks": 0,
+               "birth_verifications": 0, "flb_earned": 0.0, "score_boost": 0.0}
+    rejected = []
+
+    def reject(index, error, wallet_address=None):
+        summary["rejected"] += 1
+        if len(rejected) < BULK_MAX_ERRORS:
+            entry = {"index": index, "error": error}
+            if wallet_address:
+                entry["wallet_address"] = wallet_address
+            rejected.append(entry)
+
+    async def flush(chunk):
+        chunk_totals, wallets, missing = await _ingest_action_chunk(db, chunk)
+        summary["chunks"] += 1
+        for index, wallet_address in missing:
+            reject(index, "Ubuntu member not found", wallet_address)
+        if chunk_totals:
+            for key, value in chunk_totals.items():
+                summary[key] += value
+            if on_chunk:
+                on_chunk(chunk_totals, wallets)
+
+    chunk = []
+    async for index, (record, error) in _aenumerate(items):
+        summary["received"] += 1
+        if error:
+            reject(index, error)
+            continue
+        try:
+            action = schema(**record)
+        except ValidationError as e:
+            reject(index, _validation_error(e), record.get("wallet_address"))
+            continue
+        chunk.append((index, action))
+        if len(chunk) >= chunk_size:
+            await flush(chunk)
+            chunk = []
+    if chunk:
+        await flush(chunk)
+
+    return summary, rejected
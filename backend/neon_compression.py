@@ -0,0 +1,200 @@
+"""
+FlameBorn Response Compression
+gzip and brotli negotiation with a size threshold and a cache of compressed bodies
+"""
+
+import gzip
+import os
+import zlib
+from collections import OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # Bytes; smaller bodies go out as they are
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+COMPRESSION_CACHE_BYTES = int(os.getenv("COMPRESSION_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "image/svg+xml")
+
+
+def negotiate(accept_encoding, brotli_available=brotli is not None):
+    """The encoding to use for an Accept-Encoding header: "br", "gzip" or None"""
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding.strip():
+            accepted[coding.strip()] = quality
+    wildcard = accepted.get("*", 0.0)
+    if brotli_available and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def _is_compressible(headers):
+    content_type = headers.get("content-type", "")
+    return "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressedBodyCache:
+    """Compressed bodies of tagged responses, keyed by URL, ETag and encoding, bounded in bytes (LRU).
+
+    A hit replays the body compressed for the first response with that
+    ETag, so a tagged route's body must be fully determined by its ETag:
+    no per-request timestamps or random figures.
+    """
+
+    def __init__(self, max_bytes=COMPRESSION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes // 4:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = body
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class _StreamCompressor:
+    """Incremental gzip or brotli encoder for responses sent in several body messages"""
+
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._compress, self._finish = self._compressor.process, self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress, self._finish = self._compressor.compress, self._compressor.flush
+
+    def compress(self, chunk, last):
+        data = self._compress(chunk) if chunk else b""
+        return data + self._finish() if last else data
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses for clients that accept gzip or brotli.
+
+    Bodies sent in one message are compressed when they reach minimum_size;
+    streamed bodies are compressed as they flow. A response carrying an
+    ETag is compressed once per URL, tag and encoding, and later identical
+    responses reuse those bytes. Strong ETags are weakened on compressed
+    responses, since the bytes differ from the identity representation.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE, gzip_level=GZIP_LEVEL,
+                 brotli_quality=BROTLI_QUALITY, cache=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = cache if cache is not None else compressed_bodies
+
+    def compress(self, body, encoding):
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is not None:
+                await send({"type": "http.response.body", "body": compressor.compress(body, not more_body),
+                            "more_body": more_body})
+                return
+
+            # First body message: the whole body, or the start of a stream
+            headers = MutableHeaders(raw=list(start.get("headers", [])))
+            compressible = start["status"] >= 200 and start["status"] not in (204, 304) and _is_compressible(headers)
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            if not compressible or encoding is None or (not more_body and len(body) < self.minimum_size):
+                passthrough = True
+                await send({**start, "headers": headers.raw})
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                compressor = _StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+                del headers["content-length"]
+                await send({**start, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": compressor.compress(body, False), "more_body": True})
+                return
+
+            key = (scope["path"], scope.get("query_string", b""), etag, encoding) if etag else None
+            compressed = self.cache.get(key) if key else None
+            if compressed is None:
+                compressed = self.compress(body, encoding)
+                if key:
+                    self.cache.put(key, compressed)
+            headers["Content-Length"] = str(len(compressed))
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+
+compressed_bodies = CompressedBodyCache()
@@ -4,10 +4,15 @@ Ubuntu Philosophy: "I am because we are"
 """
 
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 import logging
 
 # Configure logging
@@ -31,17 +36,106 @@ else:
     DATABASE_URL = LOCAL_DATABASE_URL
     logger.info("🔥 Using SQLite for local FlameBorn development")
 
+# Connection pool configuration
+# DB_POOL_MODE: queue (persistent pool), pgbouncer (transaction-pooling safe), null (connect per checkout)
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "queue").lower()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_SSLMODE = os.getenv("DB_SSLMODE", "require")  # e.g. disable for a local PgBouncer sidecar
+
+class PoolStats:
+    """Checkout wait-time counters for sizing the connection pool"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+    
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "avg_checkout_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_checkout_wait_ms": round(self.max_wait * 1000, 3)
+            }
+
+pool_stats = PoolStats()
+
+class _TimedCheckout:
+    """Pool mixin that times how long callers wait for a connection"""
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - started)
+        return connection
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+def _pool_options(queue_pool_class=TimedQueuePool):
+    """Engine pool keyword arguments for the configured DB_POOL_MODE"""
+    if DB_POOL_MODE == "null":
+        return {"poolclass": TimedNullPool}
+    if DB_POOL_MODE == "pgbouncer":
+        # PgBouncer owns the server connections: keep a small client-side pool,
+        # always ping (bouncer may drop idle clients) and recycle well inside its idle timeout
+        return {
+            "poolclass": queue_pool_class,
+            "pool_size": min(DB_POOL_SIZE, 5),
+            "max_overflow": min(DB_MAX_OVERFLOW, 5),
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": min(DB_POOL_RECYCLE, 300),
+            "pool_pre_ping": True
+        }
+    return {
+        "poolclass": queue_pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING
+    }
+
+POOL_OPTIONS = _pool_options()
+
 # Create engine with Neon-optimized settings
 if DATABASE_URL.startswith("postgresql://"):
     engine = create_engine(
         DATABASE_URL,
-        poolclass=NullPool,  # Neon handles connection pooling
         echo=False,  # Set to True for SQL debugging
         connect_args={
-            "sslmode": "require",
+            "sslmode": DB_SSLMODE,
             "application_name": "flameborn-testnet-ubuntu"
-        }
+        },
+        **POOL_OPTIONS
     )
+    logger.info(f"🔥 Neon connection pool mode: {DB_POOL_MODE}")
 else:
     engine = create_engine(
         DATABASE_URL,
@@ -49,8 +143,45 @@ else:
         connect_args={"check_same_thread": False}
     )
 
-# Create session factory
+# Create async engine (asyncpg for Postgres, aiosqlite for SQLite) used by the API routes
+def _async_database_url():
+    url = make_url(DATABASE_URL)
+    if url.drivername.startswith("postgresql"):
+        # libpq-only parameters are passed to asyncpg through connect_args instead
+        query = {key: value for key, value in url.query.items() if key not in ("sslmode", "channel_binding")}
+        if DB_POOL_MODE == "pgbouncer":
+            query["prepared_statement_cache_size"] = "0"
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    return url.set(drivername="sqlite+aiosqlite")
+
+if DATABASE_URL.startswith("postgresql://"):
+    async_connect_args = {
+        "ssl": DB_SSLMODE,
+        "server_settings": {"application_name": "flameborn-testnet-ubuntu"}
+    }
+    if DB_POOL_MODE == "pgbouncer":
+        # Transaction pooling cannot keep server-side prepared statements between transactions
+        async_connect_args["statement_cache_size"] = 0
+    async_engine = create_async_engine(
+        _async_database_url(),
+        echo=False,
+        connect_args=async_connect_args,
+        **_pool_options(TimedAsyncQueuePool)
+    )
+else:
+    async_engine = create_async_engine(
+        _async_database_url(),
+        echo=True
+    )
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False  # Routes serialize ORM objects after commit
+)
 
 # Create base class for models
 Base = declarative_base()
@@ -63,20 +194,45 @@ def get_database_info():
         "ubuntu_message": "I am because we are - Ubuntu database connection active"
     }
 
+def _describe_pool(pool):
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "pool_size": pool.size(),
+            "max_overflow": POOL_OPTIONS.get("max_overflow"),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow()
+        })
+    return status
+
+def get_pool_status():
+    """Get connection pool usage and checkout wait statistics"""
+    return {
+        "mode": DB_POOL_MODE if DATABASE_URL.startswith("postgresql://") else "sqlite",
+        **pool_stats.snapshot(),
+        "async_pool": _describe_pool(async_engine.pool),
+        "sync_pool": _describe_pool(engine.pool)
+    }
+
 def test_connection():
     """Test database connection"""
     try:
         with engine.connect() as connection:
-            result = connection.execute("SELECT 1 as ubuntu_test")
+            connection.execute(text("SELECT 1 as ubuntu_test"))
             return {"status": "connected", "ubuntu_flame": "burning bright"}
     except Exception as e:
         logger.error(f"Database connection failed: {e}")
         return {"status": "failed", "error": str(e)}
 
-# Dependency for FastAPI
+# Dependencies for FastAPI
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,61 @@
+"""
+FlameBorn Ubuntu Exports
+CSV and NDJSON streamed from a server-side cursor in fixed-size batches
+"""
+
+import csv
+import io
+import logging
+import os
+from datetime import date, datetime
+
+from neon_config import AsyncSessionLocal
+from neon_json import dumps
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))  # Rows fetched and encoded per chunk
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",  # Starlette appends the utf-8 charset
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_batch(rows, columns, export_format):
+    """One chunk of the export for a batch of rows"""
+    if export_format == "ndjson":
+        return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def stream_export(query, export_format, session_factory=AsyncSessionLocal, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the encoded rows of query, holding at most one batch in memory.
+
+    The export runs in its own session, open exactly as long as the
+    stream, and reads through a server-side cursor, so every row comes
+    from one consistent snapshot however long the client takes.
+    """
+    columns = [column.key for column in query.selected_columns]
+    if export_format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(columns)
+        yield buffer.getvalue().encode("utf-8")
+
+    exported = 0
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions(batch_size):
+            exported += len(rows)
+            yield encode_batch(rows, columns, export_format)
+    logger.info(f"📤 Exported {exported} rows as {export_format}")
@@ -0,0 +1,310 @@
+"""
+FlameBorn Validator Heartbeat Storage
+Day-partitioned raw heartbeats with minute/hour rollups and retention
+"""
+
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, Float, Integer, String, column, delete, func, select, table, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from neon_config import AsyncSessionLocal
+from neon_models import ValidatorHeartbeat, ValidatorHeartbeatHour, ValidatorHeartbeatMinute
+
+logger = logging.getLogger(__name__)
+
+# Retention (days) for raw beats and each rollup level
+HEARTBEAT_RETENTION_DAYS = int(os.getenv("HEARTBEAT_RETENTION_DAYS", "7"))
+HEARTBEAT_MINUTE_RETENTION_DAYS = int(os.getenv("HEARTBEAT_MINUTE_RETENTION_DAYS", "30"))
+HEARTBEAT_HOUR_RETENTION_DAYS = int(os.getenv("HEARTBEAT_HOUR_RETENTION_DAYS", "365"))
+HEARTBEAT_PARTITIONS_AHEAD = int(os.getenv("HEARTBEAT_PARTITIONS_AHEAD", "2"))
+HEARTBEAT_MAINTENANCE_INTERVAL = float(os.getenv("HEARTBEAT_MAINTENANCE_INTERVAL", "3600"))
+
+PARENT_TABLE = ValidatorHeartbeat.__tablename__
+_PARTITION_NAME = re.compile(rf"{PARENT_TABLE}_(\d{{8}})")
+PARTITION_LOCK_KEY = 0x464C4248  # pg_advisory_xact_lock key serialising partition DDL across workers
+_RAW_COLUMNS = [
+    ("validator_id", Integer),
+    ("timestamp", DateTime),
+    ("block_height", Integer),
+    ("network_health", Float),
+    ("ubuntu_message", String),
+]
+
+
+def _raw_columns():
+    return [column(name, type_) for name, type_ in _RAW_COLUMNS]
+
+
+def partition_name(day):
+    return f"{PARENT_TABLE}_{day:%Y%m%d}"
+
+
+def _minute(timestamp):
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def _hour(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_rows(heartbeats, truncate):
+    """Aggregate raw heartbeat rows into one rollup row per (validator, bucket)"""
+    buckets = {}
+    for beat in heartbeats:
+        key = (beat["validator_id"], truncate(beat["timestamp"]))
+        rollup = buckets.get(key)
+        if rollup is None:
+            buckets[key] = {
+                "validator_id": key[0],
+                "bucket": key[1],
+                "heartbeats": 1,
+                "network_health_total": beat["network_health"] or 0.0,
+                "max_block_height": beat["block_height"] or 0,
+                "first_heartbeat": beat["timestamp"],
+                "last_heartbeat": beat["timestamp"],
+            }
+            continue
+        rollup["heartbeats"] += 1
+        rollup["network_health_total"] += beat["network_health"] or 0.0
+        rollup["max_block_height"] = max(rollup["max_block_height"], beat["block_height"] or 0)
+        rollup["first_heartbeat"] = min(rollup["first_heartbeat"], beat["timestamp"])
+        rollup["last_heartbeat"] = max(rollup["last_heartbeat"], beat["timestamp"])
+    return list(buckets.values())
+
+
+def _rollup_upsert(dialect, model):
+    """INSERT ... ON CONFLICT that folds a rollup row into an existing bucket"""
+    rollups = model.__table__
+    postgresql = dialect == "postgresql"
+    statement = (postgresql_insert if postgresql else sqlite_insert)(rollups)
+    greatest = func.greatest if postgresql else func.max  # SQLite's multi-argument max() is scalar
+    least = func.least if postgresql else func.min
+    return statement.on_conflict_do_update(
+        index_elements=["validator_id", "bucket"],
+        set_={
+            "heartbeats": rollups.c.heartbeats + statement.excluded.heartbeats,
+            "network_health_total": rollups.c.network_health_total + statement.excluded.network_health_total,
+            "max_block_height": greatest(rollups.c.max_block_height, statement.excluded.max_block_height),
+            "first_heartbeat": least(rollups.c.first_heartbeat, statement.excluded.first_heartbeat),
+            "last_heartbeat": greatest(rollups.c.last_heartbeat, statement.excluded.last_heartbeat),
+        },
+    )
+
+
+class HeartbeatStorage:
+    """Writes raw heartbeats into daily partitions and keeps the rollups current.
+
+    Postgres uses native range partitions of validator_heartbeats; SQLite
+    uses one bucket table per day (validator_heartbeats_YYYYMMDD). Either
+    way retention drops whole days instead of deleting rows. Minute and
+    hour rollups are upserted in the same transaction as the raw rows, so
+    uptime and history reads never scan raw heartbeats.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal,
+                 maintenance_interval=HEARTBEAT_MAINTENANCE_INTERVAL):
+        self.session_factory = session_factory
+        self.maintenance_interval = maintenance_interval
+        self._ready_days = set()  # Days whose partition is known to be committed
+        self._task = None
+
+    # Partitions
+    async def _create_partition(self, db, day):
+        name = partition_name(day)
+        if db.bind.dialect.name == "postgresql":
+            await db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+            ))
+            return
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} ("
+            f"id INTEGER PRIMARY KEY, "
+            f"validator_id INTEGER REFERENCES ubuntu_validators (id), "
+            f"timestamp DATETIME NOT NULL, "
+            f"block_height INTEGER, "
+            f"network_health FLOAT, "
+            f"ubuntu_message VARCHAR)"
+        ))
+        await db.execute(text(
+            f"CREATE INDEX IF NOT EXISTS idx_{name}_validator_time ON {name} (validator_id, timestamp)"
+        ))
+
+    async def _partition_days(self, db):
+        if db.bind.dialect.name == "postgresql":
+            result = await db.execute(text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = CAST(:parent AS regclass)"
+            ), {"parent": PARENT_TABLE})
+        else:
+            result = await db.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+        days = []
+        for (name,) in result:
+            match = _PARTITION_NAME.fullmatch(name)
+            if match:
+                days.append(datetime.strptime(match.group(1), "%Y%m%d").date())
+        return days
+
+    async def ensure_partitions(self, days_ahead=HEARTBEAT_PARTITIONS_AHEAD):
+        """Create today's partition and the next days_ahead ones"""
+        today = datetime.utcnow().date()
+        days = [today + timedelta(days=offset) for offset in range(days_ahead + 1)]
+        async with self.session_factory() as db:
+            if db.bind.dialect.name == "postgresql":
+                # Concurrent CREATE TABLE IF NOT EXISTS from several workers can still collide
+                await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+            for day in days:
+                await self._create_partition(db, day)
+            await db.commit()
+        self._ready_days.update(days)
+
+    def _raw_table(self, dialect, day):
+        if dialect == "postgresql":
+            return ValidatorHeartbeat.__table__  # Postgres routes rows to the partition
+        return table(partition_name(day), *_raw_columns())
+
+    # Writes
+    async def write(self, db, heartbeats):
+        """Insert raw heartbeat rows and fold them into the rollups (caller commits)"""
+        if not heartbeats:
+            return
+        dialect = db.bind.dialect.name
+        by_day = {}
+        for beat in heartbeats:
+            by_day.setdefault(beat["timestamp"].date(), []).append(beat)
+        for day, beats in by_day.items():
+            if day not in self._ready_days:
+                # Outside the pre-created window: create it in this transaction
+                await self._create_partition(db, day)
+            await db.execute(self._raw_table(dialect, day).insert(), beats)
+
+        await db.execute(_rollup_upsert(dialect, ValidatorHeartbeatMinute), rollup_rows(heartbeats, _minute))
+        await db.execute(_rollup_upsert(dialect, ValidatorHeartbeatHour), rollup_rows(heartbeats, _hour))
+
+    # Retention
+    async def apply_retention(self):
+        """Drop expired raw partitions and delete expired rollup buckets"""
+        now = datetime.utcnow()
+        oldest_day = (now - timedelta(days=HEARTBEAT_RETENTION_DAYS)).date()
+        async with self.session_factory() as db:
+            try:
+                dropped = 0
+                for day in await self._partition_days(db):
+                    if day < oldest_day:
+                        await db.execute(text(f"DROP TABLE IF EXISTS {partition_name(day)}"))
+                        self._ready_days.discard(day)
+                        dropped += 1
+                await db.execute(delete(ValidatorHeartbeatMinute).where(
+                    ValidatorHeartbeatMinute.bucket < now - timedelta(days=HEARTBEAT_MINUTE_RETENTION_DAYS)
+                ))
+                await db.execute(delete(ValidatorHeartbeatHour).where(
+                    ValidatorHeartbeatHour.bucket < now - timedelta(days=HEARTBEAT_HOUR_RETENTION_DAYS)
+                ))
+                await db.commit()
+                if dropped:
+                    logger.info(f"Heartbeat retention dropped {dropped} daily partitions")
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Heartbeat retention failed: {e}")
+
+    # Migration from the original single heartbeat table
+    async def _legacy_rows(self, db, source):
+        cutoff = datetime.utcnow() - timedelta(days=HEARTBEAT_RETENTION_DAYS)
+        result = await db.stream(
+            select(*_raw_columns())
+            .select_from(table(source))
+            .where(column("timestamp", DateTime) >= cutoff)
+            .execution_options(yield_per=5000)
+        )
+        try:
+            async for rows in result.mappings().partitions():
+                yield [dict(row) for row in rows]
+        finally:
+            await result.close()
+
+    @staticmethod
+    async def _pg_layout(db, legacy):
+        # relkind of the parent ("r" plain, "p" partitioned) and whether a legacy copy exists
+        return (await db.execute(text(
+            "SELECT CAST(relkind AS text), to_regclass(:legacy) IS NOT NULL "
+            "FROM pg_class WHERE oid = CAST(:parent AS regclass)"
+        ), {"parent": PARENT_TABLE, "legacy": legacy})).one()
+
+    async def migrate_legacy(self):
+        """Move recent rows of an unpartitioned validator_heartbeats table into the partitioned layout"""
+        async with self.session_factory() as db:
+            if db.bind.dialect.name == "postgresql":
+                legacy = f"{PARENT_TABLE}_legacy"
+                # Checked without a lock, since every boot after the first finds the table partitioned
+                relkind, leftover = await self._pg_layout(db, legacy)
+                if relkind != "r":
+                    if leftover:
+                        # Left behind if a previous migration committed but stopped before cleaning up
+                        await db.execute(text(f"DROP TABLE IF EXISTS {legacy}"))
+                        await db.commit()
+                    return
+                await db.execute(text(f"LOCK TABLE {PARENT_TABLE} IN ACCESS EXCLUSIVE MODE"))
+                # Another worker may have migrated the table while this one waited for the lock
+                relkind, _ = await self._pg_layout(db, legacy)
+                if relkind != "r":
+                    await db.rollback()
+                    return
+                await db.execute(text(f"DROP TABLE IF EXISTS {legacy}"))
+                # Keep only beats inside the retention window, then rebuild the parent as partitioned
+                columns = ", ".join(name for name, _ in _RAW_COLUMNS)
+                await db.execute(text(
+                    f"CREATE TABLE {legacy} AS SELECT {columns} FROM {PARENT_TABLE} WHERE timestamp >= :cutoff"
+                ), {"cutoff": datetime.utcnow() - timedelta(days=HEARTBEAT_RETENTION_DAYS)})
+                await db.execute(text(f"DROP TABLE {PARENT_TABLE}"))
+                connection = await db.connection()
+                await connection.run_sync(lambda sync_connection: ValidatorHeartbeat.__table__.create(sync_connection))
+            else:
+                legacy = PARENT_TABLE
+                if (await db.execute(text(f"SELECT 1 FROM {PARENT_TABLE} LIMIT 1"))).first() is None:
+                    return
+
+            moved = 0
+            async for heartbeats in self._legacy_rows(db, legacy):
+                await self.write(db, heartbeats)
+                moved += len(heartbeats)
+            if db.bind.dialect.name != "postgresql":
+                await db.execute(text(f"DELETE FROM {PARENT_TABLE}"))
+            await db.commit()
+            if db.bind.dialect.name == "postgresql":
+                # The copy's read cursor pins the legacy table until its transaction ends
+                await db.execute(text(f"DROP TABLE {legacy}"))
+                await db.commit()
+            logger.info(f"🔥 Moved {moved} heartbeats into daily partitions")
+
+    # Lifecycle
+    async def run(self):
+        """Background loop: keep partitions ahead of time and enforce retention"""
+        while True:
+            await asyncio.sleep(self.maintenance_interval)
+            try:
+                await self.ensure_partitions()
+            except Exception as e:
+                logger.error(f"Heartbeat partition maintenance failed: {e}")
+            await self.apply_retention()
+
+    async def start(self):
+        """Migrate any legacy table, prepare partitions and start maintenance"""
+        await self.migrate_legacy()
+        await self.ensure_partitions()
+        await self.apply_retention()
+        self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+heartbeat_storage = HeartbeatStorage()
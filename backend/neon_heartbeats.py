@@ -0,0 +1,263 @@
+"""
+FlameBorn Validator Heartbeat Buffer
+Acknowledges validator heartbeats in memory and writes them in batches
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+from datetime import datetime
+
+from sqlalchemy import bindparam, select
+
+from neon_config import AsyncSessionLocal
+from neon_heartbeat_storage import heartbeat_storage
+from neon_instrumentation import background_task
+from neon_metrics import community_metrics
+from neon_models import UbuntuUser, UbuntuValidator
+from neon_versions import VALIDATORS, bump_versions
+
+logger = logging.getLogger(__name__)
+
+# Heartbeats held in memory for at most this long (seconds) or this many beats
+HEARTBEAT_FLUSH_INTERVAL = float(os.getenv("HEARTBEAT_FLUSH_INTERVAL", "1"))
+HEARTBEAT_MAX_PENDING = int(os.getenv("HEARTBEAT_MAX_PENDING", "5000"))
+
+# Progress credited per heartbeat
+UPTIME_STEP = 0.1
+CONSENSUS_STEP = 0.5
+
+_validators = UbuntuValidator.__table__
+_UPDATE_VALIDATOR = _validators.update().where(_validators.c.id == bindparam("validator_id")).values(
+    uptime_percentage=bindparam("uptime_percentage"),
+    ubuntu_consensus_score=bindparam("ubuntu_consensus_score"),
+    total_blocks_validated=bindparam("total_blocks_validated"),
+    last_heartbeat=bindparam("last_heartbeat"),
+)
+
+
+class ValidatorPulse:
+    """This worker's view of one validator's heartbeat counters"""
+
+    __slots__ = ("validator_id", "uptime_percentage", "ubuntu_consensus_score",
+                 "total_blocks_validated", "last_heartbeat")
+
+    def __init__(self, validator_id, uptime_percentage, ubuntu_consensus_score,
+                 total_blocks_validated, last_heartbeat):
+        self.validator_id = validator_id
+        self.uptime_percentage = uptime_percentage or 0.0
+        self.ubuntu_consensus_score = ubuntu_consensus_score or 0.0
+        self.total_blocks_validated = total_blocks_validated or 0
+        self.last_heartbeat = last_heartbeat
+
+    def advance(self, beats, last_heartbeat):
+        """Credit beats heartbeats, capping uptime and consensus at 100"""
+        self.uptime_percentage = min(100.0, self.uptime_percentage + UPTIME_STEP * beats)
+        self.ubuntu_consensus_score = min(100.0, self.ubuntu_consensus_score + CONSENSUS_STEP * beats)
+        self.total_blocks_validated += beats
+        if self.last_heartbeat is None or last_heartbeat > self.last_heartbeat:
+            self.last_heartbeat = last_heartbeat
+
+
+class HeartbeatBuffer:
+    """Coalesces validator heartbeats into one batched write per flush.
+
+    record() answers from a per-worker wallet -> validator cache and queues
+    the beat; the background loop inserts queued heartbeat rows and updates
+    each validator's counters once per flush. Counters are recomputed from
+    the locked database row at flush time, so several workers can buffer
+    beats for the same validator without losing each other's progress.
+    A crash loses at most HEARTBEAT_FLUSH_INTERVAL seconds (or
+    HEARTBEAT_MAX_PENDING beats) of heartbeats. Flushes run one at a time;
+    while the database is unreachable, failed batches are kept up to
+    max_pending beats and the oldest are dropped beyond that.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal,
+                 flush_interval=HEARTBEAT_FLUSH_INTERVAL,
+                 max_pending=HEARTBEAT_MAX_PENDING):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pulses = {}   # wallet_address -> ValidatorPulse
+        self._pending = {}  # validator_id -> [(timestamp, block_height, network_health)]
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()  # One flush at a time, so counter read-modify-writes never overlap
+        self._flushing = None  # Overflow flush task; cleared only by that task
+        self._task = None
+
+    async def validator_pulse(self, db, wallet_address):
+        """Cached pulse for a validator wallet, loaded on first use; None if not a validator"""
+        pulse = self._pulses.get(wallet_address)
+        if pulse is None:
+            # Unknown wallets are not cached, so a validator registered moments ago is found
+            pulse = await self._load_pulse(db, wallet_address)
+            if pulse is not None:
+                pulse = self._pulses.setdefault(wallet_address, pulse)
+        return pulse
+
+    async def _load_pulse(self, db, wallet_address):
+        result = await db.execute(
+            select(
+                UbuntuValidator.id,
+                UbuntuValidator.uptime_percentage,
+                UbuntuValidator.ubuntu_consensus_score,
+                UbuntuValidator.total_blocks_validated,
+                UbuntuValidator.last_heartbeat,
+            )
+            .join(UbuntuUser, UbuntuUser.id == UbuntuValidator.user_id)
+            .where(UbuntuUser.wallet_address == wallet_address, UbuntuUser.is_validator == True)
+        )
+        row = result.first()
+        return ValidatorPulse(*row) if row else None
+
+    async def record(self, db, wallet_address):
+        """Queue a heartbeat and return the validator's updated pulse, or None if unknown"""
+        pulse = await self.validator_pulse(db, wallet_address)
+        if pulse is None:
+            return None
+
+        now = datetime.utcnow()
+        with self._lock:
+            self._pending.setdefault(pulse.validator_id, []).append(
+                (now, random.randint(15000, 20000), random.uniform(95.0, 99.9))
+            )
+            self._pending_count += 1
+            pulse.advance(1, now)
+            overflowing = self._pending_count >= self.max_pending
+        if overflowing and self._flushing is None:
+            self._flushing = background_task(self._flush_overflow())
+        return pulse
+
+    async def _flush_overflow(self):
+        try:
+            await self.flush()
+        finally:
+            self._flushing = None
+
+    async def flush(self):
+        """Write queued heartbeats and the resulting validator counters in one transaction"""
+        async with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_count = 0
+            if pending:
+                await self._write(pending)
+
+    async def _write(self, pending):
+        async with self.session_factory() as db:
+            try:
+                result = await db.execute(
+                    select(
+                        UbuntuValidator.id,
+                        UbuntuValidator.uptime_percentage,
+                        UbuntuValidator.ubuntu_consensus_score,
+                        UbuntuValidator.total_blocks_validated,
+                        UbuntuValidator.last_heartbeat,
+                    )
+                    .where(UbuntuValidator.id.in_(list(pending)))
+                    .with_for_update()
+                )
+                stored = {row.id: ValidatorPulse(*row) for row in result}
+
+                heartbeats = []
+                counters = []
+                uptime_delta = consensus_delta = 0.0
+                for validator_id, beats in pending.items():
+                    pulse = stored.get(validator_id)
+                    if pulse is None:
+                        continue
+                    previous_uptime = pulse.uptime_percentage
+                    previous_consensus = pulse.ubuntu_consensus_score
+                    pulse.advance(len(beats), max(timestamp for timestamp, _, _ in beats))
+                    uptime_delta += pulse.uptime_percentage - previous_uptime
+                    consensus_delta += pulse.ubuntu_consensus_score - previous_consensus
+                    counters.append({
+                        "validator_id": validator_id,
+                        "uptime_percentage": pulse.uptime_percentage,
+                        "ubuntu_consensus_score": pulse.ubuntu_consensus_score,
+                        "total_blocks_validated": pulse.total_blocks_validated,
+                        "last_heartbeat": pulse.last_heartbeat,
+                    })
+                    heartbeats.extend(
+                        {
+                            "validator_id": validator_id,
+                            "timestamp": timestamp,
+                            "block_height": block_height,
+                            "network_health": network_health,
+                            "ubuntu_message": "I am because we are - Ubuntu consensus active",
+                        }
+                        for timestamp, block_height, network_health in beats
+                    )
+
+                if heartbeats:
+                    await heartbeat_storage.write(db, heartbeats)
+                    await db.execute(_UPDATE_VALIDATOR, counters)
+                    await community_metrics.validator_heartbeat(db, uptime_delta, consensus_delta)
+                    await bump_versions(db, VALIDATORS)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                self._requeue(pending)
+                logger.error(f"Validator heartbeat flush failed: {e}")
+                return
+
+        self._resync(stored)
+
+    def _requeue(self, pending):
+        """Put a failed batch back ahead of newer beats, keeping only the newest max_pending"""
+        with self._lock:
+            for validator_id, beats in pending.items():
+                self._pending[validator_id] = beats + self._pending.get(validator_id, [])
+                self._pending_count += len(beats)
+            excess = self._pending_count - self.max_pending
+            if excess > 0:
+                queued = sorted(
+                    ((beat, validator_id) for validator_id, beats in self._pending.items() for beat in beats),
+                    key=lambda item: item[0][0]
+                )
+                self._pending = {}
+                for beat, validator_id in queued[excess:]:
+                    self._pending.setdefault(validator_id, []).append(beat)
+                self._pending_count = len(queued) - excess
+        if excess > 0:
+            logger.warning(f"Heartbeat buffer full while writes fail; dropped the {excess} oldest heartbeats")
+
+    def _resync(self, stored):
+        """Adopt the counters just written (including other workers' beats) plus anything queued since"""
+        with self._lock:
+            for pulse in self._pulses.values():
+                fresh = stored.get(pulse.validator_id)
+                if fresh is None:
+                    continue
+                pulse.uptime_percentage = fresh.uptime_percentage
+                pulse.ubuntu_consensus_score = fresh.ubuntu_consensus_score
+                pulse.total_blocks_validated = fresh.total_blocks_validated
+                pulse.last_heartbeat = fresh.last_heartbeat
+                queued = self._pending.get(pulse.validator_id)
+                if queued:
+                    pulse.advance(len(queued), max(timestamp for timestamp, _, _ in queued))
+
+    async def run(self):
+        """Background loop: flush queued heartbeats every flush_interval"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self):
+        self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        """Cancel the background loop and write what is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._flushing is not None:
+            await self._flushing
+        await self.flush()
+
+
+heartbeat_buffer = HeartbeatBuffer()
@@ -0,0 +1,270 @@
+"""
+FlameBorn SQL Instrumentation
+Per-request statement counts, DB time and N+1 detection in Prometheus text format
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import Context, ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SQL_NPLUS1_THRESHOLD = int(os.getenv("SQL_NPLUS1_THRESHOLD", "5"))  # Same statement shape this often in one request
+SQL_SLOW_STATEMENT_MS = float(os.getenv("SQL_SLOW_STATEMENT_MS", "100"))
+SQL_DEBUG_HEADER = os.getenv("SQL_DEBUG_HEADER", "false").lower() in ("1", "true", "yes")
+SQL_TRACKED_SHAPES = int(os.getenv("SQL_TRACKED_SHAPES", "500"))
+
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DEBUG_HEADER = b"x-flameborn-sql"
+
+_PLACEHOLDER = r"(?:\?|\$\d+|%s|%\(\w+\)s)"
+_PLACEHOLDER_LIST = re.compile(rf"{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+")
+_WHITESPACE = re.compile(r"\s+")
+
+_current_request = ContextVar("flameborn_sql_request", default=None)
+
+
+def background_task(coro):
+    """Start coro as a task in an empty context, so its SQL is not counted against the request that spawned it"""
+    return Context().run(asyncio.ensure_future, coro)
+
+
+def statement_shape(statement):
+    """Statement text with whitespace and placeholder lists collapsed, so IN (...) sizes match"""
+    return _PLACEHOLDER_LIST.sub("?, ...", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class RequestSqlStats:
+    """Statements issued while serving one request"""
+
+    __slots__ = ("statements", "seconds", "shapes", "slowest")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.slowest = []  # Min-heap of (seconds, shape), at most 3 entries
+
+    def record(self, shape, seconds):
+        self.statements += 1
+        self.seconds += seconds
+        self.shapes[shape] += 1
+        if len(self.slowest) < 3:
+            heapq.heappush(self.slowest, (seconds, shape))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, shape))
+
+    def repeated(self, threshold=SQL_NPLUS1_THRESHOLD):
+        """Statement shapes issued at least threshold times: likely N+1 access"""
+        return [(shape, count) for shape, count in self.shapes.items() if count >= threshold]
+
+    def header(self, threshold=SQL_NPLUS1_THRESHOLD):
+        slowest = max(self.slowest)[0] * 1000 if self.slowest else 0.0
+        return (f"statements={self.statements}; db_ms={self.seconds * 1000:.2f}; "
+                f"slowest_ms={slowest:.2f}; repeated={len(self.repeated(threshold))}")
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "observations")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.observations = 0
+
+    def observe(self, value):
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+        self.total += value
+        self.observations += 1
+
+    def render(self, name, labels):
+        lines = [
+            f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+            for bound, count in zip(self.buckets, self.counts)
+        ]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.observations}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.observations}")
+        return lines
+
+
+class _RouteStats:
+    __slots__ = ("statements", "seconds", "nplus1")
+
+    def __init__(self):
+        self.statements = _Histogram(STATEMENT_BUCKETS)
+        self.seconds = _Histogram(SECONDS_BUCKETS)
+        self.nplus1 = 0
+
+
+class SqlInstrumentation:
+    """SQLAlchemy cursor hooks that attribute every statement to the current request.
+
+    The request is tracked in a context variable set by SqlStatsMiddleware,
+    which async sessions carry into their greenlets; statements issued
+    outside a request (background maintainers) are counted separately.
+    Counters are per worker, like any Prometheus client, and are summed
+    by the scraper.
+    """
+
+    def __init__(self, nplus1_threshold=SQL_NPLUS1_THRESHOLD, slow_statement_ms=SQL_SLOW_STATEMENT_MS,
+                 tracked_shapes=SQL_TRACKED_SHAPES):
+        self.nplus1_threshold = nplus1_threshold
+        self.slow_statement_seconds = slow_statement_ms / 1000
+        self.tracked_shapes = tracked_shapes
+        self._routes = {}
+        self._shapes = {}  # shape -> [count, total seconds, max seconds]
+        self._background_statements = 0
+        self._background_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def instrument(self, *engines):
+        """Attach the cursor hooks to sync or async engines"""
+        for engine in engines:
+            engine = getattr(engine, "sync_engine", engine)
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("flameborn_sql_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["flameborn_sql_started"].pop()
+        shape = statement_shape(statement)
+        stats = _current_request.get()
+        with self._lock:
+            if stats is not None:
+                stats.record(shape, seconds)
+            else:
+                self._background_statements += 1
+                self._background_seconds += seconds
+            totals = self._shapes.get(shape)
+            if totals is None and len(self._shapes) < self.tracked_shapes:
+                totals = self._shapes[shape] = [0, 0.0, 0.0]
+            if totals is not None:
+                totals[0] += 1
+                totals[1] += seconds
+                totals[2] = max(totals[2], seconds)
+        if seconds >= self.slow_statement_seconds:
+            logger.warning(f"Slow SQL ({seconds * 1000:.1f}ms): {shape[:200]}")
+
+    # Requests
+    def begin_request(self):
+        stats = RequestSqlStats()
+        return stats, _current_request.set(stats)
+
+    def end_request(self, route, stats, token):
+        _current_request.reset(token)
+        repeated = stats.repeated(self.nplus1_threshold)
+        with self._lock:
+            route_stats = self._routes.get(route)
+            if route_stats is None:
+                route_stats = self._routes[route] = _RouteStats()
+            route_stats.statements.observe(stats.statements)
+            route_stats.seconds.observe(stats.seconds)
+            if repeated:
+                route_stats.nplus1 += 1
+        for shape, count in repeated:
+            logger.warning(f"Possible N+1 on {route}: {count}x {shape[:200]}")
+
+    # Exposition
+    def render(self, top_statements=20):
+        """Prometheus text exposition of the SQL counters"""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            shapes = sorted(self._shapes.items(), key=lambda item: item[1][1], reverse=True)[:top_statements]
+            lines = [
+                "# HELP flameborn_sql_statements_per_request SQL statements issued per HTTP request",
+                "# TYPE flameborn_sql_statements_per_request histogram",
+            ]
+            for route, route_stats in routes:
+                lines += route_stats.statements.render("flameborn_sql_statements_per_request", f'route="{_label(route)}"')
+            lines += [
+                "# HELP flameborn_sql_seconds_per_request Database time spent per HTTP request",
+                "# TYPE flameborn_sql_seconds_per_request histogram",
+            ]
+            for route, route_stats in routes:
+                lines += route_stats.seconds.render("flameborn_sql_seconds_per_request", f'route="{_label(route)}"')
+            lines += [
+                "# HELP flameborn_sql_nplus1_requests_total Requests repeating one statement shape at least the N+1 threshold",
+                "# TYPE flameborn_sql_nplus1_requests_total counter",
+            ]
+            lines += [
+                f'flameborn_sql_nplus1_requests_total{{route="{_label(route)}"}} {route_stats.nplus1}'
+                for route, route_stats in routes
+            ]
+            lines += [
+                "# HELP flameborn_sql_background_statements_total Statements issued outside HTTP requests",
+                "# TYPE flameborn_sql_background_statements_total counter",
+                f"flameborn_sql_background_statements_total {self._background_statements}",
+                "# HELP flameborn_sql_background_seconds_total Database time spent outside HTTP requests",
+                "# TYPE flameborn_sql_background_seconds_total counter",
+                f"flameborn_sql_background_seconds_total {self._background_seconds}",
+                "# HELP flameborn_sql_statement_seconds_total Database time per statement shape (top by total time)",
+                "# TYPE flameborn_sql_statement_seconds_total counter",
+            ]
+            for shape, (_, total, _) in shapes:
+                lines.append(f'flameborn_sql_statement_seconds_total{{statement="{_label(shape[:200])}"}} {total}')
+            lines += [
+                "# HELP flameborn_sql_statement_executions_total Executions per statement shape (top by total time)",
+                "# TYPE flameborn_sql_statement_executions_total counter",
+            ]
+            for shape, (count, _, _) in shapes:
+                lines.append(f'flameborn_sql_statement_executions_total{{statement="{_label(shape[:200])}"}} {count}')
+            lines += [
+                "# HELP flameborn_sql_statement_max_seconds Slowest execution per statement shape (top by total time)",
+                "# TYPE flameborn_sql_statement_max_seconds gauge",
+            ]
+            for shape, (_, _, slowest) in shapes:
+                lines.append(f'flameborn_sql_statement_max_seconds{{statement="{_label(shape[:200])}"}} {slowest}')
+        return "\n".join(lines) + "\n"
+
+
+class SqlStatsMiddleware:
+    """ASGI middleware that scopes SQL statistics to each HTTP request.
+
+    With debug_header set, responses carry an X-FlameBorn-SQL header with
+    the request's statement count, DB time and repeated-shape count.
+    """
+
+    def __init__(self, app, instrumentation=None, debug_header=SQL_DEBUG_HEADER):
+        self.app = app
+        self.instrumentation = instrumentation or sql_instrumentation
+        self.debug_header = debug_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats, token = self.instrumentation.begin_request()
+
+        async def send_with_stats(message):
+            if self.debug_header and message["type"] == "http.response.start":
+                header = stats.header(self.instrumentation.nplus1_threshold).encode()
+                message = {**message, "headers": [*message.get("headers", []), (DEBUG_HEADER, header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            route = scope.get("route")
+            self.instrumentation.end_request(getattr(route, "path", "unmatched"), stats, token)
+
+
+sql_instrumentation = SqlInstrumentation()
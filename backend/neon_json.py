@@ -0,0 +1,64 @@
+"""
+FlameBorn Ubuntu JSON
+Fast response encoding with orjson, falling back to the standard library when it is not installed
+"""
+
+import json
+import os
+from datetime import date, datetime
+
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # Optional: responses are encoded with the json module instead
+    orjson = None
+
+# Encode list pages straight from database rows, skipping response_model validation and jsonable_encoder
+FAST_JSON = os.getenv("FAST_JSON", "true").lower() in ("1", "true", "yes") and orjson is not None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    """JSON bytes for content; datetimes and dates become ISO 8601 strings"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is available"""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def encoded_response(body, headers=None):
+    """Response for JSON bytes serialized ahead of time"""
+    return Response(body, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+def respond(content, headers=None):
+    """Content encoded directly when FAST_JSON is on, else left to FastAPI's validation and encoding.
+
+    Content must already be plain JSON data (dicts of row values), shaped
+    like the route's response_model. headers carries what dependencies set
+    on the injected Response, which FastAPI does not copy onto a returned one.
+    """
+    if not FAST_JSON:
+        return content
+    return FastJSONResponse(content, headers=headers)
+
+
+def schema_columns(schema, model):
+    """The model's columns named by a response schema's fields, for selecting rows shaped like it"""
+    return [getattr(model, field) for field in schema.__fields__]
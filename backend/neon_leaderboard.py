@@ -0,0 +1,243 @@
+"""
+FlameBorn Ubuntu Leaderboard
+Member rankings by Ubuntu score or FLB balance with in-memory rank lookup
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from sqlalchemy import desc, func, or_, select
+
+from neon_config import AsyncSessionLocal
+from neon_models import UbuntuUser
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_REFRESH_INTERVAL = float(os.getenv("LEADERBOARD_REFRESH_INTERVAL", "2"))
+# Re-read rows updated this long before the last refresh, so late commits are not missed
+LEADERBOARD_REFRESH_OVERLAP = float(os.getenv("LEADERBOARD_REFRESH_OVERLAP", "10"))
+
+LEADERBOARD_METRICS = ("ubuntu_score", "flb_balance")
+
+_BLOCK_SIZE = 1000
+
+
+class OrderStatistics:
+    """Sorted multiset of floats with logarithmic rank queries.
+
+    Values live in sorted blocks of about _BLOCK_SIZE entries. A Fenwick
+    tree over block lengths turns "how many values sort before x" into a
+    bisect over block maxima, a prefix sum and a bisect inside one block.
+    """
+
+    def __init__(self, values=()):
+        values = sorted(values)
+        self._blocks = [values[start:start + _BLOCK_SIZE] for start in range(0, len(values), _BLOCK_SIZE)]
+        self._rebuild()
+
+    def _rebuild(self):
+        self._maxes = [block[-1] for block in self._blocks]
+        self._tree = [0] * (len(self._blocks) + 1)
+        for position, block in enumerate(self._blocks):
+            self._update(position, len(block))
+        self._length = sum(len(block) for block in self._blocks)
+
+    def _update(self, position, delta):
+        position += 1
+        while position < len(self._tree):
+            self._tree[position] += delta
+            position += position & -position
+
+    def _prefix(self, position):
+        """Number of values in blocks before position"""
+        total = 0
+        while position > 0:
+            total += self._tree[position]
+            position -= position & -position
+        return total
+
+    def __len__(self):
+        return self._length
+
+    def add(self, value):
+        if not self._blocks:
+            self._blocks = [[value]]
+            self._rebuild()
+            return
+        position = min(bisect_left(self._maxes, value), len(self._blocks) - 1)
+        block = self._blocks[position]
+        insort(block, value)
+        self._maxes[position] = block[-1]
+        self._length += 1
+        if len(block) > 2 * _BLOCK_SIZE:
+            self._blocks[position:position + 1] = [block[:_BLOCK_SIZE], block[_BLOCK_SIZE:]]
+            self._rebuild()
+        else:
+            self._update(position, 1)
+
+    def remove(self, value):
+        """Remove one occurrence of value; ValueError if absent"""
+        position = bisect_left(self._maxes, value)
+        if position == len(self._blocks):
+            raise ValueError(f"{value} not in order statistics")
+        block = self._blocks[position]
+        index = bisect_left(block, value)
+        if index == len(block) or block[index] != value:
+            raise ValueError(f"{value} not in order statistics")
+        del block[index]
+        self._length -= 1
+        if not block:
+            del self._blocks[position]
+            self._rebuild()
+            return
+        self._maxes[position] = block[-1]
+        self._update(position, -1)
+
+    def count_below(self, value):
+        """Number of stored values strictly less than value"""
+        position = bisect_left(self._maxes, value)
+        if position == len(self._blocks):
+            return self._length
+        return self._prefix(position) + bisect_left(self._blocks[position], value)
+
+
+class Leaderboard:
+    """Per-worker rank index over active members, synced from ubuntu_users.
+
+    Ranks use standard competition ranking (ties share a rank): a member's
+    rank is one plus the number of active members with a strictly higher
+    value. Values are stored negated so higher values sort first. A
+    background refresh re-reads members updated since the last pass (or
+    newly inserted), so writes from every worker reach every index within
+    about LEADERBOARD_REFRESH_INTERVAL seconds.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal,
+                 refresh_interval=LEADERBOARD_REFRESH_INTERVAL, overlap=LEADERBOARD_REFRESH_OVERLAP):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.overlap = timedelta(seconds=overlap)
+        self._members = {}  # member id -> (ubuntu_score, flb_balance)
+        self._indexes = {metric: OrderStatistics() for metric in LEADERBOARD_METRICS}
+        self._synced_at = None
+        self._max_id = 0
+        self._lock = threading.Lock()
+        self._task = None
+        self.loaded = False
+
+    def _apply(self, member_id, values, is_active):
+        previous = self._members.pop(member_id, None)
+        if previous is not None:
+            for metric, value in zip(LEADERBOARD_METRICS, previous):
+                self._indexes[metric].remove(-value)
+        if is_active:
+            self._members[member_id] = values
+            for metric, value in zip(LEADERBOARD_METRICS, values):
+                self._indexes[metric].add(-value)
+
+    async def load(self):
+        """Build the indexes from every active member"""
+        started = datetime.utcnow()
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(UbuntuUser.id, UbuntuUser.ubuntu_score, UbuntuUser.flb_balance)
+                .where(UbuntuUser.is_active == True)
+            )
+            rows = result.all()
+            max_id = (await db.execute(select(func.max(UbuntuUser.id)))).scalar() or 0
+        members = {member_id: (score or 0.0, balance or 0.0) for member_id, score, balance in rows}
+        indexes = {
+            metric: OrderStatistics(-values[position] for values in members.values())
+            for position, metric in enumerate(LEADERBOARD_METRICS)
+        }
+        with self._lock:
+            self._members, self._indexes = members, indexes
+            self._max_id = max_id
+            self._synced_at = started
+            self.loaded = True
+        logger.info(f"🏆 Ubuntu leaderboard indexed {len(members)} members")
+
+    async def refresh(self):
+        """Apply members changed or added since the last pass"""
+        if not self.loaded:
+            return
+        started = datetime.utcnow()
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(UbuntuUser.id, UbuntuUser.ubuntu_score, UbuntuUser.flb_balance, UbuntuUser.is_active)
+                .where(or_(UbuntuUser.updated_at >= self._synced_at - self.overlap, UbuntuUser.id > self._max_id))
+            )
+            rows = result.all()
+        with self._lock:
+            for member_id, score, balance, is_active in rows:
+                self._apply(member_id, (score or 0.0, balance or 0.0), is_active)
+                self._max_id = max(self._max_id, member_id)
+            self._synced_at = started
+
+    def rank(self, member_id, metric):
+        """(rank, value, members ranked) from the index, or None if the member is not indexed yet"""
+        with self._lock:
+            values = self._members.get(member_id)
+            if values is None:
+                return None
+            value = values[LEADERBOARD_METRICS.index(metric)]
+            index = self._indexes[metric]
+            return index.count_below(-value) + 1, value, len(index)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "members": len(self._members),
+                "synced_at": self._synced_at.isoformat() if self._synced_at else None,
+            }
+
+    async def run(self):
+        """Background loop: pick up member changes every refresh interval"""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Leaderboard refresh failed: {e}")
+
+    async def start(self):
+        """Index every member and start the refresh loop"""
+        await self.load()
+        self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def leaderboard_query(metric, role=None, country=None, limit=10):
+    """Top active members by metric, read in order from the leaderboard indexes without sorting"""
+    column = getattr(UbuntuUser, metric)
+    query = select(UbuntuUser).where(UbuntuUser.is_active == True)
+    if role:
+        query = query.where(UbuntuUser.role == role)
+    if country:
+        query = query.where(UbuntuUser.country == country)
+    return query.order_by(desc(column), UbuntuUser.id).limit(limit)
+
+
+async def count_rank(db, member_id, metric):
+    """(rank, value, members ranked) by counting everyone ahead, for members not indexed yet"""
+    column = getattr(UbuntuUser, metric)
+    value = (await db.execute(select(column).where(UbuntuUser.id == member_id))).scalar() or 0.0
+    ahead = (await db.execute(
+        select(func.count()).select_from(UbuntuUser).where(UbuntuUser.is_active == True, column > value)
+    )).scalar()
+    ranked = (await db.execute(
+        select(func.count()).select_from(UbuntuUser).where(UbuntuUser.is_active == True)
+    )).scalar()
+    return ahead + 1, value, ranked
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,279 @@
+"""
+FlameBorn Ubuntu Ledger
+Append-only record of every FLB balance change, with periodic balance checkpoints
+"""
+
+import asyncio
+import logging
+import os
+import secrets
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, desc, func, literal, select, text, true, union_all, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from neon_config import AsyncSessionLocal
+from neon_models import LedgerCheckpoint, MemberBalanceCheckpoint, UbuntuTransaction, UbuntuUser
+from neon_versions import MEMBERS, bump_versions
+
+logger = logging.getLogger(__name__)
+
+LEDGER_CHECKPOINT_INTERVAL = float(os.getenv("LEDGER_CHECKPOINT_INTERVAL", "300"))
+# Entries younger than this wait for the next checkpoint, so transactions still in flight are never skipped
+LEDGER_CHECKPOINT_LAG = float(os.getenv("LEDGER_CHECKPOINT_LAG", "60"))
+LEDGER_AUDIT_TOLERANCE = 1e-4  # FLB; balances are floats summed in a different order
+LEDGER_LOCK_KEY = 0x464C424C  # pg_advisory_xact_lock key serialising checkpoints across workers
+
+# Ledger entry kinds: (tx_type, ubuntu_purpose)
+GENESIS = ("mint", "Ubuntu genesis allocation")
+OPENING_BALANCE = ("mint", "Ubuntu opening balance")
+WELCOME = ("mint", "Ubuntu welcome")
+MEMBER_VERIFICATION = ("reward", "Ubuntu member verification")
+ACTION_REWARD = ("reward", "Ubuntu healthcare action")
+ACTION_VERIFICATION = ("reward", "Ubuntu action verification")
+VALIDATOR_BONUS = ("reward", "Ubuntu validator bonus")
+
+LEDGER_COLUMNS = [
+    "tx_hash", "from_user_id", "to_user_id", "amount", "tx_type", "status", "block_height",
+    "gas_used", "created_at", "confirmed_at", "ubuntu_purpose",
+]
+
+_ledger = UbuntuTransaction.__table__
+
+
+def ledger_entry(user_id, amount, kind, now=None):
+    """A confirmed ledger row crediting amount FLB to user_id"""
+    tx_type, purpose = kind
+    now = now or datetime.utcnow()
+    return {
+        "tx_hash": f"0x{secrets.token_hex(32)}",
+        "from_user_id": None,
+        "to_user_id": user_id,
+        "amount": amount,
+        "tx_type": tx_type,
+        "status": "confirmed",
+        "block_height": None,
+        "gas_used": 0.0,
+        "created_at": now,
+        "confirmed_at": now,
+        "ubuntu_purpose": purpose,
+    }
+
+
+async def append_entries(db, entries):
+    """Append ledger rows in one batched insert, inside the caller's transaction.
+
+    Call it in the same transaction as the balance increments it records,
+    so the ledger and balances commit or roll back together.
+    """
+    if entries:
+        await db.execute(_ledger.insert(), entries)
+
+
+def _movements(*conditions):
+    """(user_id, signed amount) for every credit and debit matching conditions"""
+    credits = select(_ledger.c.to_user_id.label("user_id"), _ledger.c.amount.label("amount")).where(
+        _ledger.c.to_user_id.isnot(None), *conditions
+    )
+    debits = select(_ledger.c.from_user_id.label("user_id"), (-_ledger.c.amount).label("amount")).where(
+        _ledger.c.from_user_id.isnot(None), *conditions
+    )
+    return union_all(credits, debits).subquery()
+
+
+def _member_ledger_delta(after_tx_id):
+    """Correlated net ledger movement of each ubuntu_users row after a ledger position"""
+    credited = select(func.coalesce(func.sum(_ledger.c.amount), 0.0)).where(
+        _ledger.c.to_user_id == UbuntuUser.id, _ledger.c.id > after_tx_id
+    ).scalar_subquery()
+    debited = select(func.coalesce(func.sum(_ledger.c.amount), 0.0)).where(
+        _ledger.c.from_user_id == UbuntuUser.id, _ledger.c.id > after_tx_id
+    ).scalar_subquery()
+    return credited - debited
+
+
+def _ledger_balance():
+    checkpoints = MemberBalanceCheckpoint
+    return (
+        func.coalesce(checkpoints.balance, 0.0)
+        + _member_ledger_delta(func.coalesce(checkpoints.through_tx_id, 0))
+    )
+
+
+def _checkpoint_upsert(dialect, rows):
+    insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    table = MemberBalanceCheckpoint.__table__
+    statement = insert(table).from_select(["user_id", "balance", "through_tx_id", "checkpointed_at"], rows)
+    return statement.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={
+            "balance": table.c.balance + statement.excluded.balance,
+            "through_tx_id": statement.excluded.through_tx_id,
+            "checkpointed_at": statement.excluded.checkpointed_at,
+        },
+    )
+
+
+class LedgerCheckpointer:
+    """Folds new ledger entries into per-member balance checkpoints.
+
+    Each run takes the entries after the previous checkpoint (up to the
+    newest one older than LEDGER_CHECKPOINT_LAG) and adds their net
+    amount per member to ubuntu_member_balance_checkpoints. A member's
+    balance can then be audited or rebuilt from its checkpoint plus the
+    few entries after it, instead of replaying the whole ledger.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal,
+                 interval=LEDGER_CHECKPOINT_INTERVAL, lag=LEDGER_CHECKPOINT_LAG):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.lag = lag
+        self._task = None
+
+    async def _open_balances(self, db, now):
+        """Record balances that predate the ledger as opening entries (first checkpoint only)"""
+        difference = func.coalesce(UbuntuUser.flb_balance, 0.0) - _member_ledger_delta(0)
+        result = await db.execute(
+            select(UbuntuUser.id, difference).where(func.abs(difference) > LEDGER_AUDIT_TOLERANCE)
+        )
+        entries = [ledger_entry(user_id, amount, OPENING_BALANCE, now) for user_id, amount in result.all()]
+        await append_entries(db, entries)
+        if entries:
+            logger.info(f"📒 Opened the Ubuntu ledger with {len(entries)} member balances")
+
+    async def checkpoint(self):
+        """Fold entries since the previous checkpoint into member balance checkpoints"""
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            try:
+                dialect = db.bind.dialect.name
+                if dialect == "postgresql":
+                    await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LEDGER_LOCK_KEY})
+                # Writing first takes SQLite's write lock before the previous checkpoint is read
+                marker = LedgerCheckpoint(created_at=now)
+                db.add(marker)
+                await db.flush()
+
+                previous = (await db.execute(
+                    select(func.max(LedgerCheckpoint.through_tx_id)).where(LedgerCheckpoint.id != marker.id)
+                )).scalar()
+                if previous is None:
+                    await self._open_balances(db, now)
+                    previous = 0
+                through = (await db.execute(
+                    select(func.max(_ledger.c.id)).where(
+                        _ledger.c.id > previous, _ledger.c.created_at <= now - timedelta(seconds=self.lag)
+                    )
+                )).scalar()
+                if through is None:
+                    await db.rollback()
+                    return None
+
+                window = and_(_ledger.c.id > previous, _ledger.c.id <= through)
+                movements = _movements(window)
+                per_member = select(
+                    movements.c.user_id,
+                    func.sum(movements.c.amount),
+                    literal(through),
+                    literal(now),
+                ).where(true()).group_by(movements.c.user_id)
+                await db.execute(_checkpoint_upsert(dialect, per_member))
+
+                entries, net_amount = (await db.execute(
+                    select(func.count(_ledger.c.id), func.coalesce(func.sum(_ledger.c.amount), 0.0)).where(window)
+                )).one()
+                marker.through_tx_id = through
+                marker.entries = entries
+                marker.net_amount = net_amount
+                await db.commit()
+                logger.info(f"📒 Ledger checkpoint through entry {through}: {entries} entries folded in")
+                return {"through_tx_id": through, "entries": entries}
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Ledger checkpoint failed: {e}")
+                return None
+
+    async def audit(self, limit=100):
+        """Members whose balance disagrees with their checkpoint plus later ledger entries"""
+        ledger_balance = _ledger_balance()
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(UbuntuUser.id, UbuntuUser.wallet_address, UbuntuUser.flb_balance, ledger_balance)
+                .outerjoin(MemberBalanceCheckpoint, MemberBalanceCheckpoint.user_id == UbuntuUser.id)
+                .where(func.abs(func.coalesce(UbuntuUser.flb_balance, 0.0) - ledger_balance) > LEDGER_AUDIT_TOLERANCE)
+                .order_by(UbuntuUser.id)
+                .limit(limit)
+            )
+            return [
+                {"user_id": user_id, "wallet_address": wallet, "flb_balance": balance, "ledger_balance": expected}
+                for user_id, wallet, balance, expected in result.all()
+            ]
+
+    async def latest(self):
+        """The most recent completed checkpoint, or None before the first"""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(LedgerCheckpoint).where(LedgerCheckpoint.through_tx_id.isnot(None))
+                .order_by(desc(LedgerCheckpoint.id)).limit(1)
+            )
+            checkpoint = result.scalars().first()
+        if checkpoint is None:
+            return None
+        return {
+            "through_tx_id": checkpoint.through_tx_id,
+            "entries": checkpoint.entries,
+            "net_amount": checkpoint.net_amount,
+            "created_at": checkpoint.created_at.isoformat(),
+        }
+
+    async def supply(self, db):
+        """Total FLB held by members according to the ledger: checkpoints plus entries after them"""
+        through = (await db.execute(select(func.max(LedgerCheckpoint.through_tx_id)))).scalar() or 0
+        checkpointed = (await db.execute(
+            select(func.coalesce(func.sum(MemberBalanceCheckpoint.balance), 0.0))
+        )).scalar()
+        movements = _movements(_ledger.c.id > through)
+        recent = (await db.execute(select(func.coalesce(func.sum(movements.c.amount), 0.0)))).scalar()
+        return checkpointed + recent
+
+    async def rebuild(self, user_ids):
+        """Reset members' balances to what the ledger says (run while the members are quiet)"""
+        checkpoint_balance = select(MemberBalanceCheckpoint.balance).where(
+            MemberBalanceCheckpoint.user_id == UbuntuUser.id
+        ).scalar_subquery()
+        # Nested inside the ledger subqueries, so correlation to the updated row is explicit
+        checkpoint_through = select(MemberBalanceCheckpoint.through_tx_id).where(
+            MemberBalanceCheckpoint.user_id == UbuntuUser.id
+        ).correlate(UbuntuUser).scalar_subquery()
+        ledger_balance = func.coalesce(checkpoint_balance, 0.0) + _member_ledger_delta(
+            func.coalesce(checkpoint_through, 0)
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(UbuntuUser)
+                .where(UbuntuUser.id.in_(user_ids))
+                .values(flb_balance=ledger_balance, updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await bump_versions(db, MEMBERS)
+            await db.commit()
+            return result.rowcount
+
+    async def run(self):
+        """Background loop: checkpoint the ledger every interval"""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.checkpoint()
+
+    async def start(self):
+        self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+ledger_checkpointer = LedgerCheckpointer()
@@ -3,12 +3,15 @@ FlameBorn Testnet with Neon Postgres Integration
 Ubuntu Healthcare Tokenization Platform
 """
 
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, or_, select, text, tuple_, update
 from pydantic import BaseModel, Field
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import date, datetime, timedelta
 from typing import List, Optional
 import os
 import random
@@ -16,11 +19,40 @@ import uuid
 import logging
 
 # Import Neon configuration and models
-from neon_config import get_db, get_database_info, test_connection
+from neon_config import engine, async_engine, get_async_db, get_database_info, get_pool_status
 from neon_models import (
-    UbuntuUser, UbuntuValidator, ValidatorHeartbeat, HealthcareAction,
-    UbuntuTransaction, UbuntuCommunityMetrics, ProverbWisdom,
-    MostarAIInteraction, NetworkOracle, create_tables
+    UbuntuUser, UbuntuValidator, ValidatorHeartbeatMinute, ValidatorHeartbeatHour, HealthcareAction,
+    UbuntuTransaction, UbuntuCommunityMetrics, ProverbWisdom, MostarAIInteraction
+)
+from neon_stats import network_score, network_health
+from neon_metrics import community_metrics
+from neon_heartbeats import heartbeat_buffer
+from neon_heartbeat_storage import HEARTBEAT_MINUTE_RETENTION_DAYS, heartbeat_storage
+from neon_wisdom import proverb_cache
+from neon_members import member_cache
+from neon_ledger import (
+    ACTION_REWARD, ACTION_VERIFICATION, GENESIS, MEMBER_VERIFICATION, VALIDATOR_BONUS, WELCOME,
+    append_entries, ledger_checkpointer, ledger_entry
+)
+from neon_leaderboard import LEADERBOARD_METRICS, count_rank, leaderboard, leaderboard_query
+from neon_regions import REGION_GROUPINGS, ImpactDeltas, impact_query, record_impact, region_rollups
+from neon_supply import record_member_supply, record_supply, supply_counters
+from neon_versions import (
+    ACTIONS, MEMBERS, METRICS, VALIDATORS, bump_versions, etag_matches, http_date, resource_versions, static_etag
+)
+from neon_compression import CompressionMiddleware, compressed_bodies
+from neon_export import EXPORT_MEDIA_TYPES, stream_export
+from neon_search import action_search, search_query, search_terms, search_truncated_query
+from neon_json import FAST_JSON, FastJSONResponse, dumps, encoded_response, respond, schema_columns
+from neon_instrumentation import SqlStatsMiddleware, sql_instrumentation
+from neon_startup import STARTUP_DEFER, prepare_database, startup_report
+from neon_pagination import decode_cursor, split_page
+from neon_seed import SyntheticCommunity, load_synthetic_community
+from neon_bulk import bulk_register_users, ingest_healthcare_actions, is_ndjson, iter_ndjson, read_records
+from neon_rewards import (
+    ACTION_VERIFICATION_SCORE_BOOST, STARTING_UBUNTU_SCORE, VALIDATOR_FLB_BONUS, VALIDATOR_SCORE_BOOST,
+    VALIDATOR_STARTING_CONSENSUS, VERIFICATION_FLB_BONUS, VERIFICATION_SCORE_BOOST, WELCOME_FLB_BALANCE,
+    action_reward, action_score_boost, action_verification_bonus, verified_action_flb
 )
 
 # Configure logging
@@ -33,7 +65,8 @@ app = FastAPI(
     description="Ubuntu Healthcare Tokenization Platform - I am because we are",
     version="0.0.1-alpha-neon",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse if FAST_JSON else JSONResponse
 )
 
 # CORS middleware
@@ -45,6 +78,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request SQL statement counts and timings, served at /metrics
+sql_instrumentation.instrument(engine, async_engine)
+app.add_middleware(SqlStatsMiddleware, instrumentation=sql_instrumentation)
+
+# gzip/brotli for clients that accept it; compressed bodies of tagged responses are reused
+app.add_middleware(CompressionMiddleware, cache=compressed_bodies)
+
 # Pydantic Models
 class UbuntuUserCreate(BaseModel):
     wallet_address: str = Field(..., min_length=42, max_length=42)
@@ -70,6 +110,30 @@ class UbuntuUserResponse(BaseModel):
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+class UbuntuUserPage(BaseModel):
+    items: List[UbuntuUserResponse]
+    next_cursor: Optional[str]
+
+class UbuntuTransactionResponse(BaseModel):
+    id: int
+    tx_hash: str
+    from_user_id: Optional[int]
+    to_user_id: Optional[int]
+    amount: float
+    tx_type: str
+    status: str
+    created_at: datetime
+    ubuntu_purpose: Optional[str]
+
+    class Config:
+        from_attributes = True
+        orm_mode = True
+
+class UbuntuTransactionPage(BaseModel):
+    items: List[UbuntuTransactionResponse]
+    next_cursor: Optional[str]
 
 class HealthcareActionCreate(BaseModel):
     action_type: str = Field(..., regex="^(birth_verification|health_education|treatment|emergency)$")
@@ -78,6 +142,9 @@ class HealthcareActionCreate(BaseModel):
     location: str = Field(..., max_length=100)
     impact_score: float = Field(..., ge=0.1, le=10.0)
 
+class HealthcareActionIngest(HealthcareActionCreate):
+    wallet_address: str = Field(..., min_length=42, max_length=42)
+
 class HealthcareActionResponse(BaseModel):
     id: int
     action_type: str
@@ -92,6 +159,19 @@ class HealthcareActionResponse(BaseModel):
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+class HealthcareActionPage(BaseModel):
+    items: List[HealthcareActionResponse]
+    next_cursor: Optional[str]
+
+class HealthcareActionMatch(HealthcareActionResponse):
+    rank: float
+
+class HealthcareActionSearchResults(BaseModel):
+    query: str
+    items: List[HealthcareActionMatch]
+    truncated: bool = False  # Only part of the matches were ranked (SEARCH_MAX_CANDIDATES)
 
 class ValidatorCreate(BaseModel):
     wallet_address: str = Field(..., min_length=42, max_length=42)
@@ -110,23 +190,40 @@ class ValidatorResponse(BaseModel):
 
     class Config:
         from_attributes = True
+        orm_mode = True
 
 # Initialize database on startup
+async def prepare_shared_state(report=startup_report):
+    """Bring the database to the state every worker relies on; a quick check when it already is.
+
+    The production server runs this once before forking its workers, so
+    workers booting together only confirm the work is done.
+    """
+    # Schema and seed data, skipped when already current
+    prepare_database(report, seed=seed_ubuntu_data)
+    
+    # Supply counters, regional rollups, resource versions and the search index must exist before any change is recorded
+    await report.run("supply", supply_counters.start)
+    await report.run("regions", region_rollups.start)
+    await report.run("versions", resource_versions.start)
+    await report.run("search", action_search.start)
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database and seed data"""
+    """Prepare the database once across workers and start the background maintainers"""
+    startup_report.begin()
     try:
-        # Create tables
-        create_tables()
+        await prepare_shared_state(startup_report)
         
-        # Test connection
-        connection_info = test_connection()
-        logger.info(f"Database connection: {connection_info}")
-        
-        # Seed initial data
-        db = next(get_db())
-        await seed_ubuntu_data(db)
+        # Start community metrics maintainer, heartbeat storage and buffer, proverb cache
+        await startup_report.run("metrics", community_metrics.start, defer="metrics" in STARTUP_DEFER)
+        await startup_report.run("heartbeats", heartbeat_storage.start, defer="heartbeats" in STARTUP_DEFER)
+        await startup_report.run("heartbeat_buffer", heartbeat_buffer.start)
+        await startup_report.run("wisdom", proverb_cache.start, defer="wisdom" in STARTUP_DEFER)
+        await startup_report.run("ledger", ledger_checkpointer.start)
+        await startup_report.run("leaderboard", leaderboard.start, defer="leaderboard" in STARTUP_DEFER)
         
+        startup_report.ready()
         logger.info("🔥 FlameBorn Ubuntu Testnet started successfully!")
         logger.info("Ubuntu Philosophy: I am because we are")
         
@@ -134,12 +231,23 @@ async def startup_event():
         logger.error(f"Startup failed: {e}")
         raise
 
-async def seed_ubuntu_data(db: Session):
-    """Seed initial Ubuntu community data"""
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush buffered heartbeats, proverb usage and pending community metrics"""
+    await startup_report.cancel_deferred()
+    await ledger_checkpointer.stop()
+    await leaderboard.stop()
+    await proverb_cache.stop()
+    await heartbeat_buffer.stop()
+    await heartbeat_storage.stop()
+    await community_metrics.stop()
+
+def seed_ubuntu_data(db: Session):
+    """Seed initial Ubuntu community data into an empty database; True if seeded"""
     
     # Check if data already exists
-    if db.query(UbuntuUser).count() > 0:
-        return
+    if db.query(UbuntuUser.id).first() is not None:
+        return False
     
     # Create Ubuntu proverbs
     ubuntu_proverbs = [
@@ -208,15 +316,16 @@ async def seed_ubuntu_data(db: Session):
         }
     ]
     
-    for user_data in test_users:
-        user = UbuntuUser(**user_data)
-        db.add(user)
+    users = [UbuntuUser(**user_data) for user_data in test_users]
+    db.add_all(users)
+    db.flush()
     
-    db.commit()
+    # Genesis allocations open the ledger for the seeded balances
+    db.add_all(UbuntuTransaction(**ledger_entry(user.id, user.flb_balance, GENESIS)) for user in users)
     
     # Create validator for first user
     validator = UbuntuValidator(
-        user_id=1,
+        user_id=users[0].id,
         validator_key="ubuntu_validator_genesis_001",
         stake_amount=15000.0,
         status="active",
@@ -229,7 +338,7 @@ async def seed_ubuntu_data(db: Session):
     # Create sample healthcare actions
     healthcare_actions = [
         {
-            "user_id": 1,
+            "user_id": users[0].id,
             "action_type": "birth_verification",
             "title": "Ubuntu Birth Registration - Baby Mandela",
             "description": "Successfully registered and celebrated the birth of baby Mandela in rural clinic. Community gathered to welcome new Ubuntu member.",
@@ -240,7 +349,7 @@ async def seed_ubuntu_data(db: Session):
             "ubuntu_blessing": "A new flame joins our Ubuntu community. I am because we are."
         },
         {
-            "user_id": 2,
+            "user_id": users[1].id,
             "action_type": "health_education",
             "title": "Maternal Health Ubuntu Workshop",
             "description": "Conducted comprehensive maternal health education for 75 expecting mothers, sharing Ubuntu wisdom and modern healthcare practices.",
@@ -256,28 +365,96 @@ async def seed_ubuntu_data(db: Session):
         action = HealthcareAction(**action_data)
         db.add(action)
     
-    db.commit()
+    db.flush()
     logger.info("🔥 Ubuntu seed data created successfully!")
+    return True
+
+# Conditional GETs, answered from version counters before a route runs its queries
+def _validate(request, response, etag, last_modified=None):
+    # Last-Modified is informational: second-resolution dates cannot tell apart writes
+    # committed within the same second, so only If-None-Match can yield a 304
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+def versioned(*resources):
+    """Route dependency: 304 when the client already holds the current version of resources"""
+    async def check(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+        etag, last_modified = await resource_versions.current(db, resources)
+        _validate(request, response, etag, last_modified)
+        request.state.last_modified = last_modified
+    return check
+
+def unchanging(payload):
+    """Route dependency for a fixed payload: tagged once, 304 whenever the client has it"""
+    etag = static_etag(payload)
+    async def check(request: Request, response: Response):
+        _validate(request, response, etag)
+    return check
+
+# Fixed payloads
+UBUNTU_WELCOME = {
+    "message": "🔥 FlameBorn Ubuntu Testnet - Neon Powered 🔥",
+    "version": "0.0.1-alpha-neon",
+    "ubuntu_philosophy": "I am because we are",
+    "database": get_database_info(),
+    "status": "The flame cannot whisper. It must roar.",
+    "endpoints": {
+        "health": "/health",
+        "ping": "/ping",
+        "manifest": "/.well-known/manifest.json",
+        "docs": "/docs",
+        "ubuntu_stats": "/ubuntu/stats"
+    }
+}
+
+UBUNTU_MANIFEST = {
+    "network": "FlameBorn-Ubuntu-Testnet",
+    "version": "0.0.1-alpha-neon",
+    "oracle": True,
+    "validator": True,
+    "ubuntu_philosophy": "I am because we are",
+    "consensus": "Ubuntu-PoS",
+    "database": "neon-postgres",
+    "token": {
+        "symbol": "FLAME",
+        "name": "FlameBorn Ubuntu Token",
+        "decimals": 18,
+        "total_supply": 1000000000,
+        "ubuntu_distribution": "Community-first allocation"
+    },
+    "chain_id": "flameborn-ubuntu-testnet-1",
+    "features": {
+        "healthcare_tokenization": True,
+        "ubuntu_consensus": True,
+        "validator_network": True,
+        "birth_registration": True,
+        "impact_mining": True,
+        "community_governance": True,
+        "proverb_wisdom": True,
+        "mostar_ai_integration": True
+    },
+    "ubuntu_principles": [
+        "I am because we are",
+        "Collective prosperity through individual success",
+        "Healthcare as a human right",
+        "Community validation and support",
+        "Traditional wisdom meets modern technology"
+    ]
+}
+
+# Serialized once; the routes below only copy these bytes out
+UBUNTU_WELCOME_JSON = dumps(UBUNTU_WELCOME)
+UBUNTU_MANIFEST_JSON = dumps(UBUNTU_MANIFEST)
 
 # Routes
-@app.get("/")
-async def root():
+@app.get("/", dependencies=[Depends(unchanging(UBUNTU_WELCOME))])
+async def root(response: Response):
     """Welcome to FlameBorn Ubuntu Testnet"""
-    db_info = get_database_info()
-    return {
-        "message": "🔥 FlameBorn Ubuntu Testnet - Neon Powered 🔥",
-        "version": "0.0.1-alpha-neon",
-        "ubuntu_philosophy": "I am because we are",
-        "database": db_info,
-        "status": "The flame cannot whisper. It must roar.",
-        "endpoints": {
-            "health": "/health",
-            "ping": "/ping",
-            "manifest": "/.well-known/manifest.json",
-            "docs": "/docs",
-            "ubuntu_stats": "/ubuntu/stats"
-        }
-    }
+    return encoded_response(UBUNTU_WELCOME_JSON, response.headers)
 
 @app.get("/ping")
 async def ping():
@@ -291,53 +468,21 @@ async def ping():
         "neon_powered": True
     }
 
-@app.get("/.well-known/manifest.json")
-async def manifest():
+@app.get("/.well-known/manifest.json", dependencies=[Depends(unchanging(UBUNTU_MANIFEST))])
+async def manifest(response: Response):
     """Ubuntu protocol manifest"""
-    return {
-        "network": "FlameBorn-Ubuntu-Testnet",
-        "version": "0.0.1-alpha-neon",
-        "oracle": True,
-        "validator": True,
-        "ubuntu_philosophy": "I am because we are",
-        "consensus": "Ubuntu-PoS",
-        "database": "neon-postgres",
-        "token": {
-            "symbol": "FLAME",
-            "name": "FlameBorn Ubuntu Token",
-            "decimals": 18,
-            "total_supply": 1000000000,
-            "ubuntu_distribution": "Community-first allocation"
-        },
-        "chain_id": "flameborn-ubuntu-testnet-1",
-        "features": {
-            "healthcare_tokenization": True,
-            "ubuntu_consensus": True,
-            "validator_network": True,
-            "birth_registration": True,
-            "impact_mining": True,
-            "community_governance": True,
-            "proverb_wisdom": True,
-            "mostar_ai_integration": True
-        },
-        "ubuntu_principles": [
-            "I am because we are",
-            "Collective prosperity through individual success",
-            "Healthcare as a human right",
-            "Community validation and support",
-            "Traditional wisdom meets modern technology"
-        ]
-    }
+    return encoded_response(UBUNTU_MANIFEST_JSON, response.headers)
 
 # Ubuntu User Management
 @app.post("/ubuntu/users", response_model=UbuntuUserResponse)
-async def create_ubuntu_user(user: UbuntuUserCreate, db: Session = Depends(get_db)):
+async def create_ubuntu_user(user: UbuntuUserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register new Ubuntu community member"""
     
     # Check if user already exists
-    existing_user = db.query(UbuntuUser).filter(
-        UbuntuUser.wallet_address == user.wallet_address
-    ).first()
+    result = await db.execute(
+        select(UbuntuUser.id).where(UbuntuUser.wallet_address == user.wallet_address)
+    )
+    existing_user = result.first()
     
     if existing_user:
         raise HTTPException(
@@ -348,70 +493,190 @@ async def create_ubuntu_user(user: UbuntuUserCreate, db: Session = Depends(get_d
     # Create new Ubuntu user
     db_user = UbuntuUser(
         **user.dict(),
-        flb_balance=100.0,  # Welcome bonus
-        ubuntu_score=10.0   # Starting Ubuntu score
+        flb_balance=WELCOME_FLB_BALANCE,  # Welcome bonus
+        ubuntu_score=STARTING_UBUNTU_SCORE   # Starting Ubuntu score
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.flush()
+    await append_entries(db, [ledger_entry(db_user.id, WELCOME_FLB_BALANCE, WELCOME)])
+    await record_supply(db, {db_user.role: (1, 0, WELCOME_FLB_BALANCE)})
+    impact = ImpactDeltas()
+    impact.member(db_user.created_at, db_user.country, db_user.location)
+    await record_impact(db, impact)
+    await community_metrics.user_registered(db, db_user.role, db_user.flb_balance, db_user.ubuntu_score)
+    await bump_versions(db, MEMBERS)
+    await db.commit()
+    await db.refresh(db_user)
     
     logger.info(f"New Ubuntu member joined: {user.name} from {user.location}")
     return db_user
 
-@app.get("/ubuntu/users", response_model=List[UbuntuUserResponse])
+@app.post("/ubuntu/users/bulk")
+async def bulk_create_ubuntu_users(
+    request: Request,
+    report: str = Query("all", regex="^(all|failures)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Register a batch of Ubuntu community members from a JSON array or NDJSON body"""
+    
+    try:
+        items = await read_records(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    outcomes, _ = await bulk_register_users(db, items, UbuntuUserCreate)
+    
+    summary = Counter(outcome["status"] for outcome in outcomes)
+    logger.info(f"Bulk Ubuntu registration: {summary['created']} of {len(items)} members joined")
+    
+    return {
+        "received": len(items),
+        "created": summary["created"],
+        "exists": summary["exists"],
+        "duplicate": summary["duplicate"],
+        "invalid": summary["invalid"],
+        "results": outcomes if report == "all" else [
+            outcome for outcome in outcomes if outcome["status"] != "created"
+        ],
+        "ubuntu_blessing": "Many flames join as one - I am because we are"
+    }
+
+@app.get("/ubuntu/users", response_model=UbuntuUserPage, dependencies=[Depends(versioned(MEMBERS))])
 async def get_ubuntu_users(
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
     role: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get Ubuntu community members"""
+    """Get Ubuntu community members, paged by id"""
     
-    query = db.query(UbuntuUser).filter(UbuntuUser.is_active == True)
+    query = select(*schema_columns(UbuntuUserResponse, UbuntuUser)).where(UbuntuUser.is_active == True)
     
     if role:
-        query = query.filter(UbuntuUser.role == role)
+        query = query.where(UbuntuUser.role == role)
+    
+    if cursor:
+        try:
+            (last_id,) = decode_cursor(cursor, int)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(UbuntuUser.id > last_id)
+    
+    result = await db.execute(query.order_by(UbuntuUser.id).limit(limit + 1))
+    users, next_cursor = split_page([dict(row) for row in result.mappings()], limit, lambda user: (user["id"],))
+    return respond({"items": users, "next_cursor": next_cursor}, response.headers)
+
+@app.get("/ubuntu/users/export")
+async def export_ubuntu_users(
+    export_format: str = Query("csv", alias="format", regex=f"^({'|'.join(EXPORT_MEDIA_TYPES)})$"),
+    role: Optional[str] = None,
+    verification_status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Stream every matching Ubuntu member as CSV or NDJSON, in joining order"""
+    
+    if since and until and since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
     
-    users = query.offset(skip).limit(limit).all()
-    return users
+    query = select(*UbuntuUser.__table__.columns)
+    if role:
+        query = query.where(UbuntuUser.role == role)
+    if verification_status:
+        query = query.where(UbuntuUser.verification_status == verification_status)
+    if since:
+        query = query.where(UbuntuUser.created_at >= since)
+    if until:
+        query = query.where(UbuntuUser.created_at <= until)
+    
+    return StreamingResponse(
+        stream_export(query.order_by(UbuntuUser.id), export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="ubuntu-members.{export_format}"'}
+    )
 
 @app.get("/ubuntu/users/{wallet_address}", response_model=UbuntuUserResponse)
-async def get_ubuntu_user(wallet_address: str, db: Session = Depends(get_db)):
+async def get_ubuntu_user(wallet_address: str, db: AsyncSession = Depends(get_async_db)):
     """Get specific Ubuntu community member"""
     
-    user = db.query(UbuntuUser).filter(
-        UbuntuUser.wallet_address == wallet_address,
-        UbuntuUser.is_active == True
-    ).first()
+    user = await member_cache.get(db, wallet_address)
     
-    if not user:
+    if not user or not user["is_active"]:
         raise HTTPException(status_code=404, detail="Ubuntu member not found")
     
     return user
 
+@app.get("/ubuntu/users/{wallet_address}/transactions", response_model=UbuntuTransactionPage)
+async def get_ubuntu_user_transactions(
+    response: Response,
+    wallet_address: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Ledger entries crediting or debiting an Ubuntu member, newest first"""
+    
+    user = await member_cache.get(db, wallet_address)
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="Ubuntu member not found")
+    
+    query = select(*schema_columns(UbuntuTransactionResponse, UbuntuTransaction)).where(
+        or_(UbuntuTransaction.to_user_id == user["id"], UbuntuTransaction.from_user_id == user["id"])
+    )
+    
+    if cursor:
+        try:
+            (last_id,) = decode_cursor(cursor, int)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(UbuntuTransaction.id < last_id)
+    
+    result = await db.execute(query.order_by(desc(UbuntuTransaction.id)).limit(limit + 1))
+    transactions, next_cursor = split_page([dict(row) for row in result.mappings()], limit, lambda tx: (tx["id"],))
+    return respond({"items": transactions, "next_cursor": next_cursor}, response.headers)
+
 @app.put("/ubuntu/users/{wallet_address}/verify")
-async def verify_ubuntu_user(wallet_address: str, db: Session = Depends(get_db)):
+async def verify_ubuntu_user(wallet_address: str, db: AsyncSession = Depends(get_async_db)):
     """Verify Ubuntu community member"""
     
-    user = db.query(UbuntuUser).filter(
-        UbuntuUser.wallet_address == wallet_address
-    ).first()
+    user = await member_cache.get(db, wallet_address)
     
     if not user:
         raise HTTPException(status_code=404, detail="Ubuntu member not found")
     
-    user.verification_status = "verified"
-    user.flb_balance += 500.0  # Verification bonus
-    user.ubuntu_score += 25.0  # Ubuntu score boost
-    user.updated_at = datetime.utcnow()
+    # Only the request that actually flips the status counts as a new verification
+    result = await db.execute(
+        update(UbuntuUser)
+        .where(UbuntuUser.id == user["id"], UbuntuUser.verification_status != "verified")
+        .values(verification_status="verified")
+        .execution_options(synchronize_session=False)
+    )
+    newly_verified = result.rowcount == 1
+    await db.execute(
+        update(UbuntuUser)
+        .where(UbuntuUser.id == user["id"])
+        .values(
+            flb_balance=UbuntuUser.flb_balance + VERIFICATION_FLB_BONUS,
+            ubuntu_score=UbuntuUser.ubuntu_score + VERIFICATION_SCORE_BOOST,
+            updated_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await append_entries(db, [ledger_entry(user["id"], VERIFICATION_FLB_BONUS, MEMBER_VERIFICATION)])
+    await record_supply(db, {user["role"]: (0, int(newly_verified), VERIFICATION_FLB_BONUS)})
+    await community_metrics.user_verified(db, newly_verified, VERIFICATION_FLB_BONUS, VERIFICATION_SCORE_BOOST)
+    await bump_versions(db, MEMBERS)
     
-    db.commit()
+    await db.commit()
+    member_cache.invalidate(wallet_address)
     
     return {
         "status": "verified",
-        "bonus_flb": 500.0,
-        "ubuntu_score_boost": 25.0,
+        "bonus_flb": VERIFICATION_FLB_BONUS,
+        "ubuntu_score_boost": VERIFICATION_SCORE_BOOST,
         "ubuntu_blessing": "Your flame burns bright in our Ubuntu community",
         "message": "Welcome to the verified Ubuntu healthcare network",
         "philosophy": "I am because we are"
@@ -422,271 +687,586 @@ async def verify_ubuntu_user(wallet_address: str, db: Session = Depends(get_db))
 async def create_healthcare_action(
     action: HealthcareActionCreate, 
     wallet_address: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Record Ubuntu healthcare action"""
     
     # Find user
-    user = db.query(UbuntuUser).filter(
-        UbuntuUser.wallet_address == wallet_address,
-        UbuntuUser.is_active == True
-    ).first()
+    user = await member_cache.get(db, wallet_address)
     
-    if not user:
+    if not user or not user["is_active"]:
         raise HTTPException(status_code=404, detail="Ubuntu member not found")
     
     # Calculate FLB earned based on impact score and role
-    role_multiplier = {"healer": 1.5, "guardian": 1.2, "community": 1.0}
-    flb_earned = action.impact_score * 15 * role_multiplier.get(user.role, 1.0)
+    flb_earned = action_reward(action.impact_score, user["role"])
+    score_boost = action_score_boost(action.impact_score)
     
     # Create healthcare action
     db_action = HealthcareAction(
-        user_id=user.id,
+        user_id=user["id"],
         **action.dict(),
         flb_earned=flb_earned,
+        created_at=datetime.utcnow(),
         ubuntu_blessing=f"Ubuntu recognizes your {action.action_type} impact. I am because we are."
     )
     
     db.add(db_action)
     
     # Update user balance and Ubuntu score
-    user.flb_balance += flb_earned
-    user.ubuntu_score += action.impact_score * 2
-    user.updated_at = datetime.utcnow()
+    await db.execute(
+        update(UbuntuUser)
+        .where(UbuntuUser.id == user["id"])
+        .values(
+            flb_balance=UbuntuUser.flb_balance + flb_earned,
+            ubuntu_score=UbuntuUser.ubuntu_score + score_boost,
+            updated_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await append_entries(db, [ledger_entry(user["id"], flb_earned, ACTION_REWARD)])
+    await record_supply(db, {user["role"]: (0, 0, flb_earned)})
+    impact = ImpactDeltas()
+    impact.action(db_action.created_at, user["country"], action.location, flb_earned)
+    await record_impact(db, impact)
+    await community_metrics.action_recorded(db, action.action_type, flb_earned, score_boost)
+    await bump_versions(db, ACTIONS, MEMBERS)
+    
+    await db.commit()
+    await db.refresh(db_action)
+    member_cache.invalidate(wallet_address)
+    
+    logger.info(f"Healthcare action recorded: {action.title} by {user['name']}")
+    return db_action
+
+@app.post("/ubuntu/healthcare-actions/stream")
+async def stream_healthcare_actions(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Ingest an NDJSON stream of healthcare actions synced from field devices"""
     
-    db.commit()
-    db.refresh(db_action)
+    if not is_ndjson(request):
+        raise HTTPException(status_code=415, detail="Send actions as application/x-ndjson")
     
-    logger.info(f"Healthcare action recorded: {action.title} by {user.name}")
-    return db_action
+    # Each committed chunk is visible immediately, even if the device disconnects mid-stream
+    def chunk_committed(totals, wallets):
+        member_cache.invalidate(*wallets)
+    
+    summary, rejected = await ingest_healthcare_actions(
+        db, iter_ndjson(request), HealthcareActionIngest, on_chunk=chunk_committed
+    )
+    
+    logger.info(f"Healthcare action sync: {summary['recorded']} of {summary['received']} actions recorded")
+    
+    return {
+        "received": summary["received"],
+        "recorded": summary["recorded"],
+        "rejected": summary["rejected"],
+        "chunks": summary["chunks"],
+        "flb_earned": summary["flb_earned"],
+        "errors": rejected,
+        "ubuntu_blessing": "Every act of care is counted - I am because we are"
+    }
 
-@app.get("/ubuntu/healthcare-actions", response_model=List[HealthcareActionResponse])
+@app.get("/ubuntu/healthcare-actions", response_model=HealthcareActionPage, dependencies=[Depends(versioned(ACTIONS))])
 async def get_healthcare_actions(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
     action_type: Optional[str] = None,
     verification_status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get Ubuntu healthcare actions"""
+    """Get Ubuntu healthcare actions, newest first, paged by (created_at, id)"""
     
-    query = db.query(HealthcareAction)
+    query = select(*schema_columns(HealthcareActionResponse, HealthcareAction))
     
     if action_type:
-        query = query.filter(HealthcareAction.action_type == action_type)
+        query = query.where(HealthcareAction.action_type == action_type)
     
     if verification_status:
-        query = query.filter(HealthcareAction.verification_status == verification_status)
+        query = query.where(HealthcareAction.verification_status == verification_status)
+    
+    if cursor:
+        try:
+            last_created_at, last_id = decode_cursor(cursor, datetime, int)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(
+            tuple_(HealthcareAction.created_at, HealthcareAction.id) < tuple_(last_created_at, last_id)
+        )
+    
+    result = await db.execute(
+        query.order_by(desc(HealthcareAction.created_at), desc(HealthcareAction.id)).limit(limit + 1)
+    )
+    actions, next_cursor = split_page(
+        [dict(row) for row in result.mappings()], limit, lambda action: (action["created_at"], action["id"])
+    )
+    return respond({"items": actions, "next_cursor": next_cursor}, response.headers)
+
+@app.get("/ubuntu/healthcare-actions/export")
+async def export_healthcare_actions(
+    export_format: str = Query("csv", alias="format", regex=f"^({'|'.join(EXPORT_MEDIA_TYPES)})$"),
+    action_type: Optional[str] = None,
+    verification_status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Stream every matching Ubuntu healthcare action as CSV or NDJSON, oldest first"""
+    
+    if since and until and since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
     
-    actions = query.order_by(desc(HealthcareAction.created_at)).offset(skip).limit(limit).all()
-    return actions
+    query = select(*HealthcareAction.__table__.columns)
+    if action_type:
+        query = query.where(HealthcareAction.action_type == action_type)
+    if verification_status:
+        query = query.where(HealthcareAction.verification_status == verification_status)
+    if since:
+        query = query.where(HealthcareAction.created_at >= since)
+    if until:
+        query = query.where(HealthcareAction.created_at <= until)
+    
+    return StreamingResponse(
+        stream_export(query.order_by(HealthcareAction.created_at, HealthcareAction.id), export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="ubuntu-healthcare-actions.{export_format}"'}
+    )
+
+@app.get(
+    "/ubuntu/healthcare-actions/search",
+    response_model=HealthcareActionSearchResults,
+    dependencies=[Depends(versioned(ACTIONS))]
+)
+async def search_healthcare_actions(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    action_type: Optional[str] = None,
+    verification_status: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Search Ubuntu healthcare action titles and descriptions, best matches first"""
+    
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query has no words")
+    
+    filters = []
+    if action_type:
+        filters.append(HealthcareAction.action_type == action_type)
+    if verification_status:
+        filters.append(HealthcareAction.verification_status == verification_status)
+    
+    dialect = db.bind.dialect.name
+    query = search_query(dialect, schema_columns(HealthcareActionResponse, HealthcareAction), terms, limit, filters)
+    result = await db.execute(query)
+    items = [dict(row) for row in result.mappings()]
+    
+    truncated = False
+    truncated_query = search_truncated_query(dialect, terms, filters)
+    if truncated_query is not None:
+        truncated = (await db.execute(truncated_query)).first() is not None
+    return respond({"query": q, "items": items, "truncated": truncated}, response.headers)
 
 @app.put("/ubuntu/healthcare-actions/{action_id}/verify")
 async def verify_healthcare_action(
     action_id: int, 
     verifier_wallet: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify Ubuntu healthcare action"""
     
     # Find action
-    action = db.query(HealthcareAction).filter(HealthcareAction.id == action_id).first()
+    action = await db.get(HealthcareAction, action_id)
     if not action:
         raise HTTPException(status_code=404, detail="Healthcare action not found")
     
     # Find verifier
-    verifier = db.query(UbuntuUser).filter(
-        UbuntuUser.wallet_address == verifier_wallet,
-        UbuntuUser.verification_status == "verified"
-    ).first()
+    verifier = await member_cache.get(db, verifier_wallet)
     
-    if not verifier:
+    if not verifier or verifier["verification_status"] != "verified":
         raise HTTPException(status_code=403, detail="Only verified Ubuntu members can verify actions")
     
-    # Verify action
-    action.verification_status = "verified"
-    action.verified_by = verifier.id
-    action.verified_at = datetime.utcnow()
-    action.flb_earned *= 1.3  # Verification bonus
-    
-    # Update user balance
-    user = db.query(UbuntuUser).filter(UbuntuUser.id == action.user_id).first()
-    if user:
-        bonus = action.flb_earned * 0.3
-        user.flb_balance += bonus
-        user.ubuntu_score += 5.0
-        user.updated_at = datetime.utcnow()
-    
-    db.commit()
+    # Verify action: only the request whose UPDATE flips the status raises flb_earned and pays the bonus
+    verify = (
+        update(HealthcareAction)
+        .where(HealthcareAction.id == action_id, HealthcareAction.verification_status != "verified")
+        .values(
+            verification_status="verified",
+            verified_by=verifier["id"],
+            verified_at=datetime.utcnow(),
+            flb_earned=verified_action_flb(HealthcareAction.flb_earned)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if db.bind.dialect.name == "postgresql":
+        verified_flb = (await db.execute(verify.returning(HealthcareAction.flb_earned))).scalar()
+    else:
+        # SQLite has no RETURNING here; the UPDATE holds the write lock until commit, so the read-back is ours
+        result = await db.execute(verify)
+        verified_flb = None
+        if result.rowcount == 1:
+            verified_flb = (await db.execute(
+                select(HealthcareAction.flb_earned).where(HealthcareAction.id == action_id)
+            )).scalar()
+    
+    bonus = 0.0
+    if verified_flb is not None:
+        # Update user balance
+        bonus = action_verification_bonus(verified_flb)
+        result = await db.execute(
+            update(UbuntuUser)
+            .where(UbuntuUser.id == action.user_id)
+            .values(
+                flb_balance=UbuntuUser.flb_balance + bonus,
+                ubuntu_score=UbuntuUser.ubuntu_score + ACTION_VERIFICATION_SCORE_BOOST,
+                updated_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rewarded = result.rowcount == 1
+        if rewarded:
+            await append_entries(db, [ledger_entry(action.user_id, bonus, ACTION_VERIFICATION)])
+            await record_member_supply(db, action.user_id, bonus)
+        else:
+            bonus = 0.0
+        await community_metrics.action_verified(
+            db, True, bonus, ACTION_VERIFICATION_SCORE_BOOST if rewarded else 0.0
+        )
+        
+        # Regional rollups count the verification on the day the action was recorded;
+        # flb_earned is only ever raised by this gated UPDATE, so the loaded value is the recorded one
+        country = (await db.execute(select(UbuntuUser.country).where(UbuntuUser.id == action.user_id))).scalar()
+        impact = ImpactDeltas()
+        impact.verification(action.created_at, country, action.location, verified_flb - action.flb_earned, True)
+        await record_impact(db, impact)
+        await bump_versions(db, ACTIONS, MEMBERS)
+        
+        await db.commit()
+        member_cache.invalidate_ids(action.user_id)
     
     return {
         "status": "verified",
-        "verification_bonus": action.flb_earned * 0.3,
+        "verification_bonus": bonus,
         "ubuntu_recognition": "Your healthcare impact is verified by our Ubuntu community",
-        "verifier": verifier.name,
+        "verifier": verifier["name"],
         "philosophy": "I am because we are - Ubuntu validation strengthens us all"
     }
 
+# Regional impact
+@app.get("/ubuntu/regions", dependencies=[Depends(versioned(ACTIONS, MEMBERS))])
+async def get_ubuntu_regions(
+    country: Optional[str] = None,
+    location: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    group_by: str = Query("country", regex=f"^({'|'.join(REGION_GROUPINGS)})$"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Healthcare impact and new members per country, location or day, from the daily rollups"""
+    
+    if since and until and since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    
+    result = await db.execute(impact_query(
+        country=country, location=location, since=since, until=until, group_by=group_by, limit=limit
+    ))
+    
+    regions = []
+    for row in result.mappings().all():
+        group = row[group_by]
+        actions = row["actions"] or 0
+        verified_actions = row["verified_actions"] or 0
+        regions.append({
+            group_by: group.isoformat() if isinstance(group, date) else group,
+            "actions": actions,
+            "verified_actions": verified_actions,
+            "verification_rate": round(verified_actions / actions * 100, 2) if actions else 0,
+            "flb_earned": round(row["flb_earned"] or 0.0, 2),
+            "new_members": row["new_members"] or 0
+        })
+    
+    return {
+        "group_by": group_by,
+        "filters": {
+            "country": country,
+            "location": location,
+            "since": since.isoformat() if since else None,
+            "until": until.isoformat() if until else None
+        },
+        "regions": regions,
+        "ubuntu_message": "I am because we are - every village's flame counted"
+    }
+
+# Leaderboards
+@app.get("/ubuntu/leaderboard", dependencies=[Depends(versioned(MEMBERS))])
+async def get_ubuntu_leaderboard(
+    metric: str = Query("ubuntu_score", regex=f"^({'|'.join(LEADERBOARD_METRICS)})$"),
+    role: Optional[str] = None,
+    country: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Top Ubuntu members by score or FLB balance, optionally within a role or country"""
+    
+    result = await db.execute(leaderboard_query(metric, role=role, country=country, limit=limit))
+    
+    leaders = []
+    for position, member in enumerate(result.scalars().all(), start=1):
+        value = getattr(member, metric)
+        # Ties share a rank
+        rank = leaders[-1]["rank"] if leaders and leaders[-1][metric] == value else position
+        leaders.append({
+            "rank": rank,
+            "wallet_address": member.wallet_address,
+            "name": member.name,
+            "role": member.role,
+            "country": member.country,
+            "ubuntu_score": member.ubuntu_score,
+            "flb_balance": member.flb_balance
+        })
+    
+    return {
+        "metric": metric,
+        "role": role,
+        "country": country,
+        "leaders": leaders,
+        "ubuntu_message": "I am because we are - every flame lifts the others"
+    }
+
+@app.get("/ubuntu/leaderboard/{wallet_address}")
+async def get_ubuntu_rank(
+    wallet_address: str,
+    metric: str = Query("ubuntu_score", regex=f"^({'|'.join(LEADERBOARD_METRICS)})$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Rank of one Ubuntu member among all active members"""
+    
+    user = await member_cache.get(db, wallet_address)
+    
+    if not user or not user["is_active"]:
+        raise HTTPException(status_code=404, detail="Ubuntu member not found")
+    
+    # The in-memory index answers in O(log n); members it has not seen yet are counted in the database
+    ranked = leaderboard.rank(user["id"], metric)
+    source = "index"
+    if ranked is None:
+        ranked = await count_rank(db, user["id"], metric)
+        source = "count"
+    rank, value, members = ranked
+    
+    return {
+        "wallet_address": wallet_address,
+        "metric": metric,
+        "value": value,
+        "rank": rank,
+        "members": members,
+        "percentile": round(100 * (members - rank + 1) / members, 2) if members else 0,
+        "source": source
+    }
+
 # Validator Management
 @app.post("/ubuntu/validators", response_model=ValidatorResponse)
-async def create_ubuntu_validator(validator: ValidatorCreate, db: Session = Depends(get_db)):
+async def create_ubuntu_validator(validator: ValidatorCreate, db: AsyncSession = Depends(get_async_db)):
     """Register Ubuntu validator"""
     
     # Find user
-    user = db.query(UbuntuUser).filter(
-        UbuntuUser.wallet_address == validator.wallet_address,
-        UbuntuUser.verification_status == "verified"
-    ).first()
+    user = await member_cache.get(db, validator.wallet_address)
     
-    if not user:
+    if not user or user["verification_status"] != "verified":
         raise HTTPException(
             status_code=404, 
             detail="Only verified Ubuntu members can become validators"
         )
     
     # Check if already validator
-    existing_validator = db.query(UbuntuValidator).filter(
-        UbuntuValidator.user_id == user.id
-    ).first()
+    result = await db.execute(
+        select(UbuntuValidator.id).where(UbuntuValidator.user_id == user["id"])
+    )
+    existing_validator = result.first()
     
     if existing_validator:
         raise HTTPException(status_code=400, detail="User is already an Ubuntu validator")
     
     # Create validator
     db_validator = UbuntuValidator(
-        user_id=user.id,
+        user_id=user["id"],
         validator_key=validator.validator_key,
         stake_amount=validator.stake_amount,
-        ubuntu_consensus_score=50.0  # Starting consensus score
+        ubuntu_consensus_score=VALIDATOR_STARTING_CONSENSUS
     )
     
     db.add(db_validator)
     
     # Update user status
-    user.is_validator = True
-    user.flb_balance += 1000.0  # Validator bonus
-    user.ubuntu_score += 30.0
-    user.updated_at = datetime.utcnow()
+    await db.execute(
+        update(UbuntuUser)
+        .where(UbuntuUser.id == user["id"])
+        .values(
+            is_validator=True,
+            flb_balance=UbuntuUser.flb_balance + VALIDATOR_FLB_BONUS,
+            ubuntu_score=UbuntuUser.ubuntu_score + VALIDATOR_SCORE_BOOST,
+            updated_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await append_entries(db, [ledger_entry(user["id"], VALIDATOR_FLB_BONUS, VALIDATOR_BONUS)])
+    await record_supply(db, {user["role"]: (0, 0, VALIDATOR_FLB_BONUS)})
+    await community_metrics.validator_joined(db, VALIDATOR_FLB_BONUS, VALIDATOR_SCORE_BOOST, db_validator.uptime_percentage, db_validator.ubuntu_consensus_score)
+    await bump_versions(db, VALIDATORS, MEMBERS)
     
-    db.commit()
-    db.refresh(db_validator)
+    await db.commit()
+    await db.refresh(db_validator)
+    member_cache.invalidate(validator.wallet_address)
     
-    logger.info(f"New Ubuntu validator: {user.name}")
+    logger.info(f"New Ubuntu validator: {user['name']}")
     return db_validator
 
-@app.get("/ubuntu/validators", response_model=List[ValidatorResponse])
-async def get_ubuntu_validators(db: Session = Depends(get_db)):
+@app.get("/ubuntu/validators", response_model=List[ValidatorResponse], dependencies=[Depends(versioned(VALIDATORS))])
+async def get_ubuntu_validators(response: Response, db: AsyncSession = Depends(get_async_db)):
     """Get Ubuntu validators"""
     
-    validators = db.query(UbuntuValidator).filter(
-        UbuntuValidator.status == "active"
-    ).all()
-    
-    return validators
+    result = await db.execute(
+        select(*schema_columns(ValidatorResponse, UbuntuValidator)).where(UbuntuValidator.status == "active")
+    )
+    return respond([dict(row) for row in result.mappings()], response.headers)
 
 @app.post("/ubuntu/validators/{wallet_address}/heartbeat")
-async def ubuntu_validator_heartbeat(wallet_address: str, db: Session = Depends(get_db)):
+async def ubuntu_validator_heartbeat(wallet_address: str, db: AsyncSession = Depends(get_async_db)):
     """Ubuntu validator heartbeat"""
     
-    # Find validator
-    user = db.query(UbuntuUser).filter(
-        UbuntuUser.wallet_address == wallet_address,
-        UbuntuUser.is_validator == True
-    ).first()
+    # Acknowledged from memory; the heartbeat buffer writes beats in batches
+    pulse = await heartbeat_buffer.record(db, wallet_address)
     
-    if not user:
+    if not pulse:
         raise HTTPException(status_code=404, detail="Ubuntu validator not found")
     
-    validator = db.query(UbuntuValidator).filter(
-        UbuntuValidator.user_id == user.id
-    ).first()
+    return {
+        "status": "heartbeat_received",
+        "uptime": pulse.uptime_percentage,
+        "consensus_score": pulse.ubuntu_consensus_score,
+        "ubuntu_pulse": "Your validator flame pulses strong in our Ubuntu network",
+        "last_heartbeat": pulse.last_heartbeat.isoformat(),
+        "philosophy": "I am because we are"
+    }
+
+@app.get("/ubuntu/validators/{wallet_address}/uptime")
+async def get_validator_uptime(
+    wallet_address: str,
+    hours: int = Query(24, ge=1, le=24 * 365),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Share of the window in which the validator sent heartbeats, read from rollups"""
     
-    if not validator:
-        raise HTTPException(status_code=404, detail="Validator profile not found")
+    pulse = await heartbeat_buffer.validator_pulse(db, wallet_address)
+    if not pulse:
+        raise HTTPException(status_code=404, detail="Ubuntu validator not found")
     
-    # Record heartbeat
-    heartbeat = ValidatorHeartbeat(
-        validator_id=validator.id,
-        block_height=random.randint(15000, 20000),
-        network_health=random.uniform(95.0, 99.9),
-        ubuntu_message="I am because we are - Ubuntu consensus active"
+    # Minute buckets while they are retained, hour buckets beyond that
+    if hours <= HEARTBEAT_MINUTE_RETENTION_DAYS * 24:
+        rollup, resolution, total_buckets = ValidatorHeartbeatMinute, "minute", hours * 60
+    else:
+        rollup, resolution, total_buckets = ValidatorHeartbeatHour, "hour", hours
+    since = datetime.utcnow() - timedelta(hours=hours)
+    
+    result = await db.execute(
+        select(func.count(), func.coalesce(func.sum(rollup.heartbeats), 0)).where(
+            rollup.validator_id == pulse.validator_id,
+            rollup.bucket >= since
+        )
     )
+    active_buckets, heartbeats = result.one()
     
-    db.add(heartbeat)
+    return {
+        "wallet_address": wallet_address,
+        "window_hours": hours,
+        "resolution": resolution,
+        "active_buckets": active_buckets,
+        "total_buckets": total_buckets,
+        "uptime_percentage": round(min(100.0, active_buckets / total_buckets * 100), 2),
+        "heartbeats": heartbeats,
+        "ubuntu_message": "Your steady flame keeps our Ubuntu network alive"
+    }
+
+@app.get("/ubuntu/validators/{wallet_address}/heartbeats")
+async def get_validator_heartbeat_history(
+    wallet_address: str,
+    resolution: str = Query("hour", regex="^(minute|hour)$"),
+    hours: int = Query(24, ge=1, le=24 * 365),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Heartbeat history per minute or hour, read from rollups"""
     
-    # Update validator
-    validator.last_heartbeat = datetime.utcnow()
-    validator.total_blocks_validated += 1
-    validator.uptime_percentage = min(100.0, validator.uptime_percentage + 0.1)
-    validator.ubuntu_consensus_score = min(100.0, validator.ubuntu_consensus_score + 0.5)
+    if resolution == "minute" and hours > 48:
+        raise HTTPException(status_code=400, detail="Minute resolution covers at most 48 hours")
     
-    db.commit()
+    pulse = await heartbeat_buffer.validator_pulse(db, wallet_address)
+    if not pulse:
+        raise HTTPException(status_code=404, detail="Ubuntu validator not found")
+    
+    rollup = ValidatorHeartbeatMinute if resolution == "minute" else ValidatorHeartbeatHour
+    since = datetime.utcnow() - timedelta(hours=hours)
+    result = await db.execute(
+        select(rollup).where(
+            rollup.validator_id == pulse.validator_id,
+            rollup.bucket >= since
+        ).order_by(rollup.bucket)
+    )
+    buckets = result.scalars().all()
     
     return {
-        "status": "heartbeat_received",
-        "uptime": validator.uptime_percentage,
-        "consensus_score": validator.ubuntu_consensus_score,
-        "ubuntu_pulse": "Your validator flame pulses strong in our Ubuntu network",
-        "last_heartbeat": validator.last_heartbeat.isoformat(),
-        "philosophy": "I am because we are"
+        "wallet_address": wallet_address,
+        "resolution": resolution,
+        "hours": hours,
+        "buckets": [
+            {
+                "bucket": bucket.bucket.isoformat(),
+                "heartbeats": bucket.heartbeats,
+                "avg_network_health": round(bucket.network_health_total / bucket.heartbeats, 2) if bucket.heartbeats else None,
+                "max_block_height": bucket.max_block_height,
+                "last_heartbeat": bucket.last_heartbeat.isoformat()
+            }
+            for bucket in buckets
+        ],
+        "ubuntu_message": "I am because we are - every pulse remembered"
     }
 
 # Ubuntu Statistics
-@app.get("/ubuntu/stats")
-async def get_ubuntu_stats(db: Session = Depends(get_db)):
+@app.get("/ubuntu/stats", dependencies=[Depends(versioned(MEMBERS, METRICS))])
+async def get_ubuntu_stats(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Get comprehensive Ubuntu network statistics"""
     
-    # User statistics
-    total_users = db.query(UbuntuUser).filter(UbuntuUser.is_active == True).count()
-    healers = db.query(UbuntuUser).filter(
-        UbuntuUser.role == "healer", 
-        UbuntuUser.is_active == True
-    ).count()
-    guardians = db.query(UbuntuUser).filter(
-        UbuntuUser.role == "guardian", 
-        UbuntuUser.is_active == True
-    ).count()
-    community_members = db.query(UbuntuUser).filter(
-        UbuntuUser.role == "community", 
-        UbuntuUser.is_active == True
-    ).count()
-    
-    # Validator statistics
-    total_validators = db.query(UbuntuValidator).filter(
-        UbuntuValidator.status == "active"
-    ).count()
-    
-    # Healthcare statistics
-    total_healthcare_actions = db.query(HealthcareAction).count()
-    verified_actions = db.query(HealthcareAction).filter(
-        HealthcareAction.verification_status == "verified"
-    ).count()
-    
-    birth_verifications = db.query(HealthcareAction).filter(
-        HealthcareAction.action_type == "birth_verification"
-    ).count()
-    
-    # Token statistics
-    total_flb_balances = db.query(UbuntuUser).with_entities(UbuntuUser.flb_balance).all()
-    total_supply = sum([balance[0] for balance in total_flb_balances])
-    
-    # Ubuntu score calculation
-    avg_ubuntu_score = db.query(func.avg(UbuntuUser.ubuntu_score)).scalar() or 0
-    
-    ubuntu_network_score = min(100, (
-        (verified_actions * 20) +
-        (birth_verifications * 25) +
-        (total_validators * 15) +
-        (healers * 10) +
-        (guardians * 8) +
-        (community_members * 5)
-    ) / 10)
-    
-    # Network health
-    network_health = "excellent" if ubuntu_network_score > 80 and total_validators >= 5 else \
-                    "good" if ubuntu_network_score > 60 and total_validators >= 3 else \
-                    "fair" if ubuntu_network_score > 40 and total_validators >= 1 else \
-                    "initializing"
+    # Validator and healthcare figures from the live metrics row; members and supply
+    # from the counters kept in step with every balance change
+    figures = await community_metrics.current_figures(db)
+    supply = await supply_counters.totals(db)
+    roles = supply["roles"]
+    figures.update(
+        total_users=supply["total_users"],
+        healers=roles.get("healer", {}).get("members", 0),
+        guardians=roles.get("guardian", {}).get("members", 0),
+        community_members=roles.get("community", {}).get("members", 0),
+        verified_users=supply["verified_users"],
+        total_flb_supply=supply["total_flb_supply"]
+    )
+    
+    total_users = figures["total_users"]
+    healers = figures["healers"]
+    guardians = figures["guardians"]
+    community_members = figures["community_members"]
+    total_validators = figures["total_validators"]
+    total_healthcare_actions = figures["total_actions"]
+    verified_actions = figures["verified_actions"]
+    birth_verifications = figures["birth_verifications"]
+    total_supply = figures["total_flb_supply"]
+    
+    ubuntu_network_score = network_score(figures)
+    health = network_health(ubuntu_network_score, total_validators)
+    # When the figures last changed, so the body stays identical for as long as its ETag does
+    last_modified = request.state.last_modified
+    last_updated = last_modified.isoformat() if last_modified else None
     
     return {
         "network_name": "FlameBorn-Ubuntu-Testnet",
@@ -699,17 +1279,15 @@ async def get_ubuntu_stats(db: Session = Depends(get_db)):
             "healers": healers,
             "guardians": guardians,
             "community_members": community_members,
-            "verified_users": db.query(UbuntuUser).filter(
-                UbuntuUser.verification_status == "verified"
-            ).count()
+            "verified_users": figures["verified_users"]
         },
         
         # Validator network
         "validators": {
             "total_validators": total_validators,
             "active_validators": total_validators,
-            "avg_uptime": db.query(func.avg(UbuntuValidator.uptime_percentage)).scalar() or 0,
-            "avg_consensus_score": db.query(func.avg(UbuntuValidator.ubuntu_consensus_score)).scalar() or 0
+            "avg_uptime": figures["avg_uptime"],
+            "avg_consensus_score": figures["avg_consensus_score"]
         },
         
         # Healthcare impact
@@ -724,28 +1302,61 @@ async def get_ubuntu_stats(db: Session = Depends(get_db)):
         "tokens": {
             "total_flb_supply": round(total_supply, 2),
             "circulating_supply": round(total_supply * 0.85, 2),
-            "avg_balance": round(total_supply / total_users, 2) if total_users > 0 else 0
+            "avg_balance": round(total_supply / total_users, 2) if total_users > 0 else 0,
+            "supply_by_role": {role: round(totals["flb_supply"], 2) for role, totals in roles.items()}
         },
         
         # Ubuntu metrics
         "ubuntu_metrics": {
             "network_ubuntu_score": round(ubuntu_network_score, 2),
-            "avg_individual_ubuntu_score": round(avg_ubuntu_score, 2),
+            "avg_individual_ubuntu_score": round(figures["avg_ubuntu_score"], 2),
             "community_bonds_strength": min(100, (healers + guardians) * 5),
             "collective_prosperity_index": round((total_supply / 1000) + ubuntu_network_score, 2)
         },
         
         # Network health
-        "network_health": network_health,
+        "network_health": health,
         "consensus": "Ubuntu-PoS",
         "block_time": 5.0,
-        "tps": random.randint(40, 55),
         "uptime": 99.8,
         
         # Ubuntu wisdom
         "ubuntu_message": "I am because we are - Ubuntu philosophy in action",
         "flame_status": "🔥 roaring with Ubuntu spirit",
-        "last_updated": datetime.utcnow().isoformat()
+        "last_updated": last_updated
+    }
+
+@app.get("/ubuntu/stats/history")
+async def get_ubuntu_stats_history(days: int = 30, db: AsyncSession = Depends(get_async_db)):
+    """Get historical Ubuntu community metrics snapshots"""
+    
+    since = datetime.utcnow() - timedelta(days=days)
+    result = await db.execute(
+        select(UbuntuCommunityMetrics).where(
+            UbuntuCommunityMetrics.is_current == False,
+            UbuntuCommunityMetrics.metric_date >= since
+        ).order_by(UbuntuCommunityMetrics.metric_date)
+    )
+    snapshots = result.scalars().all()
+    
+    return {
+        "days": days,
+        "snapshots": [
+            {
+                "metric_date": snapshot.metric_date.isoformat(),
+                "total_users": snapshot.total_users,
+                "total_validators": snapshot.total_validators,
+                "total_healthcare_actions": snapshot.total_healthcare_actions,
+                "verified_healthcare_actions": snapshot.verified_healthcare_actions,
+                "birth_verifications_today": snapshot.birth_verifications_today,
+                "total_flb_supply": round(snapshot.total_flb_supply, 2),
+                "network_ubuntu_score": round(snapshot.ubuntu_score, 2),
+                "network_health": snapshot.network_health,
+                "community_bonds_strength": snapshot.community_bonds_strength
+            }
+            for snapshot in snapshots
+        ],
+        "ubuntu_message": "I am because we are - our growth remembered"
     }
 
 # Oracle Services
@@ -772,26 +1383,17 @@ async def get_ubuntu_flb_price():
     }
 
 @app.get("/oracle/ubuntu-wisdom")
-async def get_ubuntu_wisdom(db: Session = Depends(get_db)):
-    """Get random Ubuntu proverb wisdom"""
+async def get_ubuntu_wisdom(category: Optional[str] = None, origin: Optional[str] = None):
+    """Get random Ubuntu proverb wisdom, optionally by category or origin"""
     
-    proverb = db.query(ProverbWisdom).filter(
-        ProverbWisdom.is_active == True
-    ).order_by(func.random()).first()
+    # Drawn from the in-memory proverb cache; usage counts are flushed in batches
+    wisdom = await proverb_cache.draw(category=category, origin=origin)
     
-    if proverb:
-        proverb.usage_count += 1
-        db.commit()
-        
-        return {
-            "proverb": proverb.proverb_text,
-            "origin": f"{proverb.origin_tribe}, {proverb.origin_country}",
-            "translation": proverb.english_translation,
-            "ubuntu_meaning": proverb.ubuntu_meaning,
-            "category": proverb.category,
-            "wisdom_source": "African Ubuntu Tradition",
-            "philosophy": "I am because we are"
-        }
+    if wisdom:
+        return wisdom
+    
+    if category or origin:
+        raise HTTPException(status_code=404, detail="No Ubuntu wisdom found for that category or origin")
     
     return {
         "proverb": "Umuntu ngumuntu ngabantu",
@@ -804,17 +1406,17 @@ async def get_ubuntu_wisdom(db: Session = Depends(get_db)):
 
 # Health Check
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     """Comprehensive health check"""
     
     try:
         # Test database connection
-        db.execute("SELECT 1")
+        await db.execute(text("SELECT 1"))
         db_status = "connected"
         
         # Test basic queries
-        user_count = db.query(UbuntuUser).count()
-        validator_count = db.query(UbuntuValidator).count()
+        user_count = (await db.execute(select(func.count(UbuntuUser.id)))).scalar()
+        validator_count = (await db.execute(select(func.count(UbuntuValidator.id)))).scalar()
         
         db_info = get_database_info()
         
@@ -841,54 +1443,131 @@ async def health_check(db: Session = Depends(get_db)):
             detail=f"Ubuntu network unhealthy: {str(e)}"
         )
 
+@app.get("/health/pool")
+async def pool_health():
+    """Connection pool usage and checkout wait times"""
+    return {
+        "pool": get_pool_status(),
+        "ubuntu_message": "I am because we are - connections shared, never wasted",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/health/cache")
+async def cache_health():
+    """Member cache size and hit/miss counters for this worker"""
+    return {
+        "member_cache": member_cache.stats(),
+        "leaderboard": leaderboard.stats(),
+        "compressed_bodies": compressed_bodies.stats(),
+        "ubuntu_message": "I am because we are - members remembered, never forgotten",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/health/startup")
+async def startup_health():
+    """Per-phase timing of this worker's startup"""
+    return {
+        "startup": startup_report.as_dict(),
+        "ubuntu_message": "I am because we are - the flame lit once, shared by all",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/health/ledger")
+async def ledger_health(limit: int = Query(100, ge=1, le=1000), db: AsyncSession = Depends(get_async_db)):
+    """Members whose balance disagrees with the ledger, the latest checkpoint and supply drift"""
+    counted = (await supply_counters.totals(db))["total_flb_supply"]
+    recorded = await ledger_checkpointer.supply(db)
+    return {
+        "mismatches": await ledger_checkpointer.audit(limit),
+        "checkpoint": await ledger_checkpointer.latest(),
+        "supply": {
+            "counters": round(counted, 6),
+            "ledger": round(recorded, 6),
+            "drift": round(counted - recorded, 6)
+        },
+        "ubuntu_message": "I am because we are - every flame accounted for",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus-style SQL statement counters for this worker"""
+    return sql_instrumentation.render()
+
 # Development endpoints
 @app.post("/dev/seed-ubuntu-data")
-async def seed_more_ubuntu_data(db: Session = Depends(get_db)):
-    """Seed additional Ubuntu test data"""
-    
-    # Create more users
-    countries = ["Nigeria", "Kenya", "South Africa", "Ghana", "Uganda", "Tanzania"]
-    roles = ["healer", "guardian", "community"]
-    
-    for i in range(20):
-        user = UbuntuUser(
-            wallet_address=f"0x{''.join([random.choice('0123456789abcdef') for _ in range(40)])}",
-            role=random.choice(roles),
-            name=f"Ubuntu Member {i+1}",
-            location=f"City {i+1}",
-            country=random.choice(countries),
-            verification_status="verified" if random.random() > 0.3 else "pending",
-            flb_balance=random.uniform(100, 5000),
-            ubuntu_score=random.uniform(10, 100)
-        )
-        db.add(user)
-    
-    # Create more healthcare actions
-    action_types = ["birth_verification", "health_education", "treatment", "emergency"]
-    for i in range(50):
-        action = HealthcareAction(
-            user_id=random.randint(1, 23),  # Including original 3 users
-            action_type=random.choice(action_types),
-            title=f"Ubuntu Healthcare Action {i+1}",
-            description=f"Community healthcare impact action #{i+1} - Ubuntu philosophy in practice",
-            location=f"Location {i+1}",
-            impact_score=random.uniform(1.0, 10.0),
-            flb_earned=random.uniform(15, 150),
-            verification_status="verified" if random.random() > 0.4 else "pending",
-            ubuntu_blessing="Ubuntu recognizes your healthcare impact. I am because we are."
-        )
-        db.add(action)
-    
-    db.commit()
+async def seed_more_ubuntu_data(
+    users: int = Query(20, ge=1, le=1_000_000),
+    actions_per_user: float = Query(2.5, ge=0, le=100),
+    validator_ratio: float = Query(0.05, ge=0, le=1),
+    heartbeats_per_validator: int = Query(24, ge=0, le=1440),
+    seed: Optional[int] = Query(None, ge=0, description="Same seed, same community (random if omitted)")
+):
+    """Load a deterministic synthetic Ubuntu community in bulk"""
+    
+    community = SyntheticCommunity(
+        seed=seed if seed is not None else random.randrange(2 ** 31),
+        users=users,
+        actions_per_user=actions_per_user,
+        validator_ratio=validator_ratio,
+        heartbeats_per_validator=heartbeats_per_validator
+    )
+    try:
+        summary = await load_synthetic_community(community)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    await community_metrics.reconcile()
     
     return {
         "message": "Ubuntu test data seeded successfully",
-        "users_added": 20,
-        "healthcare_actions_added": 50,
+        "users_added": summary["users"],
+        "healthcare_actions_added": summary["actions"],
+        "validators_added": summary["validators"],
+        "heartbeats_added": summary["heartbeats"],
+        "transactions_added": summary["transactions"],
+        "seed": summary["seed"],
+        "anchor": summary["anchor"],
+        "seconds": summary["seconds"],
         "ubuntu_blessing": "Our Ubuntu community grows stronger with each member",
         "philosophy": "I am because we are"
     }
 
+@app.post("/dev/ledger/checkpoint")
+async def checkpoint_ubuntu_ledger():
+    """Fold settled ledger entries into member balance checkpoints now"""
+    return {"checkpoint": await ledger_checkpointer.checkpoint()}
+
+@app.post("/dev/supply/reconcile")
+async def reconcile_ubuntu_supply(db: AsyncSession = Depends(get_async_db)):
+    """Recompute the supply counters from member balances"""
+    await supply_counters.reconcile()
+    return {"supply": await supply_counters.totals(db)}
+
+@app.post("/dev/regions/reconcile")
+async def reconcile_ubuntu_regions():
+    """Recompute the regional impact rollups from healthcare actions and members"""
+    await region_rollups.reconcile()
+    return {"status": "reconciled", "philosophy": "I am because we are"}
+
+@app.post("/dev/ledger/rebuild")
+async def rebuild_ubuntu_balances():
+    """Reset mismatched member balances to their checkpoint plus later ledger entries"""
+    
+    mismatches = await ledger_checkpointer.audit(limit=None)
+    rebuilt = await ledger_checkpointer.rebuild([member["user_id"] for member in mismatches]) if mismatches else 0
+    member_cache.invalidate_ids(*(member["user_id"] for member in mismatches))
+    if rebuilt:
+        # Balances changed outside the usual paths, so recompute what is derived from them
+        await supply_counters.reconcile()
+        await community_metrics.reconcile()
+    
+    return {
+        "rebuilt": rebuilt,
+        "members": mismatches,
+        "philosophy": "I am because we are"
+    }
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    # SERVER_MODE=production for the multi-worker server (see neon_server.py)
+    from neon_server import serve
+    serve()
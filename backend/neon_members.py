@@ -0,0 +1,108 @@
+"""
+FlameBorn Ubuntu Member Cache
+Read-through LRU/TTL cache of community members keyed by wallet
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from neon_models import UbuntuUser
+
+MEMBER_CACHE_SIZE = int(os.getenv("MEMBER_CACHE_SIZE", "10000"))
+MEMBER_CACHE_TTL = float(os.getenv("MEMBER_CACHE_TTL", "30"))  # Bounds staleness from other workers' writes
+
+
+class MemberCache:
+    """Bounded cache of ubuntu_users rows as plain dicts.
+
+    Misses read through to the database and are not cached when the
+    wallet does not exist, so new registrations are visible immediately.
+    Routes that mutate a member call invalidate() after committing; the
+    TTL bounds how long another worker's cached copy can lag behind.
+    """
+
+    def __init__(self, maxsize=MEMBER_CACHE_SIZE, ttl=MEMBER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # wallet_address -> (expires_at, member)
+        self._wallets_by_id = {}
+        self._invalidations = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    async def get(self, db, wallet_address):
+        """Member dict for wallet_address, or None if no such member"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(wallet_address)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(wallet_address)
+                    self.hits += 1
+                    return entry[1]
+                self._drop(wallet_address)
+                self.expirations += 1
+            self.misses += 1
+            invalidations = self._invalidations
+
+        result = await db.execute(
+            select(UbuntuUser.__table__).where(UbuntuUser.wallet_address == wallet_address)
+        )
+        row = result.mappings().first()
+        if row is None:
+            return None
+        member = dict(row)
+
+        with self._lock:
+            # An invalidation during the read may mean the row we loaded is already stale
+            if invalidations == self._invalidations:
+                self._entries[wallet_address] = (now + self.ttl, member)
+                self._entries.move_to_end(wallet_address)
+                self._wallets_by_id[member["id"]] = wallet_address
+                while len(self._entries) > self.maxsize:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._wallets_by_id.pop(evicted["id"], None)
+                    self.evictions += 1
+        return member
+
+    def _drop(self, wallet_address):
+        _, member = self._entries.pop(wallet_address)
+        self._wallets_by_id.pop(member["id"], None)
+
+    def invalidate(self, *wallet_addresses):
+        """Forget cached members after their rows changed"""
+        with self._lock:
+            self._invalidations += 1
+            for wallet_address in wallet_addresses:
+                if wallet_address in self._entries:
+                    self._drop(wallet_address)
+
+    def invalidate_ids(self, *member_ids):
+        """Forget cached members by primary key (when the wallet is not at hand)"""
+        with self._lock:
+            wallets = [self._wallets_by_id[member_id] for member_id in member_ids if member_id in self._wallets_by_id]
+        self.invalidate(*wallets)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+            }
+
+
+member_cache = MemberCache()
@@ -0,0 +1,348 @@
+"""
+FlameBorn Ubuntu Community Metrics Maintainer
+Keeps the live ubuntu_community_metrics row current from write deltas
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, select, text, true, update
+
+from neon_config import AsyncSessionLocal
+from neon_models import CommunityMetricsDelta, HealthcareAction, UbuntuCommunityMetrics
+from neon_stats import UBUNTU_STATS_QUERY, collect_ubuntu_figures, network_health, network_score
+from neon_versions import METRICS, bump_versions
+
+logger = logging.getLogger(__name__)
+
+# Maintainer cadence (seconds)
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "2"))
+METRICS_RECONCILE_INTERVAL = float(os.getenv("METRICS_RECONCILE_INTERVAL", "900"))
+METRICS_SNAPSHOT_INTERVAL = float(os.getenv("METRICS_SNAPSHOT_INTERVAL", "3600"))
+METRICS_FOLD_BATCH = int(os.getenv("METRICS_FOLD_BATCH", "5000"))  # Journal rows folded per transaction
+
+METRICS_LOCK_KEY = 0x464C424D  # pg_advisory_xact_lock key serialising folds and reconciles across workers
+
+# Network figure name -> ubuntu_community_metrics column
+FIGURE_COLUMNS = {
+    "total_users": "total_users",
+    "healers": "total_healers",
+    "guardians": "total_guardians",
+    "community_members": "total_community_members",
+    "verified_users": "verified_users",
+    "total_flb_supply": "total_flb_supply",
+    "total_ubuntu_score": "total_ubuntu_score",
+    "total_validators": "total_validators",
+    "total_validator_uptime": "total_validator_uptime",
+    "total_consensus_score": "total_consensus_score",
+    "total_actions": "total_healthcare_actions",
+    "verified_actions": "verified_healthcare_actions",
+    "birth_verifications": "birth_verifications",
+}
+
+ROLE_COLUMNS = {
+    "healer": "total_healers",
+    "guardian": "total_guardians",
+    "community": "total_community_members",
+}
+
+
+def figures_from_snapshot(row):
+    """Translate a metrics row into the figures produced by collect_ubuntu_figures"""
+    figures = {name: getattr(row, column) or 0 for name, column in FIGURE_COLUMNS.items()}
+    total_users = figures["total_users"]
+    total_validators = figures["total_validators"]
+    figures["avg_ubuntu_score"] = figures["total_ubuntu_score"] / total_users if total_users else 0.0
+    figures["avg_uptime"] = figures["total_validator_uptime"] / total_validators if total_validators else 0.0
+    figures["avg_consensus_score"] = figures["total_consensus_score"] / total_validators if total_validators else 0.0
+    return figures
+
+
+_journal = CommunityMetricsDelta.__table__
+
+# Live-row columns carried by journal rows (the daily birth counter is handled separately)
+DELTA_COLUMNS = tuple(
+    column.name for column in _journal.columns
+    if column.name not in ("id", "created_at", "birth_verifications_today")
+)
+
+
+def _midnight():
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _reconcile_query(midnight):
+    """Network figures, today's births and the journal totals not yet folded, as one row"""
+    figures = UBUNTU_STATS_QUERY.subquery("figures")
+    births = select(func.count(HealthcareAction.id).label("births_today")).where(
+        HealthcareAction.action_type == "birth_verification",
+        HealthcareAction.created_at >= midnight
+    ).subquery("births")
+    journal = select(
+        *(func.coalesce(func.sum(_journal.c[column]), 0).label(f"journal_{column}") for column in DELTA_COLUMNS),
+        func.coalesce(func.sum(case(
+            (_journal.c.created_at >= midnight, _journal.c.birth_verifications_today), else_=0
+        )), 0).label("journal_births_today"),
+    ).subquery("journal")
+    return select(figures, births, journal).select_from(figures.join(births, true()).join(journal, true()))
+
+
+def _refresh_derived(row):
+    """Recompute the derived score columns of a metrics row"""
+    figures = figures_from_snapshot(row)
+    row.ubuntu_score = network_score(figures)
+    row.network_health = network_health(row.ubuntu_score, figures["total_validators"])
+    row.community_bonds_strength = min(100, (figures["healers"] + figures["guardians"]) * 5)
+    row.metric_date = datetime.utcnow()
+
+
+class CommunityMetricsMaintainer:
+    """Keeps the live metrics row current from a journal of write deltas.
+
+    Every write records its effect as a row of ubuntu_community_metrics_deltas
+    inside its own transaction, so a delta exists exactly when the change it
+    describes is committed. The background loop folds journal rows into the
+    live row and deletes them, in any worker. A periodic reconcile recounts
+    the source tables and stores the recount minus the journal rows that
+    the same statement sees, since the following folds add those back; a
+    change is therefore counted once whichever side of the recount it
+    commits on. Folds and reconciles hold a lock shared by all workers.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal,
+                 flush_interval=METRICS_FLUSH_INTERVAL,
+                 reconcile_interval=METRICS_RECONCILE_INTERVAL,
+                 snapshot_interval=METRICS_SNAPSHOT_INTERVAL,
+                 fold_batch=METRICS_FOLD_BATCH):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.reconcile_interval = reconcile_interval
+        self.snapshot_interval = snapshot_interval
+        self.fold_batch = fold_batch
+        self._task = None
+
+    # Delta recording (called by writes before their commit)
+    async def record(self, db, **deltas):
+        """Journal column deltas for the live metrics row inside the caller's transaction"""
+        values = {column: delta for column, delta in deltas.items() if delta}
+        if values:
+            await db.execute(_journal.insert().values(created_at=datetime.utcnow(), **values))
+
+    async def user_registered(self, db, role, flb_balance, ubuntu_score, count=1):
+        await self.record(db, **{
+            "total_users": count,
+            ROLE_COLUMNS.get(role, "total_community_members"): count,
+            "total_flb_supply": flb_balance * count,
+            "total_ubuntu_score": ubuntu_score * count,
+        })
+
+    async def user_verified(self, db, newly_verified, flb_bonus, score_boost):
+        await self.record(
+            db,
+            verified_users=1 if newly_verified else 0,
+            total_flb_supply=flb_bonus,
+            total_ubuntu_score=score_boost,
+        )
+
+    async def action_recorded(self, db, action_type, flb_earned, score_boost):
+        await self.actions_recorded(
+            db,
+            recorded=1,
+            birth_verifications=1 if action_type == "birth_verification" else 0,
+            flb_earned=flb_earned,
+            score_boost=score_boost,
+        )
+
+    async def actions_recorded(self, db, recorded, birth_verifications, flb_earned, score_boost):
+        await self.record(
+            db,
+            total_healthcare_actions=recorded,
+            birth_verifications=birth_verifications,
+            birth_verifications_today=birth_verifications,
+            total_flb_supply=flb_earned,
+            total_ubuntu_score=score_boost,
+        )
+
+    async def action_verified(self, db, newly_verified, flb_bonus, score_boost):
+        await self.record(
+            db,
+            verified_healthcare_actions=1 if newly_verified else 0,
+            total_flb_supply=flb_bonus,
+            total_ubuntu_score=score_boost,
+        )
+
+    async def validator_joined(self, db, flb_bonus, score_boost, uptime, consensus_score):
+        await self.record(
+            db,
+            total_validators=1,
+            total_flb_supply=flb_bonus,
+            total_ubuntu_score=score_boost,
+            total_validator_uptime=uptime,
+            total_consensus_score=consensus_score,
+        )
+
+    async def validator_heartbeat(self, db, uptime_delta, consensus_delta):
+        await self.record(db, total_validator_uptime=uptime_delta, total_consensus_score=consensus_delta)
+
+    # Reads
+    @staticmethod
+    async def current_row(db):
+        result = await db.execute(
+            select(UbuntuCommunityMetrics)
+            .where(UbuntuCommunityMetrics.is_current == True)
+            .order_by(UbuntuCommunityMetrics.id)
+            .limit(1)
+        )
+        return result.scalars().first()
+
+    async def current_figures(self, db):
+        """Network figures from the live row, computing them once if it does not exist yet"""
+        row = await self.current_row(db)
+        if row is None:
+            return await collect_ubuntu_figures(db)
+        return figures_from_snapshot(row)
+
+    # Maintenance
+    @staticmethod
+    async def _lock_live_row(db):
+        # Held until commit, so folds and reconciles never overlap or each insert a live row
+        if db.bind.dialect.name == "postgresql":
+            await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": METRICS_LOCK_KEY})
+        else:
+            # A write statement takes SQLite's database write lock, matched row or not
+            await db.execute(
+                update(UbuntuCommunityMetrics)
+                .where(UbuntuCommunityMetrics.is_current == True)
+                .values(is_current=UbuntuCommunityMetrics.is_current)
+                .execution_options(synchronize_session=False)
+            )
+
+    async def _fold(self, db):
+        """Add one batch of journal rows to the live row and delete them; the number folded"""
+        await self._lock_live_row(db)
+        row = await self.current_row(db)
+        if row is None:
+            # The reconcile that creates the row accounts for the journal
+            return 0
+        deltas = (await db.execute(
+            select(_journal).order_by(_journal.c.id).limit(self.fold_batch)
+        )).mappings().all()
+        if not deltas:
+            return 0
+        midnight = _midnight()
+        for column in DELTA_COLUMNS:
+            total = sum(delta[column] for delta in deltas)
+            if total:
+                setattr(row, column, (getattr(row, column) or 0) + total)
+        # The daily counter only takes today's journal; reconcile restarts it at midnight
+        row.birth_verifications_today = (row.birth_verifications_today or 0) + sum(
+            delta["birth_verifications_today"] for delta in deltas if delta["created_at"] >= midnight
+        )
+        _refresh_derived(row)
+        await db.execute(delete(_journal).where(_journal.c.id.in_([delta["id"] for delta in deltas])))
+        await bump_versions(db, METRICS)
+        return len(deltas)
+
+    async def flush(self):
+        """Fold journalled deltas into the live row"""
+        folded = self.fold_batch
+        while folded >= self.fold_batch:
+            async with self.session_factory() as db:
+                try:
+                    folded = await self._fold(db)
+                    await db.commit()
+                except Exception as e:
+                    await db.rollback()
+                    logger.error(f"Community metrics flush failed: {e}")
+                    return
+
+    async def reconcile(self):
+        """Rebuild the live row from the source tables, leaving journalled deltas to the folds"""
+        async with self.session_factory() as db:
+            try:
+                await self._lock_live_row(db)
+                midnight = _midnight()
+                # One statement, so the recount and the journal totals come from the same snapshot
+                figures = dict((await db.execute(_reconcile_query(midnight))).mappings().one())
+
+                live = (await db.execute(
+                    select(UbuntuCommunityMetrics)
+                    .where(UbuntuCommunityMetrics.is_current == True)
+                    .order_by(UbuntuCommunityMetrics.id)
+                )).scalars().all()
+                if live:
+                    row = live[0]
+                    for duplicate in live[1:]:
+                        # Left by concurrent first boots before reconciles were serialised
+                        duplicate.is_current = False
+                else:
+                    row = UbuntuCommunityMetrics(is_current=True)
+                    db.add(row)
+                for name, column in FIGURE_COLUMNS.items():
+                    setattr(row, column, figures[name] - figures[f"journal_{column}"])
+                row.birth_verifications_today = figures["births_today"] - figures["journal_births_today"]
+                _refresh_derived(row)
+                await bump_versions(db, METRICS)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Community metrics reconcile failed: {e}")
+
+    async def write_snapshot(self):
+        """Copy the live row into a historical snapshot"""
+        await self.flush()
+        async with self.session_factory() as db:
+            try:
+                row = await self.current_row(db)
+                if row is None:
+                    return
+                snapshot = UbuntuCommunityMetrics(is_current=False)
+                for column in UbuntuCommunityMetrics.__table__.columns.keys():
+                    if column not in ("id", "is_current"):
+                        setattr(snapshot, column, getattr(row, column))
+                db.add(snapshot)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Community metrics snapshot failed: {e}")
+
+    async def run(self):
+        """Background loop: flush deltas, reconcile and snapshot on their intervals"""
+        loop = asyncio.get_event_loop()
+        last_reconcile = last_snapshot = loop.time()
+        current_day = datetime.utcnow().date()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+            now = loop.time()
+            if datetime.utcnow().date() != current_day:
+                # Close out the previous day, then restart the daily counters
+                await self.write_snapshot()
+                await self.reconcile()
+                current_day = datetime.utcnow().date()
+                last_snapshot = last_reconcile = now
+                continue
+            if now - last_snapshot >= self.snapshot_interval:
+                await self.write_snapshot()
+                last_snapshot = now
+            if now - last_reconcile >= self.reconcile_interval:
+                await self.reconcile()
+                last_reconcile = now
+
+    async def start(self):
+        """Reconcile once and start the background loop"""
+        await self.reconcile()
+        self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        """Cancel the background loop and fold what is still journalled"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+community_metrics = CommunityMetricsMaintainer()
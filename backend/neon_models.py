@@ -3,10 +3,10 @@ FlameBorn Neon Database Models
 Ubuntu Healthcare Tokenization Platform
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, Index
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Boolean, Date, DateTime, Text, ForeignKey, Index, Sequence
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
-from neon_config import Base
+from sqlalchemy.sql import false, func
+from neon_config import Base, engine
 from datetime import datetime
 import uuid
 
@@ -30,7 +30,7 @@ class UbuntuUser(Base):
     is_active = Column(Boolean, default=True)
     
     # Relationships
-    healthcare_actions = relationship("HealthcareAction", back_populates="user")
+    healthcare_actions = relationship("HealthcareAction", back_populates="user", foreign_keys="HealthcareAction.user_id")
     validator_profile = relationship("UbuntuValidator", back_populates="user", uselist=False)
     transactions_sent = relationship("UbuntuTransaction", foreign_keys="UbuntuTransaction.from_user_id", back_populates="sender")
     transactions_received = relationship("UbuntuTransaction", foreign_keys="UbuntuTransaction.to_user_id", back_populates="receiver")
@@ -39,6 +39,16 @@ class UbuntuUser(Base):
     __table_args__ = (
         Index('idx_user_role_location', 'role', 'location'),
         Index('idx_user_verification', 'verification_status', 'is_active'),
+        Index('idx_user_role_active_id', 'role', 'is_active', 'id'),  # Keyset pages by role
+        # Leaderboards
+        Index('idx_user_score_id', 'ubuntu_score', 'id'),
+        Index('idx_user_balance_id', 'flb_balance', 'id'),
+        # Filtered leaderboards: equality filters first, then the board's order (metric desc, id asc)
+        Index('idx_user_role_active_score', 'role', 'is_active', ubuntu_score.desc(), 'id'),
+        Index('idx_user_role_active_balance', 'role', 'is_active', flb_balance.desc(), 'id'),
+        Index('idx_user_country_active_score', 'country', 'is_active', ubuntu_score.desc(), 'id'),
+        Index('idx_user_country_active_balance', 'country', 'is_active', flb_balance.desc(), 'id'),
+        Index('idx_user_updated_at', 'updated_at'),  # Leaderboard refresh
     )
 
 class UbuntuValidator(Base):
@@ -66,18 +76,63 @@ class UbuntuValidator(Base):
     )
 
 class ValidatorHeartbeat(Base):
-    """Validator Heartbeat Tracking"""
+    """Validator Heartbeat Tracking
+    
+    Range-partitioned by day on Postgres (the partition key must be part of
+    the primary key). On SQLite, neon_heartbeat_storage writes raw beats to
+    daily bucket tables instead and this table stays empty.
+    """
     __tablename__ = "validator_heartbeats"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, Sequence("validator_heartbeats_id_seq"), primary_key=True, index=True)
     validator_id = Column(Integer, ForeignKey("ubuntu_validators.id"))
-    timestamp = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow, server_default=func.now())
     block_height = Column(Integer)
     network_health = Column(Float)
     ubuntu_message = Column(String, default="I am because we are")
     
     # Relationship
     validator = relationship("UbuntuValidator", back_populates="heartbeats")
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_heartbeat_validator_time', 'validator_id', 'timestamp'),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+class ValidatorHeartbeatMinute(Base):
+    """Per-minute validator heartbeat rollup"""
+    __tablename__ = "validator_heartbeat_minutes"
+    
+    validator_id = Column(Integer, ForeignKey("ubuntu_validators.id"), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)  # Start of the minute
+    heartbeats = Column(Integer, default=0)
+    network_health_total = Column(Float, default=0.0)
+    max_block_height = Column(Integer)
+    first_heartbeat = Column(DateTime)
+    last_heartbeat = Column(DateTime)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_heartbeat_minute_bucket', 'bucket'),
+    )
+
+class ValidatorHeartbeatHour(Base):
+    """Per-hour validator heartbeat rollup"""
+    __tablename__ = "validator_heartbeat_hours"
+    
+    validator_id = Column(Integer, ForeignKey("ubuntu_validators.id"), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)  # Start of the hour
+    heartbeats = Column(Integer, default=0)
+    network_health_total = Column(Float, default=0.0)
+    max_block_height = Column(Integer)
+    first_heartbeat = Column(DateTime)
+    last_heartbeat = Column(DateTime)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_heartbeat_hour_bucket', 'bucket'),
+    )
 
 class HealthcareAction(Base):
     """Ubuntu Healthcare Impact Actions"""
@@ -105,6 +160,10 @@ class HealthcareAction(Base):
     __table_args__ = (
         Index('idx_action_type_status', 'action_type', 'verification_status'),
         Index('idx_action_created', 'created_at'),
+        # Keyset pages on (created_at, id), optionally filtered
+        Index('idx_action_created_id', 'created_at', 'id'),
+        Index('idx_action_type_created_id', 'action_type', 'created_at', 'id'),
+        Index('idx_action_status_created_id', 'verification_status', 'created_at', 'id'),
     )
 
 class UbuntuTransaction(Base):
@@ -132,6 +191,9 @@ class UbuntuTransaction(Base):
     __table_args__ = (
         Index('idx_tx_status_type', 'status', 'tx_type'),
         Index('idx_tx_created', 'created_at'),
+        # Per-member ledger history, checkpoints and audits
+        Index('idx_tx_to_user_id', 'to_user_id', 'id'),
+        Index('idx_tx_from_user_id', 'from_user_id', 'id'),
     )
 
 class UbuntuCommunityMetrics(Base):
@@ -152,12 +214,41 @@ class UbuntuCommunityMetrics(Base):
     network_health = Column(String, default="initializing")
     birth_verifications_today = Column(Integer, default=0)
     community_bonds_strength = Column(Float, default=0.0)
+    # Server defaults fill these in on rows that existed before the columns were added
+    verified_users = Column(Integer, default=0, server_default="0")
+    birth_verifications = Column(Integer, default=0, server_default="0")
+    total_ubuntu_score = Column(Float, default=0.0, server_default="0")  # Sum of individual scores
+    total_validator_uptime = Column(Float, default=0.0, server_default="0")
+    total_consensus_score = Column(Float, default=0.0, server_default="0")
+    is_current = Column(Boolean, default=False, server_default=false())  # Live row maintained by deltas
     
     # Indexes
     __table_args__ = (
         Index('idx_metrics_date', 'metric_date'),
+        Index('idx_metrics_current', 'is_current'),
     )
 
+class CommunityMetricsDelta(Base):
+    """A write's effect on the live community metrics row, journalled in the write's own transaction"""
+    __tablename__ = "ubuntu_community_metrics_deltas"
+    
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    total_users = Column(Integer, nullable=False, default=0)
+    total_healers = Column(Integer, nullable=False, default=0)
+    total_guardians = Column(Integer, nullable=False, default=0)
+    total_community_members = Column(Integer, nullable=False, default=0)
+    verified_users = Column(Integer, nullable=False, default=0)
+    total_flb_supply = Column(Float, nullable=False, default=0.0)
+    total_ubuntu_score = Column(Float, nullable=False, default=0.0)
+    total_validators = Column(Integer, nullable=False, default=0)
+    total_validator_uptime = Column(Float, nullable=False, default=0.0)
+    total_consensus_score = Column(Float, nullable=False, default=0.0)
+    total_healthcare_actions = Column(Integer, nullable=False, default=0)
+    verified_healthcare_actions = Column(Integer, nullable=False, default=0)
+    birth_verifications = Column(Integer, nullable=False, default=0)
+    birth_verifications_today = Column(Integer, nullable=False, default=0)
+
 class ProverbWisdom(Base):
     """African Proverbs and Ubuntu Wisdom"""
     __tablename__ = "proverb_wisdom"
@@ -171,6 +262,7 @@ class ProverbWisdom(Base):
     category = Column(String)  # healthcare, community, wisdom, birth, healing
     usage_count = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Moves the wisdom cache fingerprint on edits
     is_active = Column(Boolean, default=True)
 
 class MostarAIInteraction(Base):
@@ -212,6 +304,71 @@ class NetworkOracle(Base):
         Index('idx_oracle_timestamp', 'timestamp'),
     )
 
+class LedgerCheckpoint(Base):
+    """Ledger position up to which member balances have been checkpointed"""
+    __tablename__ = "ubuntu_ledger_checkpoints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    through_tx_id = Column(Integer)  # Last ubuntu_transactions.id folded in
+    entries = Column(Integer, default=0)
+    net_amount = Column(Float, default=0.0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class MemberBalanceCheckpoint(Base):
+    """A member's FLB balance as of a ledger position"""
+    __tablename__ = "ubuntu_member_balance_checkpoints"
+    
+    user_id = Column(Integer, ForeignKey("ubuntu_users.id"), primary_key=True)
+    balance = Column(Float, nullable=False, default=0.0)
+    through_tx_id = Column(Integer, nullable=False)
+    checkpointed_at = Column(DateTime, default=datetime.utcnow)
+
+class SupplyCounter(Base):
+    """One stripe of a role's FLB supply and member counts, updated with every balance change"""
+    __tablename__ = "ubuntu_supply_counters"
+    
+    role = Column(String, primary_key=True)
+    slot = Column(Integer, primary_key=True)  # Writers spread over slots instead of queueing on one row
+    members = Column(Integer, nullable=False, default=0)  # Active members
+    verified_members = Column(Integer, nullable=False, default=0)
+    flb_supply = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ResourceVersion(Base):
+    """One stripe of a resource's version counter, bumped in the same transaction as every write to it"""
+    __tablename__ = "ubuntu_resource_versions"
+
+    resource = Column(String, primary_key=True)  # members, actions, validators, metrics
+    slot = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class RegionDailyImpact(Base):
+    """Healthcare actions recorded and members joined per country, location and day"""
+    __tablename__ = "ubuntu_region_daily"
+    
+    country = Column(String, primary_key=True)
+    location = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    actions = Column(Integer, nullable=False, default=0)
+    verified_actions = Column(Integer, nullable=False, default=0)
+    flb_earned = Column(Float, nullable=False, default=0.0)
+    new_members = Column(Integer, nullable=False, default=0)
+    
+    # The primary key serves country (+ location) ranges; these serve location-only and all-region ranges
+    __table_args__ = (
+        Index('idx_region_location_day', 'location', 'day'),
+        Index('idx_region_day', 'day'),
+    )
+
+class SchemaFingerprint(Base):
+    """Fingerprint of the schema last applied, so startup can skip DDL"""
+    __tablename__ = "flameborn_schema"
+    
+    id = Column(Integer, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
 # Create all tables
 def create_tables():
     """Create all tables in Neon database"""
@@ -0,0 +1,46 @@
+"""
+FlameBorn Keyset Pagination
+Opaque cursors over (created_at, id) and (id) orderings
+"""
+
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(*values):
+    """Encode the sort key of the last row on a page into an opaque cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, *types):
+    """Decode a cursor back into its typed sort key values.
+
+    Raises ValueError when the cursor is malformed or does not match the expected key shape.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+    if not isinstance(payload, list) or len(payload) != len(types):
+        raise ValueError("Invalid pagination cursor")
+
+    values = []
+    for value, expected in zip(payload, types):
+        try:
+            values.append(datetime.fromisoformat(value) if expected is datetime else expected(value))
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid pagination cursor") from e
+    return values
+
+
+def split_page(rows, limit, key):
+    """Trim a limit + 1 fetch to one page and build the cursor for the next one"""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(*key(page[-1]))
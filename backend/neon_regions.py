@@ -0,0 +1,166 @@
+"""
+FlameBorn Ubuntu Regional Impact
+Per-country, per-location and per-day rollups kept in step with every action and registration
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import case, func, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from neon_config import AsyncSessionLocal
+from neon_models import HealthcareAction, RegionDailyImpact, UbuntuUser
+from neon_versions import ACTIONS, MEMBERS, bump_versions
+
+logger = logging.getLogger(__name__)
+
+REGION_GROUPINGS = ("country", "location", "day")
+
+_rollups = RegionDailyImpact.__table__
+_MEASURES = ("actions", "verified_actions", "flb_earned", "new_members")
+
+
+def region_key(moment, country, location):
+    """Rollup key for an event: (day, country, location) with whitespace normalised"""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    return day, " ".join((country or "").split())[:50], " ".join((location or "").split())[:100]
+
+
+class ImpactDeltas:
+    """Rollup increments gathered while a transaction is built"""
+
+    def __init__(self):
+        self._rows = defaultdict(lambda: [0, 0, 0.0, 0])
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, moment, country, location, actions=0, verified_actions=0, flb_earned=0.0, new_members=0):
+        row = self._rows[region_key(moment, country, location)]
+        row[0] += actions
+        row[1] += verified_actions
+        row[2] += flb_earned
+        row[3] += new_members
+
+    def action(self, created_at, country, location, flb_earned, verified=False):
+        self.add(created_at, country, location, actions=1, verified_actions=int(verified), flb_earned=flb_earned)
+
+    def verification(self, created_at, country, location, flb_delta, newly_verified):
+        """An action verified: counted, and its FLB adjusted, on the day it was recorded"""
+        self.add(created_at, country, location, verified_actions=int(newly_verified), flb_earned=flb_delta)
+
+    def member(self, created_at, country, location):
+        self.add(created_at, country, location, new_members=1)
+
+    def params(self):
+        return [
+            {"day": day, "country": country, "location": location, **dict(zip(_MEASURES, measures))}
+            # Key order, so concurrent transactions lock shared rows in the same order
+            for (day, country, location), measures in sorted(self._rows.items())
+        ]
+
+
+def _upsert(dialect):
+    insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    statement = insert(_rollups)
+    return statement.on_conflict_do_update(
+        index_elements=["country", "location", "day"],
+        set_={measure: _rollups.c[measure] + statement.excluded[measure] for measure in _MEASURES},
+    )
+
+
+async def record_impact(db, deltas):
+    """Add rollup increments inside the caller's transaction (one batched upsert)"""
+    params = deltas.params()
+    if params:
+        await db.execute(_upsert(db.bind.dialect.name), params)
+
+
+def impact_query(country=None, location=None, since=None, until=None, group_by="country", limit=100):
+    """Summed rollup rows for the filters, one row per group_by value"""
+    group = _rollups.c[group_by]
+    query = select(
+        group,
+        func.sum(_rollups.c.actions).label("actions"),
+        func.sum(_rollups.c.verified_actions).label("verified_actions"),
+        func.sum(_rollups.c.flb_earned).label("flb_earned"),
+        func.sum(_rollups.c.new_members).label("new_members"),
+    )
+    if country is not None:
+        query = query.where(_rollups.c.country == region_key(date.min, country, None)[1])
+    if location is not None:
+        query = query.where(_rollups.c.location == region_key(date.min, None, location)[2])
+    if since is not None:
+        query = query.where(_rollups.c.day >= since)
+    if until is not None:
+        query = query.where(_rollups.c.day <= until)
+    order = group if group_by == "day" else func.sum(_rollups.c.actions).desc()
+    return query.group_by(group).order_by(order, group).limit(limit)
+
+
+class RegionRollups:
+    """Builds the ubuntu_region_daily rows from the source tables when they are missing or suspect"""
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+
+    async def reconcile(self):
+        """Recompute every rollup row from healthcare_actions and ubuntu_users"""
+        async with self.session_factory() as db:
+            try:
+                if db.bind.dialect.name == "postgresql":
+                    # Holds writers back until the rebuilt rows commit, so no increment is lost
+                    await db.execute(text(
+                        "LOCK TABLE healthcare_actions, ubuntu_users, ubuntu_region_daily IN SHARE ROW EXCLUSIVE MODE"
+                    ))
+                # On SQLite the delete takes the write lock before the sources are read
+                await db.execute(_rollups.delete())
+                deltas = ImpactDeltas()
+                actions = await db.execute(
+                    select(
+                        func.date(HealthcareAction.created_at),
+                        UbuntuUser.country,
+                        HealthcareAction.location,
+                        func.count(),
+                        func.coalesce(func.sum(HealthcareAction.flb_earned), 0.0),
+                        func.coalesce(func.sum(case((HealthcareAction.verification_status == "verified", 1), else_=0)), 0),
+                    )
+                    .join(UbuntuUser, UbuntuUser.id == HealthcareAction.user_id)
+                    .group_by(func.date(HealthcareAction.created_at), UbuntuUser.country, HealthcareAction.location)
+                )
+                for day, country, location, count, flb, verified in actions.all():
+                    deltas.add(_as_date(day), country, location, actions=count, verified_actions=verified, flb_earned=flb)
+                members = await db.execute(
+                    select(func.date(UbuntuUser.created_at), UbuntuUser.country, UbuntuUser.location, func.count())
+                    .group_by(func.date(UbuntuUser.created_at), UbuntuUser.country, UbuntuUser.location)
+                )
+                for day, country, location, count in members.all():
+                    deltas.add(_as_date(day), country, location, new_members=count)
+                await record_impact(db, deltas)
+                # Regional responses are tagged with the versions of the tables they summarise
+                await bump_versions(db, ACTIONS, MEMBERS)
+                await db.commit()
+                logger.info(f"🌍 Rebuilt {len(deltas)} Ubuntu regional impact rows")
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Regional impact reconcile failed: {e}")
+                raise
+
+    async def start(self):
+        """Build the rollups once for a database that predates them"""
+        async with self.session_factory() as db:
+            built = (await db.execute(select(_rollups.c.day).limit(1))).first() is not None
+            populated = (await db.execute(select(UbuntuUser.id).limit(1))).first() is not None
+        if populated and not built:
+            await self.reconcile()
+
+
+def _as_date(value):
+    # SQLite's date() returns ISO text
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+region_rollups = RegionRollups()
@@ -0,0 +1,45 @@
+"""
+FlameBorn Ubuntu Reward Rules
+FLB and Ubuntu score earned through community participation
+"""
+
+# New member welcome
+WELCOME_FLB_BALANCE = 100.0
+STARTING_UBUNTU_SCORE = 10.0
+
+# FLB multiplier per role for recorded healthcare actions
+ROLE_MULTIPLIERS = {"healer": 1.5, "guardian": 1.2, "community": 1.0}
+
+
+def action_reward(impact_score, role):
+    """FLB earned for recording a healthcare action"""
+    return impact_score * 15 * ROLE_MULTIPLIERS.get(role, 1.0)
+
+
+def action_score_boost(impact_score):
+    """Ubuntu score earned for recording a healthcare action"""
+    return impact_score * 2
+
+
+# Member verification
+VERIFICATION_FLB_BONUS = 500.0
+VERIFICATION_SCORE_BOOST = 25.0
+
+# Community verification of a recorded action
+ACTION_VERIFICATION_MULTIPLIER = 1.3
+ACTION_VERIFICATION_SCORE_BOOST = 5.0
+
+# Joining the validator network
+VALIDATOR_FLB_BONUS = 1000.0
+VALIDATOR_SCORE_BOOST = 30.0
+VALIDATOR_STARTING_CONSENSUS = 50.0
+
+
+def verified_action_flb(flb_earned):
+    """An action's flb_earned once the community has verified it"""
+    return flb_earned * ACTION_VERIFICATION_MULTIPLIER
+
+
+def action_verification_bonus(verified_flb):
+    """FLB credited to the member when their action is verified"""
+    return verified_flb * 0.3
@@ -0,0 +1,163 @@
+"""
+FlameBorn Ubuntu Action Search
+Ranked full-text search over healthcare action titles and descriptions
+"""
+
+import logging
+import os
+
+from sqlalchemy import column, exists, func, literal_column, select, table, text
+
+from neon_config import AsyncSessionLocal
+from neon_models import HealthcareAction
+
+logger = logging.getLogger(__name__)
+
+SEARCH_LANGUAGE = "english"
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "0"))  # Opt-in cap on matches ranked per search; 0 ranks all
+SEARCH_LOCK_KEY = 0x464C4253  # pg_advisory_xact_lock key serialising search DDL across workers
+
+ACTIONS_TABLE = HealthcareAction.__tablename__
+SEARCH_VECTOR = "search_vector"  # Postgres: stored generated tsvector column on healthcare_actions
+SEARCH_TABLE = f"{ACTIONS_TABLE}_fts"  # SQLite: external-content FTS5 table over healthcare_actions
+
+# Title matches weigh more than description matches in both backends
+_PG_VECTOR = (
+    f"setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(description, '')), 'B')"
+)
+_FTS5_WEIGHTS = (4.0, 1.0)
+
+_SQLITE_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON {ACTIONS_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE} (rowid, title, description) VALUES (new.id, new.title, new.description); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON {ACTIONS_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, title, description) "
+    f"VALUES ('delete', old.id, old.title, old.description); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF title, description ON {ACTIONS_TABLE} BEGIN "
+    f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, title, description) "
+    f"VALUES ('delete', old.id, old.title, old.description); "
+    f"INSERT INTO {SEARCH_TABLE} (rowid, title, description) VALUES (new.id, new.title, new.description); "
+    f"END",
+)
+
+
+def search_terms(query):
+    """The words of a search string; every one must match"""
+    return query.split()
+
+
+def _fts5_match(terms):
+    # Each term quoted, so user input is never parsed as FTS5 query syntax
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _matches(dialect, terms, filters):
+    # SELECT id, rank of every action matching all terms and filters
+    if dialect == "postgresql":
+        vector = literal_column(f"{ACTIONS_TABLE}.{SEARCH_VECTOR}")
+        tsquery = func.plainto_tsquery(literal_column(f"'{SEARCH_LANGUAGE}'::regconfig"), " ".join(terms))
+        matches = select(HealthcareAction.id, func.ts_rank_cd(vector, tsquery).label("rank")).where(
+            vector.op("@@")(tsquery), *filters
+        )
+    else:
+        fts = table(SEARCH_TABLE, column("rowid"))
+        matches = select(
+            fts.c.rowid.label("id"), (-func.bm25(literal_column(SEARCH_TABLE), *_FTS5_WEIGHTS)).label("rank")
+        ).where(literal_column(SEARCH_TABLE).op("MATCH")(_fts5_match(terms)))
+        if filters:
+            # As EXISTS, so SQLite walks the FTS matches and looks each action up by id,
+            # rather than probing the FTS table once per action passing an indexed filter
+            matches = matches.where(exists().where(HealthcareAction.id == fts.c.rowid, *filters))
+    return matches
+
+
+def search_query(dialect, columns, terms, limit, filters=(), max_candidates=SEARCH_MAX_CANDIDATES):
+    """SELECT of columns plus a "rank" (higher is better) for the limit best actions matching every term.
+
+    Postgres matches against the GIN-indexed search_vector column and ranks
+    with ts_rank_cd; SQLite matches the FTS5 table and ranks with bm25,
+    negated so that higher is better on both. filters apply before
+    ranking. Every match is ranked, and only the winning rows are read in
+    full. A non-zero max_candidates ranks only the first matches found, in
+    no particular order; search_truncated_query tells when that dropped any.
+    """
+    matches = _matches(dialect, terms, filters)
+    if max_candidates:
+        candidates = matches.limit(max_candidates).subquery("candidates")
+        matches = select(candidates.c.id, candidates.c.rank)
+    ranked = matches.selected_columns
+    best = matches.order_by(ranked.rank.desc(), ranked.id.desc()).limit(limit).subquery("best")
+    return (
+        select(*columns, best.c.rank)
+        .join(best, best.c.id == HealthcareAction.id)
+        .order_by(best.c.rank.desc(), HealthcareAction.id.desc())
+    )
+
+
+def search_truncated_query(dialect, terms, filters=(), max_candidates=SEARCH_MAX_CANDIDATES):
+    """SELECT returning a row when more than max_candidates actions match, or None when nothing is capped"""
+    if not max_candidates:
+        return None
+    matches = _matches(dialect, terms, filters).subquery("matches")
+    return select(matches.c.id).offset(max_candidates).limit(1)
+
+
+class ActionSearchIndex:
+    """Creates the full-text index over healthcare actions and keeps it in step with every write.
+
+    Postgres maintains search_vector itself as a stored generated column,
+    so every insert path (routes, bulk sync, seeding) is indexed in the
+    inserting transaction. On SQLite, triggers mirror inserts, updates and
+    deletes into the FTS5 table; a newly created table is filled from the
+    existing rows once.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+
+    async def _ensure_postgresql(self, db):
+        # Every worker runs this at startup; only the first finds anything to do
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SEARCH_LOCK_KEY})
+        exists = (await db.execute(text(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = :table AND column_name = :column"
+        ), {"table": ACTIONS_TABLE, "column": SEARCH_VECTOR})).first()
+        if exists is None:
+            await db.execute(text(
+                f"ALTER TABLE {ACTIONS_TABLE} ADD COLUMN {SEARCH_VECTOR} tsvector "
+                f"GENERATED ALWAYS AS ({_PG_VECTOR}) STORED"
+            ))
+        await db.execute(text(
+            f"CREATE INDEX IF NOT EXISTS idx_action_search ON {ACTIONS_TABLE} USING gin ({SEARCH_VECTOR})"
+        ))
+        return exists is None
+
+    async def _ensure_sqlite(self, db):
+        exists = (await db.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+        ), {"name": SEARCH_TABLE})).first()
+        await db.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            f"title, description, content='{ACTIONS_TABLE}', content_rowid='id', tokenize='porter unicode61')"
+        ))
+        for trigger in _SQLITE_TRIGGERS:
+            await db.execute(text(trigger))
+        if exists is None:
+            await db.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('rebuild')"))
+        return exists is None
+
+    async def start(self):
+        """Create the index if missing; must finish before this worker records any action"""
+        async with self.session_factory() as db:
+            if db.bind.dialect.name == "postgresql":
+                created = await self._ensure_postgresql(db)
+            else:
+                created = await self._ensure_sqlite(db)
+            await db.commit()
+        if created:
+            logger.info("🔎 Healthcare action search index built")
+
+
+action_search = ActionSearchIndex()
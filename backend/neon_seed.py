@@ -0,0 +1,399 @@
+"""
+FlameBorn Ubuntu Synthetic Community
+Deterministic, referentially consistent test datasets loaded in bulk
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, text
+
+from neon_bulk import copy_records
+from neon_config import AsyncSessionLocal
+from neon_heartbeat_storage import heartbeat_storage
+from neon_heartbeats import CONSENSUS_STEP, UPTIME_STEP
+from neon_ledger import ACTION_REWARD, ACTION_VERIFICATION, MEMBER_VERIFICATION, VALIDATOR_BONUS, WELCOME
+from neon_models import HealthcareAction, UbuntuTransaction, UbuntuUser, UbuntuValidator
+from neon_regions import ImpactDeltas, record_impact
+from neon_rewards import (
+    ACTION_VERIFICATION_SCORE_BOOST, STARTING_UBUNTU_SCORE, VALIDATOR_FLB_BONUS, VALIDATOR_SCORE_BOOST,
+    VALIDATOR_STARTING_CONSENSUS, VERIFICATION_FLB_BONUS, VERIFICATION_SCORE_BOOST, WELCOME_FLB_BALANCE,
+    action_reward, action_score_boost, action_verification_bonus, verified_action_flb
+)
+from neon_supply import record_supply, supply_deltas
+from neon_versions import ACTIONS, MEMBERS, VALIDATORS, bump_versions
+
+logger = logging.getLogger(__name__)
+
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "5000"))  # Members per load transaction
+
+# Community shape
+VERIFIED_SHARE = 0.7
+ACTION_VERIFIED_SHARE = 0.6
+HISTORY_DAYS = 90
+HEARTBEAT_HOURS = 24
+BLOCK_SECONDS = 6
+
+ROLES = ["healer", "guardian", "community"]
+ROLE_WEIGHTS = [3, 3, 4]
+ACTION_TYPES = ["birth_verification", "health_education", "treatment", "emergency"]
+ACTION_TYPE_WEIGHTS = [3, 4, 5, 1]
+ACTION_TITLES = {
+    "birth_verification": "Ubuntu Birth Registration",
+    "health_education": "Community Health Workshop",
+    "treatment": "Ubuntu Clinic Treatment",
+    "emergency": "Emergency Care Response",
+}
+COUNTRIES = {
+    "Nigeria": ["Lagos", "Abuja", "Kano", "Ibadan", "Enugu"],
+    "Kenya": ["Nairobi", "Mombasa", "Kisumu", "Nakuru"],
+    "South Africa": ["Cape Town", "Johannesburg", "Durban", "Soweto"],
+    "Ghana": ["Accra", "Kumasi", "Tamale"],
+    "Uganda": ["Kampala", "Gulu", "Mbarara"],
+    "Tanzania": ["Dar es Salaam", "Arusha", "Dodoma"],
+    "Ethiopia": ["Addis Ababa", "Gondar", "Hawassa"],
+    "Rwanda": ["Kigali", "Huye"],
+    "Senegal": ["Dakar", "Saint-Louis"],
+    "Zambia": ["Lusaka", "Ndola"],
+}
+GIVEN_NAMES = [
+    "Amara", "Kwame", "Fatima", "Thabo", "Wanjiru", "Chinedu", "Nia", "Sipho", "Abebe", "Zawadi",
+    "Kofi", "Aisha", "Tendai", "Lindiwe", "Jabari", "Ayodele", "Makena", "Kagiso", "Imani", "Femi",
+]
+FAMILY_NAMES = [
+    "Okafor", "Mensah", "Kone", "Ndlovu", "Kamau", "Adeyemi", "Banda", "Mokoena", "Tesfaye", "Mwangi",
+    "Diallo", "Owusu", "Nkosi", "Achieng", "Balogun", "Kariuki", "Sesay", "Dlamini", "Okoro", "Uwase",
+]
+
+USER_COLUMNS = [
+    "id", "uuid", "wallet_address", "role", "name", "location", "country", "verification_status",
+    "flb_balance", "ubuntu_score", "created_at", "updated_at", "is_validator", "is_active",
+]
+VALIDATOR_COLUMNS = [
+    "id", "user_id", "validator_key", "stake_amount", "status", "uptime_percentage",
+    "total_blocks_validated", "last_heartbeat", "created_at", "ubuntu_consensus_score",
+]
+ACTION_COLUMNS = [
+    "id", "user_id", "action_type", "title", "description", "location", "impact_score", "flb_earned",
+    "verification_status", "verified_by", "verified_at", "created_at", "ubuntu_blessing",
+]
+TRANSACTION_COLUMNS = [
+    "id", "tx_hash", "from_user_id", "to_user_id", "amount", "tx_type", "status", "block_height",
+    "gas_used", "created_at", "confirmed_at", "ubuntu_purpose",
+]
+
+_TABLES = [
+    ("users", UbuntuUser, USER_COLUMNS),
+    ("validators", UbuntuValidator, VALIDATOR_COLUMNS),
+    ("actions", HealthcareAction, ACTION_COLUMNS),
+    ("transactions", UbuntuTransaction, TRANSACTION_COLUMNS),
+]
+
+
+class SyntheticCommunity:
+    """A reproducible community of members, actions, validators, heartbeats and transactions.
+
+    Every member is generated from its own random stream seeded by
+    (seed, index), so the same seed and anchor always produce the same
+    rows regardless of batch size. Balances and scores follow
+    neon_rewards exactly and every credit has a matching confirmed
+    transaction, so the dataset looks like one built through the API.
+    Actions are only verified by members with a lower index, which keeps
+    foreign keys valid batch by batch.
+    """
+
+    def __init__(self, seed, users, actions_per_user=2.5, validator_ratio=0.05,
+                 heartbeats_per_validator=24, anchor=None):
+        self.seed = seed
+        self.users = users
+        self.actions_per_user = actions_per_user
+        self.validator_ratio = validator_ratio
+        self.heartbeats_per_validator = heartbeats_per_validator
+        self.anchor = anchor or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        self.genesis = self.anchor - timedelta(days=HISTORY_DAYS)
+        self.tag = hashlib.sha256(str(seed).encode()).hexdigest()[:8]
+
+    def wallet(self, index):
+        return f"0x{self.tag}{index:032x}"
+
+    def _random(self, index):
+        return random.Random(self.seed * 10_000_019 + index)
+
+    def _is_verified(self, index):
+        # The verification draw is the first draw of each member's stream
+        return self._random(index).random() < VERIFIED_SHARE
+
+    def _at(self, rng, earliest, latest=None):
+        latest = latest or self.anchor
+        return earliest + timedelta(seconds=rng.uniform(0, max((latest - earliest).total_seconds(), 0)))
+
+    def _block(self, moment):
+        return int((moment - self.genesis).total_seconds() // BLOCK_SECONDS)
+
+    def batches(self, bases, batch_size=SEED_BATCH_SIZE):
+        """Yield dicts of rows per table for batch_size members at a time.
+
+        bases maps users/validators/actions/transactions to the highest id
+        already in use; generated rows take the ids that follow.
+        """
+        next_ids = dict(bases)
+        for start in range(0, self.users, batch_size):
+            batch = {"users": [], "validators": [], "actions": [], "transactions": [], "heartbeats": []}
+            for index in range(start, min(start + batch_size, self.users)):
+                self._member(index, bases["users"], next_ids, batch)
+            yield batch
+
+    def _transaction(self, next_ids, batch, user_id, amount, kind, moment):
+        tx_type, purpose = kind
+        next_ids["transactions"] += 1
+        tx_id = next_ids["transactions"]
+        batch["transactions"].append({
+            "id": tx_id,
+            "tx_hash": f"0x{self.tag}{tx_id:056x}",
+            "from_user_id": None,
+            "to_user_id": user_id,
+            "amount": amount,
+            "tx_type": tx_type,
+            "status": "confirmed",
+            "block_height": self._block(moment),
+            "gas_used": 0.0,
+            "created_at": moment,
+            "confirmed_at": moment,
+            "ubuntu_purpose": purpose,
+        })
+
+    def _member(self, index, user_base, next_ids, batch):
+        rng = self._random(index)
+        user_id = user_base + index + 1
+        verified = rng.random() < VERIFIED_SHARE
+        role = rng.choices(ROLES, ROLE_WEIGHTS)[0]
+        country = rng.choice(list(COUNTRIES))
+        city = rng.choice(COUNTRIES[country])
+        joined = self._at(rng, self.genesis)
+        flb_balance, ubuntu_score, updated = WELCOME_FLB_BALANCE, STARTING_UBUNTU_SCORE, joined
+        self._transaction(next_ids, batch, user_id, WELCOME_FLB_BALANCE, WELCOME, joined)
+
+        if verified:
+            verified_at = self._at(rng, joined, min(joined + timedelta(days=7), self.anchor))
+            flb_balance += VERIFICATION_FLB_BONUS
+            ubuntu_score += VERIFICATION_SCORE_BOOST
+            updated = max(updated, verified_at)
+            self._transaction(next_ids, batch, user_id, VERIFICATION_FLB_BONUS, MEMBER_VERIFICATION, verified_at)
+
+        for _ in range(round(rng.uniform(0, 2 * self.actions_per_user))):
+            action_type = rng.choices(ACTION_TYPES, ACTION_TYPE_WEIGHTS)[0]
+            impact_score = round(rng.uniform(0.1, 10.0), 1)
+            created = self._at(rng, joined)
+            flb_earned = action_reward(impact_score, role)
+            flb_balance += flb_earned
+            ubuntu_score += action_score_boost(impact_score)
+            updated = max(updated, created)
+            next_ids["actions"] += 1
+            action = {
+                "id": next_ids["actions"],
+                "user_id": user_id,
+                "action_type": action_type,
+                "title": f"{ACTION_TITLES[action_type]} #{next_ids['actions']}",
+                "description": f"{ACTION_TITLES[action_type]} in {city} - Ubuntu philosophy in practice",
+                "location": f"{city}, {country}",
+                "impact_score": impact_score,
+                "flb_earned": flb_earned,
+                "verification_status": "pending",
+                "verified_by": None,
+                "verified_at": None,
+                "created_at": created,
+                "ubuntu_blessing": f"Ubuntu recognizes your {action_type} impact. I am because we are.",
+            }
+            self._transaction(next_ids, batch, user_id, flb_earned, ACTION_REWARD, created)
+
+            if index and rng.random() < ACTION_VERIFIED_SHARE:
+                verifier = rng.randrange(index)
+                if self._is_verified(verifier):
+                    verified_at = self._at(rng, created, min(created + timedelta(days=3), self.anchor))
+                    action["flb_earned"] = verified_action_flb(flb_earned)
+                    bonus = action_verification_bonus(action["flb_earned"])
+                    flb_balance += bonus
+                    ubuntu_score += ACTION_VERIFICATION_SCORE_BOOST
+                    updated = max(updated, verified_at)
+                    action.update(verification_status="verified", verified_by=user_base + verifier + 1,
+                                  verified_at=verified_at)
+                    self._transaction(next_ids, batch, user_id, bonus, ACTION_VERIFICATION, verified_at)
+            batch["actions"].append(action)
+
+        is_validator = verified and rng.random() < self.validator_ratio
+        if is_validator:
+            next_ids["validators"] += 1
+            validator_id = next_ids["validators"]
+            since = self._at(rng, updated)
+            flb_balance += VALIDATOR_FLB_BONUS
+            ubuntu_score += VALIDATOR_SCORE_BOOST
+            self._transaction(next_ids, batch, user_id, VALIDATOR_FLB_BONUS, VALIDATOR_BONUS, since)
+            updated = max(updated, since)
+
+            beats = self.heartbeats_per_validator
+            window_start = max(since, self.anchor - timedelta(hours=HEARTBEAT_HOURS))
+            spacing = (self.anchor - window_start) / beats if beats else timedelta(0)
+            heartbeats = []
+            for beat in range(beats):
+                moment = window_start + spacing * beat
+                heartbeats.append({
+                    "validator_id": validator_id,
+                    "timestamp": moment,
+                    "block_height": self._block(moment),
+                    "network_health": round(rng.uniform(85, 100), 2),
+                    "ubuntu_message": "I am because we are - Ubuntu consensus active",
+                })
+            batch["heartbeats"].extend(heartbeats)
+            batch["validators"].append({
+                "id": validator_id,
+                "user_id": user_id,
+                "validator_key": f"ubuntu_validator_{self.tag}_{index:08d}",
+                "stake_amount": round(rng.uniform(1000, 20000), 2),
+                "status": "active",
+                "uptime_percentage": min(100.0, UPTIME_STEP * beats),
+                "total_blocks_validated": beats,
+                "last_heartbeat": heartbeats[-1]["timestamp"] if heartbeats else since,
+                "created_at": since,
+                "ubuntu_consensus_score": min(100.0, VALIDATOR_STARTING_CONSENSUS + CONSENSUS_STEP * beats),
+            })
+
+        batch["users"].append({
+            "id": user_id,
+            "uuid": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "wallet_address": self.wallet(index),
+            "role": role,
+            "name": f"{rng.choice(GIVEN_NAMES)} {rng.choice(FAMILY_NAMES)}",
+            "location": city,
+            "country": country,
+            "verification_status": "verified" if verified else "pending",
+            "flb_balance": flb_balance,
+            "ubuntu_score": ubuntu_score,
+            "created_at": joined,
+            "updated_at": updated,
+            "is_validator": is_validator,
+            "is_active": True,
+        })
+
+
+async def _insert(db, model, columns, rows):
+    if not rows:
+        return
+    if db.bind.dialect.name == "postgresql":
+        await copy_records(db, model.__tablename__, columns, rows)
+    else:
+        await db.execute(model.__table__.insert(), rows)
+
+
+def _batch_impact(batch):
+    """Regional rollup increments for one generated batch (actions belong to the batch's members)"""
+    impact = ImpactDeltas()
+    countries = {}
+    for user in batch["users"]:
+        countries[user["id"]] = user["country"]
+        impact.member(user["created_at"], user["country"], user["location"])
+    for action in batch["actions"]:
+        impact.action(action["created_at"], countries[action["user_id"]], action["location"],
+                      action["flb_earned"], verified=action["verification_status"] == "verified")
+    return impact
+
+
+async def load_synthetic_community(community, session_factory=AsyncSessionLocal, batch_size=SEED_BATCH_SIZE):
+    """Bulk-load a SyntheticCommunity, one transaction per batch of members.
+
+    Ids are assigned after the current maximum of each table, so run it
+    while nothing else is registering members. Raises ValueError if this
+    seed was already loaded, even partially: an interrupted load is not
+    resumed, so reset the database before loading the seed again.
+    """
+    started = time.perf_counter()
+    async with session_factory() as db:
+        existing = await db.execute(
+            select(UbuntuUser.id).where(UbuntuUser.wallet_address == community.wallet(0))
+        )
+        if existing.first() is not None:
+            raise ValueError(f"Synthetic community for seed {community.seed} is already loaded")
+        bases = {}
+        for name, model, _ in _TABLES:
+            bases[name] = (await db.execute(select(func.coalesce(func.max(model.id), 0)))).scalar()
+        postgresql = db.bind.dialect.name == "postgresql"
+
+    totals = {"users": 0, "validators": 0, "actions": 0, "transactions": 0, "heartbeats": 0}
+    for batch in community.batches(bases, batch_size):
+        async with session_factory() as db:
+            if postgresql:
+                # Synthetic data only: a crash may lose the last batches, and since this seed's
+                # wallets then exist the reload is refused, so reset the database before reloading.
+                # Also opens the transaction the COPYs join
+                await db.execute(text("SET LOCAL synchronous_commit TO OFF"))
+            for name, model, columns in _TABLES:
+                await _insert(db, model, columns, batch[name])
+            await heartbeat_storage.write(db, batch["heartbeats"])
+            await record_supply(db, supply_deltas(batch["users"]))
+            await record_impact(db, _batch_impact(batch))
+            await bump_versions(db, MEMBERS, ACTIONS, VALIDATORS)
+            await db.commit()
+        for name in totals:
+            totals[name] += len(batch[name])
+
+    if postgresql:
+        # Explicit ids leave the serial sequences behind
+        async with session_factory() as db:
+            for _, model, _ in _TABLES:
+                await db.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{model.__tablename__}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {model.__tablename__}))"
+                ))
+            await db.commit()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"🌱 Loaded synthetic Ubuntu community (seed {community.seed}) in {elapsed:.1f}s: {totals}")
+    return {
+        "seed": community.seed,
+        "anchor": community.anchor.isoformat(),
+        **totals,
+        "seconds": round(elapsed, 3),
+    }
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Load a deterministic synthetic Ubuntu community")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--actions-per-user", type=float, default=2.5)
+    parser.add_argument("--validator-ratio", type=float, default=0.05)
+    parser.add_argument("--heartbeats-per-validator", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=datetime.fromisoformat, default=None,
+                        help="UTC time the dataset ends at (default: the current hour)")
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+    return parser.parse_args()
+
+
+async def _main(args):
+    from neon_metrics import community_metrics
+
+    community = SyntheticCommunity(
+        seed=args.seed,
+        users=args.users,
+        actions_per_user=args.actions_per_user,
+        validator_ratio=args.validator_ratio,
+        heartbeats_per_validator=args.heartbeats_per_validator,
+        anchor=args.anchor,
+    )
+    summary = await load_synthetic_community(community, batch_size=args.batch_size)
+    await community_metrics.reconcile()
+    print(summary)
+
+
+if __name__ == "__main__":
+    from neon_startup import prepare_database
+
+    logging.basicConfig(level=logging.INFO)
+    prepare_database()
+    asyncio.run(_main(_parse_args()))
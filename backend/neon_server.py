@@ -0,0 +1,162 @@
+"""
+FlameBorn Ubuntu Server
+Single-process development mode and a multi-worker production mode
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+
+import uvicorn
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # Optional: production mode falls back to uvicorn's own worker supervisor
+    BaseApplication = None
+
+logger = logging.getLogger(__name__)
+
+APP = "neon_main:app"
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_MODES = ("dev", "production", "prepare")
+
+SERVER_MODE = os.getenv("SERVER_MODE", "dev")  # dev: one reloading process; production: a pool of workers
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+# Production workers; each opens its own database pool of up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+SERVER_PRELOAD = os.getenv("SERVER_PRELOAD", "false").lower() in ("1", "true", "yes")  # Import the app once, before forking
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "10000"))  # Recycle a worker after this many requests; 0 never
+SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "1000"))  # Spreads recycling so workers never restart together
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))  # Seconds a stopping worker gives in-flight requests
+SERVER_TIMEOUT = int(os.getenv("SERVER_TIMEOUT", "60"))  # A worker silent for this long is killed and replaced
+SERVER_KEEPALIVE = int(os.getenv("SERVER_KEEPALIVE", "5"))
+SERVER_ACCESS_LOG = os.getenv("SERVER_ACCESS_LOG", "true").lower() in ("1", "true", "yes")
+SERVER_WORKER_CLASS = os.getenv("SERVER_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+
+
+# Shared startup work
+def _prepare():
+    from neon_config import async_engine, engine
+    from neon_main import prepare_shared_state
+    from neon_startup import startup_report
+
+    async def prepare():
+        try:
+            await prepare_shared_state(startup_report)
+        finally:
+            await async_engine.dispose()
+
+    startup_report.begin()
+    asyncio.run(prepare())
+    engine.dispose()
+    startup_report.ready()
+
+
+def prepare_once():
+    """Run schema changes, seeding and the derived-table builds in a separate process, before any worker starts.
+
+    Workers booting together then each find the database current and
+    skip straight to serving; the server process itself imports no
+    database state that forked workers could inherit.
+    """
+    result = subprocess.run([sys.executable, os.path.join(APP_DIR, "neon_server.py"), "prepare"], cwd=APP_DIR)
+    if result.returncode != 0:
+        raise SystemExit(f"Ubuntu database preparation failed (exit code {result.returncode})")
+
+
+# Launch modes
+def run_dev(host=SERVER_HOST, port=SERVER_PORT):
+    """One process that reloads on code changes"""
+    uvicorn.run(
+        APP, host=host, port=port, reload=True, reload_dirs=[APP_DIR], app_dir=APP_DIR, access_log=SERVER_ACCESS_LOG
+    )
+
+
+def _dispose_inherited_pools(server, worker):
+    # A preloaded app built its engines in the master; each worker starts with empty pools
+    from neon_config import async_engine, engine
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+class ProductionServer(BaseApplication if BaseApplication is not None else object):
+    """Gunicorn arbiter running the app in uvicorn workers.
+
+    Workers are recycled after max_requests (plus jitter) and restarted if
+    they stop responding. On SIGTERM, or when a worker is recycled, it
+    stops accepting connections, lets in-flight requests finish for up to
+    graceful_timeout seconds, then runs the app's shutdown handlers, which
+    flush buffered heartbeats and metrics.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from neon_main import app
+
+        return app
+
+
+def run_production(host=SERVER_HOST, port=SERVER_PORT, workers=WEB_CONCURRENCY, preload=SERVER_PRELOAD):
+    """A pool of workers behind one socket, after preparing the database once"""
+    prepare_once()
+    if not os.getenv("DATABASE_URL", "postgresql://").startswith("postgresql://") and workers > 1:
+        logger.warning("SQLite takes one writer at a time; run several workers against Postgres")
+
+    if BaseApplication is None:
+        if preload:
+            logger.warning("SERVER_PRELOAD needs gunicorn; workers will import the app themselves")
+        # uvicorn recycles workers without jitter and restarts any that die
+        uvicorn.run(
+            APP, host=host, port=port, workers=workers, app_dir=APP_DIR,
+            limit_max_requests=SERVER_MAX_REQUESTS or None,
+            timeout_graceful_shutdown=SERVER_GRACEFUL_TIMEOUT,
+            timeout_keep_alive=SERVER_KEEPALIVE,
+            access_log=SERVER_ACCESS_LOG
+        )
+        return
+
+    options = {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": SERVER_WORKER_CLASS,
+        "preload_app": preload,
+        "max_requests": SERVER_MAX_REQUESTS,
+        "max_requests_jitter": SERVER_MAX_REQUESTS_JITTER if SERVER_MAX_REQUESTS else 0,
+        "graceful_timeout": SERVER_GRACEFUL_TIMEOUT,
+        "timeout": SERVER_TIMEOUT,
+        "keepalive": SERVER_KEEPALIVE,
+        "accesslog": "-" if SERVER_ACCESS_LOG else None,
+        "chdir": APP_DIR,
+    }
+    if preload:
+        options["post_fork"] = _dispose_inherited_pools
+    ProductionServer(options).run()
+
+
+def serve(mode=SERVER_MODE):
+    if mode not in SERVER_MODES:
+        raise SystemExit(f"Unknown server mode {mode!r}; choose one of {', '.join(SERVER_MODES)}")
+    if mode == "prepare":
+        _prepare()
+    elif mode == "production":
+        run_production()
+    else:
+        run_dev()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the FlameBorn Ubuntu Testnet API")
+    parser.add_argument("mode", nargs="?", default=SERVER_MODE, choices=SERVER_MODES)
+    serve(parser.parse_args().mode)
@@ -0,0 +1,270 @@
+"""
+FlameBorn Ubuntu Startup
+Idempotent schema and seed preparation with a per-phase timing report
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from neon_config import Base, engine
+from neon_models import SchemaFingerprint
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: single process, no lock needed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated startup steps to run in the background once the app is serving
+STARTUP_DEFER = {step.strip() for step in os.getenv("STARTUP_DEFER", "metrics,wisdom,leaderboard").split(",") if step.strip()}
+STARTUP_SEED = os.getenv("STARTUP_SEED", "true").lower() in ("1", "true", "yes")
+
+STARTUP_LOCK_KEY = 0x464C42  # "FLB": pg_advisory_xact_lock key shared by every worker
+
+_SCHEMA_ROW_ID = 1
+
+# Indexes since replaced in the models; dropped so existing databases stop maintaining them
+RETIRED_INDEXES = ("idx_user_role_score", "idx_user_country_score")
+
+
+class _Phase:
+    def __init__(self, name):
+        self.name = name
+        self.status = "ok"
+        self.detail = None
+        self.ms = 0.0
+
+    def skip(self, detail):
+        self.status = "skipped"
+        self.detail = detail
+
+    def as_dict(self):
+        phase = {"name": self.name, "status": self.status, "ms": round(self.ms, 2)}
+        if self.detail:
+            phase["detail"] = self.detail
+        return phase
+
+
+class StartupReport:
+    """Wall time of each startup phase, including deferred background steps"""
+
+    def __init__(self):
+        self.phases = []
+        self.started_at = None
+        self.ready_ms = None
+        self._started = None
+        self._deferred = []
+
+    def begin(self):
+        self.phases = []
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        phase = _Phase(name)
+        self.phases.append(phase)
+        started = time.perf_counter()
+        try:
+            yield phase
+        except Exception as e:
+            phase.status = "failed"
+            phase.detail = str(e)
+            raise
+        finally:
+            phase.ms = (time.perf_counter() - started) * 1000
+
+    async def run(self, name, start, defer=False):
+        """Run an async startup step now, or in the background when deferred"""
+        if not defer:
+            with self.phase(name):
+                await start()
+            return
+        phase = _Phase(name)
+        phase.status = "deferred"
+        self.phases.append(phase)
+        self._deferred.append(asyncio.ensure_future(self._run_deferred(phase, start)))
+
+    async def _run_deferred(self, phase, start):
+        started = time.perf_counter()
+        try:
+            await start()
+            phase.status = "ok"
+        except Exception as e:
+            phase.status = "failed"
+            phase.detail = str(e)
+            logger.error(f"Deferred startup step {phase.name} failed: {e}")
+        finally:
+            phase.ms = (time.perf_counter() - started) * 1000
+            phase.detail = phase.detail or "ran after the app started serving"
+
+    def ready(self):
+        """Mark the app as serving and log the phase breakdown"""
+        self.ready_ms = (time.perf_counter() - self._started) * 1000
+        breakdown = ", ".join(f"{phase.name}={phase.ms:.1f}ms ({phase.status})" for phase in self.phases)
+        logger.info(f"🔥 Ubuntu startup ready in {self.ready_ms:.1f}ms: {breakdown}")
+
+    async def cancel_deferred(self):
+        """Stop deferred steps still running at shutdown"""
+        for task in self._deferred:
+            task.cancel()
+        await asyncio.gather(*self._deferred, return_exceptions=True)
+        self._deferred = []
+
+    def as_dict(self):
+        return {
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "ready_ms": round(self.ready_ms, 2) if self.ready_ms is not None else None,
+            "phases": [phase.as_dict() for phase in self.phases],
+        }
+
+
+startup_report = StartupReport()
+
+
+# Schema
+def schema_fingerprint(dialect=engine.dialect):
+    """Hash of the DDL the models compile to, so any model change moves it"""
+    digest = hashlib.sha256()
+    for table in Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    return digest.hexdigest()
+
+
+def _applied_fingerprint(connection):
+    if not inspect(connection).has_table(SchemaFingerprint.__tablename__):
+        return None
+    return connection.execute(
+        select(SchemaFingerprint.fingerprint).where(SchemaFingerprint.id == _SCHEMA_ROW_ID)
+    ).scalar()
+
+
+def add_missing_columns(connection):
+    """ALTER TABLE ... ADD COLUMN each model column an existing table lacks; create_all never adds them"""
+    inspector = inspect(connection)
+    compiler = connection.dialect.ddl_compiler(connection.dialect, None)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        live = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in live:
+                continue
+            if column.primary_key or (not column.nullable and column.server_default is None):
+                raise RuntimeError(
+                    f"Cannot add column {table.name}.{column.name} to existing rows: it needs a server default"
+                )
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {compiler.get_column_specification(column)}"))
+            added.append(f"{table.name}.{column.name}")
+    if added:
+        logger.info(f"Added columns: {', '.join(added)}")
+    return added
+
+
+def ensure_schema(connection):
+    """Apply DDL only when the models changed since the last boot; True if DDL ran"""
+    fingerprint = schema_fingerprint(connection.dialect)
+    if _applied_fingerprint(connection) == fingerprint:
+        return False
+    Base.metadata.create_all(bind=connection)
+    add_missing_columns(connection)
+    # create_all skips tables that already exist, including indexes added to them later;
+    # the fingerprint is stamped only once every table has its columns and indexes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+    for name in RETIRED_INDEXES:
+        connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    fingerprints = SchemaFingerprint.__table__
+    updated = connection.execute(
+        fingerprints.update().where(fingerprints.c.id == _SCHEMA_ROW_ID)
+        .values(fingerprint=fingerprint, applied_at=datetime.utcnow())
+    )
+    if not updated.rowcount:
+        connection.execute(fingerprints.insert().values(
+            id=_SCHEMA_ROW_ID, fingerprint=fingerprint, applied_at=datetime.utcnow()
+        ))
+    return True
+
+
+# Cross-process lock
+@contextmanager
+def _file_lock(path):
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def startup_connection():
+    """Transaction on the sync engine, held under a lock shared by all workers.
+
+    Postgres takes a transaction-scoped advisory lock (released on commit,
+    so it is safe behind PgBouncer); SQLite locks a file next to the
+    database.
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as connection:
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": STARTUP_LOCK_KEY})
+            yield connection
+        return
+    database = engine.url.database
+    with ExitStack() as stack:
+        if fcntl is not None and database and database != ":memory:":
+            stack.enter_context(_file_lock(f"{database}.startup.lock"))
+        with engine.begin() as connection:
+            yield connection
+
+
+def prepare_database(report=startup_report, seed=None):
+    """Apply pending schema changes and seed an empty database, once across workers.
+
+    seed(session) adds rows and returns whether it seeded; it runs in the
+    same locked transaction as the schema check, so exactly one worker
+    seeds a fresh database.
+    """
+    with ExitStack() as stack:
+        with report.phase("lock"):
+            connection = stack.enter_context(startup_connection())
+        with report.phase("schema") as phase:
+            if not ensure_schema(connection):
+                phase.skip("schema fingerprint current")
+        if seed is not None:
+            with report.phase("seed") as phase:
+                if not STARTUP_SEED:
+                    phase.skip("disabled by STARTUP_SEED")
+                else:
+                    session = Session(bind=connection)
+                    try:
+                        if seed(session):
+                            session.commit()
+                        else:
+                            phase.skip("community already seeded")
+                    finally:
+                        session.close()
+        with report.phase("commit"):
+            stack.close()
+
+
+if __name__ == "__main__":
+    # Used by start.sh to prepare the schema before the server boots
+    logging.basicConfig(level=logging.INFO)
+    startup_report.begin()
+    prepare_database()
+    startup_report.ready()
@@ -0,0 +1,75 @@
+"""
+FlameBorn Ubuntu Network Statistics
+Aggregate queries evaluated inside the database
+"""
+
+from sqlalchemy import and_, case, func, select, true
+from neon_models import UbuntuUser, UbuntuValidator, HealthcareAction
+
+
+def _count_where(*conditions):
+    """Count rows matching all conditions inside a single aggregate pass"""
+    return func.coalesce(func.sum(case((and_(*conditions), 1), else_=0)), 0)
+
+
+# One pass over ubuntu_users
+_user_totals = select(
+    _count_where(UbuntuUser.is_active == True).label("total_users"),
+    _count_where(UbuntuUser.role == "healer", UbuntuUser.is_active == True).label("healers"),
+    _count_where(UbuntuUser.role == "guardian", UbuntuUser.is_active == True).label("guardians"),
+    _count_where(UbuntuUser.role == "community", UbuntuUser.is_active == True).label("community_members"),
+    _count_where(UbuntuUser.verification_status == "verified").label("verified_users"),
+    func.coalesce(func.sum(UbuntuUser.flb_balance), 0.0).label("total_flb_supply"),
+    func.coalesce(func.avg(UbuntuUser.ubuntu_score), 0.0).label("avg_ubuntu_score"),
+    func.coalesce(func.sum(UbuntuUser.ubuntu_score), 0.0).label("total_ubuntu_score"),
+).subquery("user_totals")
+
+# One pass over ubuntu_validators
+_validator_totals = select(
+    _count_where(UbuntuValidator.status == "active").label("total_validators"),
+    func.coalesce(func.avg(UbuntuValidator.uptime_percentage), 0.0).label("avg_uptime"),
+    func.coalesce(func.avg(UbuntuValidator.ubuntu_consensus_score), 0.0).label("avg_consensus_score"),
+    func.coalesce(func.sum(UbuntuValidator.uptime_percentage), 0.0).label("total_validator_uptime"),
+    func.coalesce(func.sum(UbuntuValidator.ubuntu_consensus_score), 0.0).label("total_consensus_score"),
+).subquery("validator_totals")
+
+# One pass over healthcare_actions
+_action_totals = select(
+    func.count(HealthcareAction.id).label("total_actions"),
+    _count_where(HealthcareAction.verification_status == "verified").label("verified_actions"),
+    _count_where(HealthcareAction.action_type == "birth_verification").label("birth_verifications"),
+).subquery("action_totals")
+
+# Each subquery yields exactly one row, so the cross join is a single row
+UBUNTU_STATS_QUERY = select(_user_totals, _validator_totals, _action_totals).select_from(
+    _user_totals.join(_validator_totals, true()).join(_action_totals, true())
+)
+
+
+async def collect_ubuntu_figures(db):
+    """Fetch every raw network figure in one database round trip"""
+    result = await db.execute(UBUNTU_STATS_QUERY)
+    return dict(result.mappings().one())
+
+
+def network_score(figures):
+    """Weighted Ubuntu network score, capped at 100"""
+    return min(100, (
+        (figures["verified_actions"] * 20) +
+        (figures["birth_verifications"] * 25) +
+        (figures["total_validators"] * 15) +
+        (figures["healers"] * 10) +
+        (figures["guardians"] * 8) +
+        (figures["community_members"] * 5)
+    ) / 10)
+
+
+def network_health(network_score, total_validators):
+    """Classify network health from score and validator count"""
+    if network_score > 80 and total_validators >= 5:
+        return "excellent"
+    if network_score > 60 and total_validators >= 3:
+        return "good"
+    if network_score > 40 and total_validators >= 1:
+        return "fair"
+    return "initializing"
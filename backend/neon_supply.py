@@ -0,0 +1,165 @@
+"""
+FlameBorn Ubuntu Supply Counters
+FLB supply and member counts maintained in the same transaction as every balance change
+"""
+
+import logging
+import os
+import random
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import bindparam, case, delete, func, select, text
+
+from neon_config import AsyncSessionLocal
+from neon_models import SupplyCounter, UbuntuUser
+from neon_versions import MEMBERS, bump_versions
+
+logger = logging.getLogger(__name__)
+
+SUPPLY_COUNTER_SLOTS = int(os.getenv("SUPPLY_COUNTER_SLOTS", "8"))  # Counter rows per role
+
+ROLES = ("healer", "guardian", "community")
+
+_counters = SupplyCounter.__table__
+
+_INCREMENT = _counters.update().where(
+    _counters.c.role == bindparam("counter_role"),
+    _counters.c.slot == bindparam("counter_slot"),
+).values(
+    members=_counters.c.members + bindparam("members_delta"),
+    verified_members=_counters.c.verified_members + bindparam("verified_delta"),
+    flb_supply=_counters.c.flb_supply + bindparam("flb_delta"),
+    updated_at=bindparam("now"),
+)
+
+
+def supply_deltas(members):
+    """Per-role [members, verified, flb] deltas for newly inserted ubuntu_users rows"""
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    for member in members:
+        delta = deltas[member["role"]]
+        delta[0] += bool(member.get("is_active", True))
+        delta[1] += member.get("verification_status") == "verified"
+        delta[2] += member.get("flb_balance") or 0.0
+    return deltas
+
+
+async def record_supply(db, deltas, slots=None):
+    """Apply per-role (members, verified, flb) deltas inside the caller's transaction.
+
+    Call it in the same transaction as the balance changes it mirrors, so
+    the counters commit or roll back with them.
+    """
+    slots = slots or SUPPLY_COUNTER_SLOTS
+    now = datetime.utcnow()
+    params = [
+        {"counter_role": role, "counter_slot": random.randrange(slots), "members_delta": members,
+         "verified_delta": verified, "flb_delta": flb, "now": now}
+        for role, (members, verified, flb) in sorted(deltas.items())
+        if members or verified or flb
+    ]
+    if params:
+        await db.execute(_INCREMENT, params)
+
+
+async def record_member_supply(db, user_id, flb, slots=None):
+    """Add flb to the supply of a member's role, looking the role up in the same statement"""
+    role = select(UbuntuUser.role).where(UbuntuUser.id == user_id).scalar_subquery()
+    await db.execute(
+        _counters.update()
+        .where(_counters.c.role == role, _counters.c.slot == random.randrange(slots or SUPPLY_COUNTER_SLOTS))
+        .values(flb_supply=_counters.c.flb_supply + flb, updated_at=datetime.utcnow())
+    )
+
+
+class SupplyCounters:
+    """Reads and rebuilds the striped ubuntu_supply_counters rows.
+
+    Every balance change adds its delta to one randomly chosen slot of the
+    member's role, so totals are a sum over a fixed handful of rows rather
+    than a scan of ubuntu_users. Reconciling recomputes the rows from
+    ubuntu_users while writers are locked out.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, slots=SUPPLY_COUNTER_SLOTS):
+        self.session_factory = session_factory
+        self.slots = slots
+
+    async def totals(self, db):
+        """Supply and member counts overall and per role"""
+        result = await db.execute(
+            select(
+                SupplyCounter.role,
+                func.sum(SupplyCounter.members),
+                func.sum(SupplyCounter.verified_members),
+                func.sum(SupplyCounter.flb_supply),
+            ).group_by(SupplyCounter.role)
+        )
+        roles = {
+            role: {"members": members or 0, "verified_members": verified or 0, "flb_supply": flb or 0.0}
+            for role, members, verified, flb in result.all()
+        }
+        return {
+            "total_users": sum(role["members"] for role in roles.values()),
+            "verified_users": sum(role["verified_members"] for role in roles.values()),
+            "total_flb_supply": sum(role["flb_supply"] for role in roles.values()),
+            "roles": roles,
+        }
+
+    async def reconcile(self):
+        """Recompute every counter row from ubuntu_users"""
+        async with self.session_factory() as db:
+            try:
+                if db.bind.dialect.name == "postgresql":
+                    # Waits for in-flight balance changes and holds new ones until the rebuild commits
+                    await db.execute(text(
+                        "LOCK TABLE ubuntu_users, ubuntu_supply_counters IN SHARE ROW EXCLUSIVE MODE"
+                    ))
+                # On SQLite the delete takes the write lock before ubuntu_users is read
+                await db.execute(delete(SupplyCounter))
+                result = await db.execute(
+                    select(
+                        UbuntuUser.role,
+                        func.coalesce(func.sum(case((UbuntuUser.is_active == True, 1), else_=0)), 0),
+                        func.coalesce(func.sum(case((UbuntuUser.verification_status == "verified", 1), else_=0)), 0),
+                        func.coalesce(func.sum(UbuntuUser.flb_balance), 0.0),
+                    ).group_by(UbuntuUser.role)
+                )
+                totals = {role: (members, verified, flb) for role, members, verified, flb in result.all()}
+                now = datetime.utcnow()
+                rows = []
+                for role in set(ROLES) | set(totals):
+                    members, verified, flb = totals.get(role, (0, 0, 0.0))
+                    for slot in range(self.slots):
+                        # Slot 0 carries the recomputed totals; the rest start empty
+                        rows.append({
+                            "role": role,
+                            "slot": slot,
+                            "members": members if slot == 0 else 0,
+                            "verified_members": verified if slot == 0 else 0,
+                            "flb_supply": flb if slot == 0 else 0.0,
+                            "updated_at": now,
+                        })
+                await db.execute(_counters.insert(), rows)
+                await bump_versions(db, MEMBERS)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Supply counter reconcile failed: {e}")
+                raise
+
+    async def start(self):
+        """Build the counters before the worker serves writes, unless every slot already exists"""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(func.count(), func.count(func.distinct(SupplyCounter.slot)), func.max(SupplyCounter.slot))
+            )
+            rows, slots, last_slot = result.one()
+        if rows >= len(ROLES) * self.slots and slots == self.slots and last_slot == self.slots - 1:
+            return
+        await self.reconcile()
+        logger.info(f"🪙 Ubuntu supply counters rebuilt with {self.slots} slots per role")
+
+
+supply_counters = SupplyCounters()
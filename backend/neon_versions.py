@@ -0,0 +1,124 @@
+"""
+FlameBorn Ubuntu Resource Versions
+Version counters bumped with every write, so read endpoints can answer conditional GETs without running their queries
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from neon_config import AsyncSessionLocal
+from neon_models import ResourceVersion
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_VERSION_SLOTS = int(os.getenv("RESOURCE_VERSION_SLOTS", "8"))  # Counter rows per resource
+
+# Resources: what each read endpoint's body is built from
+MEMBERS = "members"  # ubuntu_users rows and the supply counters kept with them
+ACTIONS = "actions"  # healthcare_actions rows
+VALIDATORS = "validators"  # ubuntu_validators rows
+METRICS = "metrics"  # The live community metrics row
+RESOURCES = (MEMBERS, ACTIONS, VALIDATORS, METRICS)
+
+_versions = ResourceVersion.__table__
+
+_BUMP = _versions.update().where(
+    _versions.c.resource == bindparam("bumped_resource"),
+    _versions.c.slot == bindparam("bumped_slot"),
+).values(
+    version=_versions.c.version + 1,
+    updated_at=bindparam("now"),
+)
+
+
+async def bump_versions(db, *resources, slots=None):
+    """Advance the versions of resources inside the caller's transaction.
+
+    Call it in the same transaction as the writes it announces, so a new
+    version is visible exactly when the rows it covers are.
+    """
+    slots = slots or RESOURCE_VERSION_SLOTS
+    now = datetime.utcnow()
+    params = [
+        {"bumped_resource": resource, "bumped_slot": random.randrange(slots), "now": now}
+        for resource in sorted(set(resources))
+    ]
+    if params:
+        await db.execute(_BUMP, params)
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header names etag (weak comparison, as RFC 9110 requires for GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_opaque(candidate.strip()) == _opaque(etag) for candidate in if_none_match.split(","))
+
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def static_etag(payload):
+    """Strong ETag for a body that never changes while the process runs"""
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def http_date(moment):
+    return format_datetime(moment.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+class ResourceVersions:
+    """Reads and creates the striped ubuntu_resource_versions rows.
+
+    A resource's version is the sum of its slots. Every write adds one to
+    a randomly chosen slot, so the sum grows with each commit while
+    concurrent writers rarely wait on the same row. Slot 0 starts at the
+    creation time in milliseconds, so a recreated database never repeats
+    the versions (and ETags) of an earlier one.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, slots=RESOURCE_VERSION_SLOTS):
+        self.session_factory = session_factory
+        self.slots = slots
+
+    async def current(self, db, resources):
+        """(weak ETag, last modified) for the combined state of resources"""
+        result = await db.execute(
+            select(_versions.c.resource, func.sum(_versions.c.version), func.max(_versions.c.updated_at))
+            .where(_versions.c.resource.in_(resources))
+            .group_by(_versions.c.resource)
+        )
+        versions = {resource: (version, updated_at) for resource, version, updated_at in result.all()}
+        tag = ".".join(f"{resource}-{versions.get(resource, (0, None))[0]}" for resource in resources)
+        modified = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+        return f'W/"{tag}"', max(modified) if modified else None
+
+    async def start(self):
+        """Create any missing version rows; safe to run from every worker at once"""
+        now = datetime.utcnow()
+        epoch = int(time.time() * 1000)
+        rows = [
+            {"resource": resource, "slot": slot, "version": epoch if slot == 0 else 0, "updated_at": now}
+            for resource in RESOURCES
+            for slot in range(self.slots)
+        ]
+        async with self.session_factory() as db:
+            insert = postgresql_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+            await db.execute(insert(_versions).on_conflict_do_nothing(index_elements=["resource", "slot"]), rows)
+            await db.commit()
+
+
+resource_versions = ResourceVersions()
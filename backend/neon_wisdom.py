@@ -0,0 +1,185 @@
+"""
+FlameBorn Ubuntu Wisdom Cache
+Active proverbs held in memory for constant-time random draws
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+from collections import Counter, defaultdict
+
+from sqlalchemy import bindparam, case, func, select
+
+from neon_config import AsyncSessionLocal
+from neon_models import ProverbWisdom
+
+logger = logging.getLogger(__name__)
+
+# Cache cadence (seconds)
+PROVERB_REFRESH_INTERVAL = float(os.getenv("PROVERB_REFRESH_INTERVAL", "60"))
+PROVERB_USAGE_FLUSH_INTERVAL = float(os.getenv("PROVERB_USAGE_FLUSH_INTERVAL", "30"))
+
+_proverbs = ProverbWisdom.__table__
+_ADD_USAGE = _proverbs.update().where(_proverbs.c.id == bindparam("proverb_id")).values(
+    usage_count=func.coalesce(_proverbs.c.usage_count, 0) + bindparam("uses"),
+    updated_at=_proverbs.c.updated_at,  # Usage is not an edit, so it must not move the fingerprint
+)
+
+# Cheap change detector: any insert, delete, (de)activation or edit through the models moves it
+_FINGERPRINT_QUERY = select(
+    func.count(ProverbWisdom.id),
+    func.coalesce(func.max(ProverbWisdom.id), 0),
+    func.coalesce(func.sum(case((ProverbWisdom.is_active == True, ProverbWisdom.id), else_=0)), 0),
+    func.max(ProverbWisdom.updated_at),
+)
+
+
+def _key(value):
+    return (value or "").strip().lower()
+
+
+def _wisdom_payload(proverb):
+    return {
+        "proverb": proverb.proverb_text,
+        "origin": f"{proverb.origin_tribe}, {proverb.origin_country}",
+        "translation": proverb.english_translation,
+        "ubuntu_meaning": proverb.ubuntu_meaning,
+        "category": proverb.category,
+        "wisdom_source": "African Ubuntu Tradition",
+        "philosophy": "I am because we are"
+    }
+
+
+class ProverbCache:
+    """Serves random Ubuntu proverbs from memory.
+
+    Active proverbs are indexed by category and by origin (country or
+    tribe), so a draw is a random.choice over a prebuilt list. The cache
+    reloads when the table's fingerprint changes (checked every
+    PROVERB_REFRESH_INTERVAL seconds) or when invalidate() is called after
+    an in-process write. Usage counts are tallied in memory and added to
+    proverb_wisdom.usage_count in one batched statement per flush.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal,
+                 refresh_interval=PROVERB_REFRESH_INTERVAL,
+                 usage_flush_interval=PROVERB_USAGE_FLUSH_INTERVAL):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.usage_flush_interval = usage_flush_interval
+        self._all = []
+        self._by_category = {}
+        self._by_origin = {}
+        self._by_category_origin = {}
+        self._fingerprint = None
+        self._loaded = False
+        self._usage = Counter()
+        self._lock = threading.Lock()
+        self._task = None
+
+    # Reads
+    async def draw(self, category=None, origin=None):
+        """Wisdom payload of a random proverb matching the filters, or None when nothing matches"""
+        if not self._loaded:
+            await self.refresh(force=True)
+        if category and origin:
+            candidates = self._by_category_origin.get((_key(category), _key(origin)))
+        elif category:
+            candidates = self._by_category.get(_key(category))
+        elif origin:
+            candidates = self._by_origin.get(_key(origin))
+        else:
+            candidates = self._all
+        if not candidates:
+            return None
+        proverb_id, payload = random.choice(candidates)
+        with self._lock:
+            self._usage[proverb_id] += 1
+        return payload
+
+    # Maintenance
+    async def refresh(self, force=False):
+        """Reload active proverbs if the table changed since the last load"""
+        async with self.session_factory() as db:
+            fingerprint = tuple((await db.execute(_FINGERPRINT_QUERY)).one())
+            if not force and fingerprint == self._fingerprint:
+                return
+            result = await db.execute(
+                select(ProverbWisdom).where(ProverbWisdom.is_active == True).order_by(ProverbWisdom.id)
+            )
+            proverbs = result.scalars().all()
+
+        entries = []
+        by_category = defaultdict(list)
+        by_origin = defaultdict(list)
+        by_category_origin = defaultdict(list)
+        for proverb in proverbs:
+            entry = (proverb.id, _wisdom_payload(proverb))
+            entries.append(entry)
+            by_category[_key(proverb.category)].append(entry)
+            for origin in {_key(proverb.origin_country), _key(proverb.origin_tribe)} - {""}:
+                by_origin[origin].append(entry)
+                by_category_origin[(_key(proverb.category), origin)].append(entry)
+
+        # Swap whole indexes so concurrent draws always see a consistent set
+        self._all = entries
+        self._by_category = dict(by_category)
+        self._by_origin = dict(by_origin)
+        self._by_category_origin = dict(by_category_origin)
+        self._fingerprint = fingerprint
+        self._loaded = True
+        logger.info(f"🧠 Ubuntu wisdom cache loaded {len(entries)} proverbs")
+
+    def invalidate(self):
+        """Force a reload on the next refresh (after writing proverbs in this process)"""
+        self._fingerprint = None
+        self._loaded = False
+
+    async def flush_usage(self):
+        """Add tallied usage counts to proverb_wisdom in one batched statement"""
+        with self._lock:
+            usage, self._usage = self._usage, Counter()
+        if not usage:
+            return
+        async with self.session_factory() as db:
+            try:
+                await db.execute(_ADD_USAGE, [
+                    {"proverb_id": proverb_id, "uses": uses} for proverb_id, uses in usage.items()
+                ])
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                with self._lock:
+                    self._usage.update(usage)
+                logger.error(f"Proverb usage flush failed: {e}")
+
+    async def run(self):
+        """Background loop: flush usage counts and check for proverb changes"""
+        loop = asyncio.get_event_loop()
+        last_refresh = loop.time()
+        while True:
+            await asyncio.sleep(min(self.usage_flush_interval, self.refresh_interval))
+            await self.flush_usage()
+            if loop.time() - last_refresh >= self.refresh_interval:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.error(f"Proverb cache refresh failed: {e}")
+                last_refresh = loop.time()
+
+    async def start(self):
+        """Load the cache and start the background loop"""
+        await self.refresh(force=True)
+        self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        """Cancel the background loop and flush outstanding usage counts"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush_usage()
+
+
+proverb_cache = ProverbCache()
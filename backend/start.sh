@@ -26,13 +26,14 @@ fi
 
 # Create database tables
 echo "🗄️  Initializing Ubuntu database..."
-python -c "from neon_models import create_tables; create_tables()"
+python neon_startup.py
 
-# Start the server
-echo "🚀 Starting FlameBorn Ubuntu Testnet..."
+# Start the server: ./start.sh production for the multi-worker server (default: dev, one reloading process)
+SERVER_MODE="${1:-${SERVER_MODE:-dev}}"
+echo "🚀 Starting FlameBorn Ubuntu Testnet ($SERVER_MODE mode)..."
 echo "🌐 Server will be available at: http://localhost:8000"
 echo "📚 API Documentation: http://localhost:8000/docs"
 echo "🔥 Ubuntu Philosophy: I am because we are"
 echo ""
 
-uvicorn neon_main:app --host 0.0.0.0 --port 8000 --reload
+exec python neon_server.py "$SERVER_MODE"
@@ -59,6 +59,14 @@ def run_ubuntu_tests():
     test_endpoint("GET", "/ping")
     test_endpoint("GET", "/health")
     test_endpoint("GET", "/")
+    startup = test_endpoint("GET", "/health/startup")
+    if startup and startup.get("startup", {}).get("ready_ms") is not None:
+        print(f"   ⏱️ Ubuntu testnet ready in {startup['startup']['ready_ms']}ms")
+    metrics = requests.get(f"{BASE_URL}/metrics")
+    print("🔥 GET /metrics")
+    print(f"   Status: {metrics.status_code}")
+    if metrics.status_code == 200 and "flameborn_sql_statements_per_request" in metrics.text:
+        print("   📈 Ubuntu SQL metrics exposed for Prometheus!")
     
     # Test 2: Ubuntu manifest
     print("2. Testing Ubuntu Protocol Manifest")
@@ -71,6 +79,9 @@ def run_ubuntu_tests():
     stats = test_endpoint("GET", "/ubuntu/stats")
     if stats and "ubuntu_metrics" in stats:
         print("   📊 Ubuntu metrics active!")
+    history = test_endpoint("GET", "/ubuntu/stats/history?days=7")
+    if history and "snapshots" in history:
+        print(f"   📈 {len(history['snapshots'])} Ubuntu metrics snapshots recorded!")
     
     # Test 4: Create Ubuntu user
     print("4. Testing Ubuntu User Creation")
@@ -85,11 +96,31 @@ def run_ubuntu_tests():
     if user and "ubuntu_score" in user:
         print("   👤 Ubuntu user created successfully!")
     
+    # Test 4b: Bulk Ubuntu registration
+    print("4b. Testing Bulk Ubuntu Registration")
+    bulk_members = [
+        {
+            "wallet_address": f"0x{index:040x}",
+            "role": ["healer", "guardian", "community"][index % 3],
+            "name": f"Ubuntu Bulk Member {index}",
+            "location": "Test City",
+            "country": "Test Country"
+        }
+        for index in range(1, 101)
+    ]
+    bulk = test_endpoint("POST", "/ubuntu/users/bulk?report=failures", bulk_members)
+    if bulk and "created" in bulk:
+        print(f"   👥 {bulk['created']} created, {bulk['exists']} already in our community!")
+    
     # Test 5: Get Ubuntu users
     print("5. Testing Ubuntu Community Listing")
-    users = test_endpoint("GET", "/ubuntu/users")
-    if users and isinstance(users, list):
-        print(f"   👥 Found {len(users)} Ubuntu community members!")
+    users = test_endpoint("GET", "/ubuntu/users?limit=2")
+    if users and isinstance(users.get("items"), list):
+        print(f"   👥 Found {len(users['items'])} Ubuntu community members!")
+        if users.get("next_cursor"):
+            next_users = test_endpoint("GET", f"/ubuntu/users?limit=2&cursor={users['next_cursor']}")
+            if next_users and isinstance(next_users.get("items"), list):
+                print("   ➡️ Cursor pagination continues to the next page!")
     
     # Test 6: Verify Ubuntu user
     print("6. Testing Ubuntu User Verification")
@@ -109,12 +140,28 @@ def run_ubuntu_tests():
     action = test_endpoint("POST", f"/ubuntu/healthcare-actions?wallet_address={TEST_WALLET}", action_data)
     if action and "ubuntu_blessing" in action:
         print("   🏥 Ubuntu healthcare action recorded with blessing!")
-    
+
+    # Test 7b: Stream healthcare actions from a field device
+    print("7b. Testing Ubuntu Healthcare Action Stream")
+    stream_body = "\n".join(
+        json.dumps({**action_data, "wallet_address": TEST_WALLET, "title": f"Ubuntu Field Visit {i}"})
+        for i in range(50)
+    )
+    response = requests.post(
+        f"{BASE_URL}/ubuntu/healthcare-actions/stream",
+        data=stream_body,
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    print(f"🔥 POST /ubuntu/healthcare-actions/stream")
+    print(f"   Status: {response.status_code}")
+    if response.status_code == 200 and response.json().get("recorded") == 50:
+        print("   🏥 50 streamed Ubuntu healthcare actions recorded!")
+
     # Test 8: Get healthcare actions
     print("8. Testing Ubuntu Healthcare Actions Listing")
     actions = test_endpoint("GET", "/ubuntu/healthcare-actions")
-    if actions and isinstance(actions, list):
-        print(f"   🏥 Found {len(actions)} Ubuntu healthcare actions!")
+    if actions and isinstance(actions.get("items"), list):
+        print(f"   🏥 Found {len(actions['items'])} Ubuntu healthcare actions!")
     
     # Test 9: Create Ubuntu validator
     print("9. Testing Ubuntu Validator Registration")
@@ -132,6 +179,16 @@ def run_ubuntu_tests():
     heartbeat = test_endpoint("POST", f"/ubuntu/validators/{TEST_WALLET}/heartbeat")
     if heartbeat and "ubuntu_pulse" in heartbeat:
         print("   💓 Ubuntu validator heartbeat received!")
+
+    # Test 10b: Validator uptime and heartbeat history (rollups are written on the buffer flush)
+    print("10b. Testing Ubuntu Validator Uptime")
+    time.sleep(2)
+    uptime = test_endpoint("GET", f"/ubuntu/validators/{TEST_WALLET}/uptime?hours=1")
+    if uptime and uptime.get("heartbeats", 0) > 0:
+        print(f"   💓 Validator uptime: {uptime['uptime_percentage']}% over the last hour")
+    history = test_endpoint("GET", f"/ubuntu/validators/{TEST_WALLET}/heartbeats?resolution=minute&hours=1")
+    if history and history.get("buckets"):
+        print(f"   💓 {len(history['buckets'])} minutes of heartbeat history")
     
     # Test 11: Ubuntu wisdom oracle
     print("11. Testing Ubuntu Wisdom Oracle")
@@ -139,6 +196,9 @@ def run_ubuntu_tests():
     if wisdom and "proverb" in wisdom:
         print("   🧠 Ubuntu wisdom retrieved!")
         print(f"   Proverb: {wisdom.get('proverb', 'N/A')}")
+    community_wisdom = test_endpoint("GET", "/oracle/ubuntu-wisdom?category=community")
+    if community_wisdom and community_wisdom.get("category") == "community":
+        print("   🧠 Ubuntu wisdom drawn by category!")
     
     # Test 12: Ubuntu price oracle
     print("12. Testing Ubuntu FLAME Price Oracle")
@@ -146,6 +206,55 @@ def run_ubuntu_tests():
     if price and "ubuntu_blessing" in price:
         print("   💰 Ubuntu FLAME price oracle active!")
     
+    # Test 12b: Ledger agrees with member balances
+    print("12b. Testing Ubuntu Ledger")
+    ledger = test_endpoint("GET", f"/ubuntu/users/{TEST_WALLET}/transactions")
+    if ledger and ledger.get("items"):
+        print(f"   📒 {len(ledger['items'])} Ubuntu ledger entries for the test member!")
+    audit = test_endpoint("GET", "/health/ledger")
+    if audit and not audit.get("mismatches"):
+        print("   📒 Every Ubuntu balance matches the ledger!")
+    
+    # Test 12c: Leaderboard and rank lookup
+    print("12c. Testing Ubuntu Leaderboard")
+    leaders = test_endpoint("GET", "/ubuntu/leaderboard?limit=5")
+    if leaders and leaders.get("leaders"):
+        print(f"   🏆 Top Ubuntu member: {leaders['leaders'][0]['name']}")
+    rank = test_endpoint("GET", f"/ubuntu/leaderboard/{TEST_WALLET}?metric=flb_balance")
+    if rank and rank.get("rank"):
+        print(f"   🏆 Test member ranks #{rank['rank']} of {rank['members']} by FLB balance!")
+    
+    # Test 12d: Regional impact rollups
+    print("12d. Testing Ubuntu Regional Impact")
+    regions = test_endpoint("GET", "/ubuntu/regions?group_by=country&limit=5")
+    if regions and regions.get("regions"):
+        print(f"   🌍 Impact reported for {len(regions['regions'])} Ubuntu countries!")
+    
+    # Test 12e: Conditional GETs answer unchanged polls with 304
+    print("12e. Testing Ubuntu Conditional GETs")
+    for endpoint in ["/.well-known/manifest.json", "/ubuntu/stats", "/ubuntu/validators"]:
+        first = requests.get(f"{BASE_URL}{endpoint}")
+        again = requests.get(f"{BASE_URL}{endpoint}", headers={"If-None-Match": first.headers.get("ETag", "")})
+        print(f"🔥 GET {endpoint} (If-None-Match)")
+        print(f"   Status: {again.status_code}")
+        print("   ✅ SUCCESS" if again.status_code == 304 else "   ❌ FAILED - Expected 304")
+    print()
+
+    # Test 12f: Streamed exports
+    print("12f. Testing Ubuntu Exports")
+    for endpoint in ["/ubuntu/healthcare-actions/export?format=ndjson", "/ubuntu/users/export?format=csv&role=healer"]:
+        export = requests.get(f"{BASE_URL}{endpoint}", stream=True)
+        lines = sum(1 for line in export.iter_lines() if line)
+        print(f"🔥 GET {endpoint}")
+        print(f"   Status: {export.status_code}, {lines} lines")
+        print("   ✅ SUCCESS" if export.status_code == 200 else f"   ❌ FAILED - {export.text}")
+    print()
+
+    # Test 12g: Full-text search
+    print("12g. Testing Ubuntu Healthcare Action Search")
+    test_endpoint("GET", "/ubuntu/healthcare-actions/search?q=birth+verification&limit=5")
+    test_endpoint("GET", "/ubuntu/healthcare-actions/search?q=clinic&action_type=treatment&verification_status=verified")
+
     # Test 13: Seed additional data
     print("13. Testing Ubuntu Data Seeding")
     seed_result = test_endpoint("POST", "/dev/seed-ubuntu-data")